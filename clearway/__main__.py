@@ -6,4 +6,6 @@ sys.path.append(".")
 
 from clearway.cli import main  # noqa: E402 module level import not at top of file
 
-sys.exit(main())  # type: ignore[func-returns-value]
+# The guard prevents the worker processes, which import this module, from starting the program again
+if __name__ == "__main__":
+    sys.exit(main())  # type: ignore[func-returns-value]
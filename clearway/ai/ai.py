@@ -1,14 +1,33 @@
 """OpenCV object detection using picamera."""
+from threading import Event
+import contextlib
 import time
 import logging
 from enum import IntEnum, auto, unique
 import os
-from typing import Iterable, List, Optional, Tuple, Union
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
 
 import numpy
 from imutils.video import VideoStream, FPS
 import cv2
-from clearway.gpio import stateMachinePanel
+from clearway.gpio import debouncer
+from clearway.ai import (
+    backend,
+    capture,
+    decode,
+    governor,
+    metrics,
+    motion,
+    rawcache,
+    recorder,
+    resolution,
+    roi,
+    summary,
+    tiling,
+    timing,
+    tracker,
+    writer,
+)
 
 
 @unique
@@ -28,6 +47,26 @@ class _IdYoloOutputLayer(IntEnum):
     BICYCLE = auto()
 
 
+class Detection(NamedTuple):
+    """The boxes found in a frame by `Ai.detections`.
+
+    The arrays of the boxes, the scores and the classes have a row for each box, and are empty without box.
+    """
+
+    frame_index: int
+    """The index of the frame, in the video for an input video or among the processed frames for a camera."""
+    timestamp: float
+    """The `time.monotonic` time at which the frame was captured."""
+    boxes: numpy.ndarray
+    """The (N, 4) `int32` boxes (x, y, width, height) in the coordinates of the frame."""
+    scores: numpy.ndarray
+    """The (N,) `float32` confidences of the boxes, between 0 and 1."""
+    classes: numpy.ndarray
+    """The (N,) `int32` COCO classes of the boxes, 1 for the bicycles."""
+    image: numpy.ndarray
+    """The frame, owned by the capture ring buffer and only valid until the next record is requested."""
+
+
 class Ai:
     """Artificial intelligence management."""
 
@@ -47,6 +86,32 @@ class Ai:
         size: int,
         path_to_input_video: Optional[str] = None,
         path_to_output_video: Optional[str] = None,
+        frame_range: Optional[Tuple[int, int]] = None,
+        batch_size: int = 1,
+        motion_threshold: float = 0.0,
+        motion_interval: int = 0,
+        regions_of_interest: Optional[Iterable[roi.RegionOfInterest]] = None,
+        detection_interval: int = 1,
+        backend_name: str = backend.OPENCV,
+        threads: int = 0,
+        inference_backend: Optional[backend.Backend] = None,
+        output_policy: str = writer.BLOCK,
+        clip_before: float = 0.0,
+        clip_after: float = 0.0,
+        camera_settings: Optional[Dict[str, Any]] = None,
+        camera_device: str = "/dev/video0",
+        hold_time: float = 2.0,
+        confirm_frames: int = 1,
+        confirm_window: int = 1,
+        log_interval: float = 1.0,
+        raw_cache: Optional[str] = None,
+        tiles: Tuple[int, int] = (1, 1),
+        tile_overlap: float = 0.2,
+        sizes: Sequence[int] = (),
+        target_latency: float = 0.0,
+        governor_settings: Optional[Dict[str, Any]] = None,
+        ready_event: Optional[Event] = None,
+        raw_cache_run: Optional[str] = None,
     ) -> None:
         """Get the three output layers of YOLO and start the video stream.
 
@@ -67,52 +132,218 @@ class Ai:
         path_to_output_video : string, optional
             The path to the folder that will contain the output video with boxes around detected bicycles,
             by default None.
+        frame_range : Tuple[int, int], optional
+            The range [start, stop) of the frames of the input video to process, by default None to process all of
+            them.
+        batch_size : int, optional
+            The number of frames of an input video sent together to the network, by default 1.
+            The frames of the camera are always processed one by one to keep the latency low.
+        motion_threshold : float, optional
+            The fraction of the pixels that must change for a frame to be processed by the network, by default 0.0
+            to process all the frames.
+        motion_interval : int, optional
+            The maximum number of frames skipped in a row without motion, by default 0 for no maximum.
+        regions_of_interest : Iterable[roi.RegionOfInterest], optional
+            The regions of the frames sent to the network, each one signaled on its own GPIOs, by default None to send
+            the whole frames.
+        detection_interval : int, optional
+            The network processes one frame every `detection_interval` frames and the boxes are tracked on the frames
+            in between, by default 1 to process all the frames.
+        backend_name : str, optional
+            The name of the inference engine running YOLO, one of `backend.BACKENDS`, by default `backend.OPENCV`.
+            With `backend.ONNXRUNTIME`, `yolo_weights` is the path to the ONNX model and `yolo_cfg` is not used.
+        threads : int, optional
+            The number of threads of the inference engine, by default 0 to let the engine choose.
+        inference_backend : backend.Backend, optional
+            The inference engine already running YOLO, shared by several video streams, by default None to create
+            it from `backend_name`, `yolo_weights`, `yolo_cfg`, `size` and `threads`.
+        output_policy : str, optional
+            What to do with a processed image when the queue of the output video is full, one of `writer.POLICIES`,
+            by default `writer.BLOCK` to wait for the writer thread.
+        clip_before : float, optional
+            The number of seconds recorded before a detection, by default 0.0.
+            If `clip_before` or `clip_after` is strictly positive, the output video is replaced by clips around the
+            detections.
+        clip_after : float, optional
+            The number of seconds recorded after the last detection of a clip, by default 0.0.
+        camera_settings : Dict[str, Any], optional
+            The format asked to the camera, see `capture.negotiate`, by default None to keep the format chosen by the
+            driver.
+        camera_device : str, optional
+            The device of the camera, used without input video, by default `"/dev/video0"`.
+        hold_time : float, optional
+            The number of seconds without detection before the panels stop signaling, by default 2.0.
+        confirm_frames : int, optional
+            The number of processed frames with a detection needed for the panels to start signaling, by default 1.
+        confirm_window : int, optional
+            The number of last processed frames in which the detections are counted, by default 1.
+        log_interval : float, optional
+            The minimum number of seconds between two logs of the detections, by default 1.0.
+            With 0, each detection is logged on its own.
+        raw_cache : str, optional
+            The folder where the candidate boxes of the network are saved for each processed frame, to decode them
+            again with `rawcache.redecode`, by default None to not save them.
+        tiles : Tuple[int, int], optional
+            The number of columns and rows of the tiles cut in each part of the image, sent together to the network to
+            detect the small objects of the high resolution cameras, by default (1, 1) to send the whole parts.
+        tile_overlap : float, optional
+            The fraction of a tile shared with its neighbour, larger than the objects cut by the border of a tile, by
+            default 0.2.
+        sizes : Sequence[int], optional
+            The sizes of the blob between which the size switches to keep the latency of the inference of a frame
+            under `target_latency`, see `resolution`, by default () to keep `size`.
+        target_latency : float, optional
+            The maximum number of seconds of the inference of a frame, by default 0.0 to keep `size`.
+        governor_settings : Dict[str, Any], optional
+            The keyword arguments of the `governor.Governor` sending fewer frames to the network when the CPU heats up
+            or the latency of the frames grows, by default None to process one frame every `detection_interval`
+            frames. The governor is only used with a strictly positive `"target_latency"`.
+        ready_event : Event, optional
+            The event set each time a frame is read or the video stream ends, shared by the sources of a
+            `multicamera.MultiCamera` to wait for the first one ready, by default None.
+        raw_cache_run : str, optional
+            The run of `raw_cache` started with `rawcache.start_run` by the parent process of the workers of
+            `offline.process_video`, by default None to start a new run.
         """
-        self.__size: int
+        self.__batch_size: int
         self.__on_raspberry: bool
         self.__see_real_time_processing: bool
         self.__path_to_input_video: Optional[str]
         self.__path_to_output_video: Optional[str]
-        self.__output_layers: List[str]
-        self.__network: cv2.dnn_Net
+        self.__backend: backend.Backend
         self.__video_stream: Union[cv2.VideoCapture, VideoStream]
-        self.__output_video: Optional[cv2.VideoWriter] = None
-
-        # Read the deep learning network Yolo
-        self.__network = cv2.dnn.readNet(yolo_weights, yolo_cfg)
-        # Find names of all layers of the YOLO model architecture
-        layer_names = self.__network.getLayerNames()
-        self.__output_layers = [layer_names[i[0] - 1] for i in self.__network.getUnconnectedOutLayers()]
+        self.__output_policy: str = output_policy
+        self.__clip_seconds: Tuple[float, float] = (clip_before, clip_after)
+        self.__camera_settings: Dict[str, Any] = dict(camera_settings or {})
+        self.__camera_device: str = camera_device
+        self.__ready_event: Optional[Event] = ready_event
+        # The writer of the whole output video or the recorder of the clips around the detections
+        self.__output: Optional[Union[writer.WriterThread, recorder.EventRecorder]] = None
+        self.__capture: capture.CaptureThread
+        self.__motion_gate: Optional[motion.MotionGate] = None
+        self.__regions_of_interest: List[roi.RegionOfInterest] = list(regions_of_interest or ())
+        self.__detection_interval: int = detection_interval
+        self.__frames_since_detection: int = 0
+        self.__trackers: List[tracker.Tracker] = []
+        self.__frames_tracked: int = 0
+        # The panels are told to signal on the edges of the detections, one debouncer for each set of GPIOs
+        self.__debounce_settings: Tuple[float, int, int] = (hold_time, confirm_frames, confirm_window)
+        self.__debouncers: Dict[FrozenSet[int], debouncer.Debouncer] = {}
+        self.__detection_summary: summary.DetectionSummary = summary.DetectionSummary(
+            Ai.__object_detection_id.name, log_interval
+        )
+        # The index of the next frame in the video, the frames of a range start at its first frame
+        self.__frame_index: int = frame_range[0] if frame_range is not None else 0
+        # The capture time of each image given by `get_next_images`
+        self.__frame_timestamps: List[float] = []
+        self.__raw_cache: Optional[rawcache.RawCacheWriter] = None
+        if raw_cache is not None:
+            self.__raw_cache = rawcache.RawCacheWriter(raw_cache, self.__frame_index, run=raw_cache_run)
+        # The columns and rows of the tiles of each part of the image, and their overlap
+        self.__tiling: Tuple[int, int, float] = (tiles[0], tiles[1], tile_overlap)
+
+        if inference_backend is not None:
+            self.__backend = inference_backend
+        else:
+            # Load the deep learning network Yolo in the inference engine, for each size it may switch to
+            with timing.phase("model"):
+                self.__backend = resolution.create(
+                    backend_name, yolo_weights, yolo_cfg, size, threads, sizes, target_latency
+                )
 
         self.__on_raspberry = on_raspberry
         self.__see_real_time_processing = see_real_time_processing
         self.__path_to_input_video = path_to_input_video
         self.__path_to_output_video = path_to_output_video
-        self.__size = size
+        self.__batch_size = batch_size if isinstance(self.__path_to_input_video, str) else 1
+
+        if motion_threshold > 0:
+            self.__motion_gate = motion.MotionGate(motion_threshold, motion_interval)
+
+        self.__governor: Optional[governor.Governor] = None
+        if (governor_settings or {}).get("target_latency", 0) > 0:
+            self.__governor = governor.Governor(min_interval=detection_interval, **governor_settings)
+
+        if self.__detection_interval > 1 or self.__governor is not None:
+            # One tracker for each part of the image sent to the network
+            self.__trackers = [tracker.Tracker() for _ in self.__regions_of_interest or [None]]
 
+        with timing.phase("video stream"):
+            Ai.open_video_stream(self, frame_range)
+
+    def open_video_stream(self, frame_range: Optional[Tuple[int, int]] = None) -> None:
+        """Open the camera or the input video, and the output video if it was asked.
+
+        Parameters
+        ----------
+        frame_range : Tuple[int, int], optional
+            The range [start, stop) of the frames of the input video to process, by default None to process all of
+            them.
+        """
         if not isinstance(self.__path_to_input_video, str):
+            if len(self.__camera_settings) > 0:
+                # The buffer size can only be set with the V4L2 backend
+                self.__video_stream = cv2.VideoCapture(self.__camera_device, cv2.CAP_V4L2)
+                capture.negotiate(self.__video_stream, **self.__camera_settings)
+            else:
+                self.__video_stream = cv2.VideoCapture(self.__camera_device)
+
             if self.__on_raspberry is True:
-                self.__video_stream = cv2.VideoCapture("/dev/video0")
                 # Very important! Otherwise, video_stream.read() gives a NonType
                 time.sleep(2.0)
                 logging.info("[AI] Camera ready to detect")
-            else:
-                self.__video_stream = cv2.VideoCapture("/dev/video0")
         else:
-            self.__video_stream = cv2.VideoCapture(path_to_input_video)
-
-        if isinstance(self.__path_to_output_video, str):
+            self.__video_stream = cv2.VideoCapture(self.__path_to_input_video)
+
+        roi.check_regions(
+            self.__regions_of_interest,
+            int(self.__video_stream.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(self.__video_stream.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+
+        nb_frames: Optional[int] = None
+        if frame_range is not None:
+            self.__video_stream.set(cv2.CAP_PROP_POS_FRAMES, frame_range[0])
+            nb_frames = frame_range[1] - frame_range[0]
+
+        # Drop the oldest frames of a camera to always process the freshest one, keep all the frames of a video file
+        # The frames of a batch are kept in the ring buffer while the producer reads the next ones
+        self.__capture = capture.CaptureThread(
+            self.__video_stream,
+            drop_oldest=self.__path_to_input_video is None,
+            capacity=max(4, self.__batch_size + 2),
+            nb_frames=nb_frames,
+            ready_event=self.__ready_event,
+        )
+
+        if isinstance(self.__path_to_output_video, str) and sum(self.__clip_seconds) > 0:
+            # Only the clips around the detections are recorded
+            fps = self.__video_stream.get(cv2.CAP_PROP_FPS)
+            self.__output = recorder.EventRecorder(
+                self.__path_to_output_video,
+                fps if fps > 0 else 15,
+                *self.__clip_seconds,
+                first_frame=frame_range[0] if frame_range is not None else 0,
+                prefix="clip" if self.__path_to_input_video is not None else time.strftime("clip_%Y%m%d-%H%M%S"),
+            )
+        elif isinstance(self.__path_to_output_video, str):
             output_video_file = os.path.join(self.__path_to_output_video, "video_processed.mp4")
             x_shape = int(self.__video_stream.get(cv2.CAP_PROP_FRAME_WIDTH))
             y_shape = int(self.__video_stream.get(cv2.CAP_PROP_FRAME_HEIGHT))
             four_cc = cv2.VideoWriter_fourcc("m", "p", "4", "v")
-            self.__output_video = cv2.VideoWriter(output_video_file, four_cc, fps=15, frameSize=(x_shape, y_shape))
+            # Encode the output video on a dedicated thread
+            self.__output = writer.WriterThread(
+                cv2.VideoWriter(output_video_file, four_cc, fps=15, frameSize=(x_shape, y_shape)),
+                self.__output_policy,
+                frame_size=(x_shape, y_shape),
+            )
 
     def bicycle_detector(self, gpio_led: Union[int, Iterable[int]]) -> None:
         """Detect cyclists on a video stream frame by frame.
 
         Get the video stream from the Raspberry Pi camera.
         Process the stream to detect cyclists using a YOLO algorithm and the openCV library.
+        The boxes of each record of `detections` are drawn, shown and written to the output video.
 
         Parameters
         ----------
@@ -120,148 +351,546 @@ class Ai:
             The GPIOs number where we send our signals.
         """
         start_time: float = time.time()
+        first_frame_start: Optional[float] = time.perf_counter()
+
+        # The video stream is stopped when the window is closed too
+        with contextlib.closing(Ai.detections(self, gpio_led)) as records:
+            for detection in records:
+                if first_frame_start is not None:
+                    # The first processed frame ends the start of the program
+                    timing.record("first frame", time.perf_counter() - first_frame_start)
+                    timing.report()
+                    first_frame_start = None
+
+                if not Ai.show_and_write(self, detection):
+                    break
+
+        program_time = time.time() - start_time
+        logging.debug("--- {:.2f} seconds ---".format(program_time))
 
+    def detections(self, gpio_led: Optional[Union[int, Iterable[int]]] = None) -> Iterator[Detection]:
+        """Detect cyclists on the video stream and yield the boxes of each frame, as soon as the frame is processed.
+
+        Nothing is drawn, shown or written to the output video, `bicycle_detector` does it for each record, so the
+        detector can be embedded in another service consuming the detections. The video stream is stopped when the
+        generator is exhausted or closed.
+
+        Parameters
+        ----------
+        gpio_led : Union[int, Iterable[int]], optional
+            The GPIOs number where we send our signals, by default None to not signal the panels.
+            The regions of interest are signaled on their own GPIOs if `gpio_led` is given.
+
+        Yields
+        ------
+        Detection
+            The boxes of each frame of the video stream, in order, empty for the frames skipped without motion.
+
+        Examples
+        --------
+        >>> detector = Ai(False, False, "yolov2-tiny.weights", "yolov2-tiny.cfg", 320, "bicycle.mp4")
+        >>> for detection in detector.detections():
+        ...     if len(detection.boxes) > 0:
+        ...         print(detection.frame_index, detection.scores.max())
+        """
         # Start the frames per second
         fps = FPS().start()
+        Ai.start(self)
+
+        try:
+            frames = Ai.get_next_images(self)
+            while len(frames) > 0:
+                inferred, detected, crops = Ai.prepare_images(self, frames)
+                # Send the regions of all the frames to detect to the output layers at once
+                outs_per_crop = iter(Ai.forward(self, crops))
+                yield from Ai.__records(self, frames, inferred, detected, outs_per_crop, gpio_led, fps)
+
+                frames = Ai.get_next_images(self)
+        finally:
+            # Stop the timer and display FPS information
+            fps.stop()
+            Ai.stop(self, fps)
+
+    def __records(
+        self,
+        frames: List[numpy.ndarray],
+        inferred: List[bool],
+        detected: List[bool],
+        outs_per_crop: Iterator[numpy.ndarray],
+        gpio_led: Optional[Union[int, Iterable[int]]],
+        fps: FPS,
+    ) -> Iterator[Detection]:
+        # The class of the boxes in COCO, whose first class is the person
+        class_id = Ai.__object_detection_id - _IdYoloOutputLayer.PERSON
+
+        for index, (img, infer, detect) in enumerate(zip(frames, inferred, detected)):
+            parts: List[Tuple[numpy.ndarray, numpy.ndarray]] = []
+            if detect:
+                parts = Ai.detect_frame(self, img, outs_per_crop)
+            elif infer:
+                parts = Ai.track_boxes(self, img)
+
+            for _, confidences in parts:
+                Ai.__object_detection_counter += len(confidences)
+                # The detections are logged at most once per interval
+                self.__detection_summary.add(confidences)
+            if gpio_led is not None:
+                Ai.__debounce_parts(self, gpio_led, parts)
+
+            timestamp = self.__frame_timestamps[index]
+            if self.__governor is not None:
+                # The panels were told, the latency of the frame is known
+                self.__governor.record(time.monotonic() - timestamp)
 
-        read_ok, img = self.__video_stream.read()
-
-        while read_ok:
-            # Get dimensions of image
-            height, width, channels = img.shape
+            # Update the FPS counter
+            fps.update()
+            self.__frame_index += 1
 
-            # Convert image to Blob
-            # Scalefactor of 1/255 to scale the pixel values to [0..1]
-            blob = cv2.dnn.blobFromImage(
-                img, scalefactor=1 / 255, size=(self.__size, self.__size), mean=(0, 0, 0), swapRB=True, crop=False
+            boxes = numpy.concatenate([numpy.zeros((0, 4), dtype=numpy.int32)] + [part[0] for part in parts])
+            scores = numpy.concatenate([numpy.zeros(0, dtype=numpy.float32)] + [part[1] for part in parts])
+            yield Detection(
+                self.__frame_index - 1, timestamp, boxes, scores, numpy.full(len(boxes), class_id, numpy.int32), img
             )
-            # Set input for YOLO object detection
-            self.__network.setInput(blob)
-            # Send Blob image data to the three output layers
-            outs = self.__network.forward(self.__output_layers)
-
-            confidences = []
-            boxes = []
-
-            # Table of 85 columns for the 3 output layers: outs[0] (507 rows), outs[1] (2028 r) et outs[2] (8112 r)
-            # For each row: Cx, Cy, w, h, confidence + probability for each class
-            for out in outs:
-                for detection in out:
-                    confidence = detection[Ai.__object_detection_id]
-                    if confidence > Ai.__prob_threshold:
-                        # Object detected
-                        center_x = int(detection[_IdYoloOutputLayer.CENTER_X] * width)
-                        center_y = int(detection[_IdYoloOutputLayer.CENTER_Y] * height)
-                        w = int(detection[_IdYoloOutputLayer.WIDTH] * width)
-                        h = int(detection[_IdYoloOutputLayer.HEIGHT] * height)
-                        # Rectangle coordinates
-                        x = int(center_x - w / 2)
-                        y = int(center_y - h / 2)
-                        boxes.append([x, y, w, h])
-                        confidences.append(float(confidence))
 
-            # To remove multiple boxes that refer to the same object and keep one by Non Maximum Supression
-            indexes = cv2.dnn.NMSBoxes(boxes, confidences, score_threshold=0.5, nms_threshold=0.4)
+    def __debounce_parts(
+        self, gpio_led: Union[int, Iterable[int]], parts: List[Tuple[numpy.ndarray, numpy.ndarray]]
+    ) -> None:
+        # Each part of the image is signaled on its own GPIOs, nothing is detected in the frames skipped
+        if len(parts) == 0:
+            for panel_debouncer in self.__debouncers.values():
+                panel_debouncer.update(False)
+        for gpios, (boxes, _) in zip(Ai.__part_gpios(self, gpio_led), parts):
+            Ai.debounce(self, gpios, len(boxes) > 0)
 
-            img = Ai.draw_boxes_and_call_state_machine(self, indexes, boxes, confidences, img, gpio_led)
+    def show_and_write(self, detection: Detection) -> bool:
+        """Draw the boxes of a processed frame, then show and write it.
 
-            # Update the FPS counter
-            fps.update()
+        Parameters
+        ----------
+        detection : Detection
+            The record of the frame given by `detections`.
 
-            if self.__see_real_time_processing:
-                cv2.imshow("Image", img)
-                # Close video window by pressing 'x'
-                if cv2.waitKey(1) & 0xFF == ord("x"):
-                    break
+        Returns
+        -------
+        bool
+            `False` if the window of the real-time processing was closed, `True` otherwise.
+        """
+        img = Ai.draw_boxes(self, detection.image, detection.boxes, detection.scores)
+
+        if self.__see_real_time_processing:
+            cv2.imshow("Image", img)
+            # Close video window by pressing 'x'
+            if cv2.waitKey(1) & 0xFF == ord("x"):
+                return False
+
+        with metrics.stage(metrics.WRITE):
+            Ai.write_image(self, img, len(detection.boxes) > 0)
+
+        return True
+
+    def start(self) -> None:
+        """Start reading the frames on a dedicated thread, and writing the output video if it was asked."""
+        self.__capture.start()
+        if self.__output is not None:
+            self.__output.start()
+
+        Ai.__register_metrics(self)
+
+    def __register_metrics(self) -> None:
+        # The counters of the video stream, read when the metrics are requested
+        stream = self.__path_to_input_video if self.__path_to_input_video is not None else self.__camera_device
+        ring_buffer = self.__capture.ring_buffer
+        metrics.register(
+            "clearway_frames_captured_total",
+            "The number of frames read from the video stream.",
+            lambda: ring_buffer.frames_captured,
+            "counter",
+            stream=stream,
+        )
+        metrics.register(
+            "clearway_frames_dropped_total",
+            "The number of frames dropped by the capture, or not written to the output video.",
+            lambda: ring_buffer.frames_dropped,
+            "counter",
+            stream=stream,
+            stage=metrics.CAPTURE,
+        )
+        metrics.register(
+            "clearway_capture_age_seconds",
+            "The time between the capture of the last processed frame and its processing.",
+            lambda: ring_buffer.last_age,
+            stream=stream,
+        )
+
+        output = self.__output
+        if output is not None:
+            # Not written because the queue was full, or overwritten before being encoded in a clip
+            counter = "frames_dropped" if isinstance(output, writer.WriterThread) else "frames_lost"
+            metrics.register(
+                "clearway_frames_dropped_total",
+                "The number of frames dropped by the capture, or not written to the output video.",
+                lambda: getattr(output, counter),
+                "counter",
+                stream=stream,
+                stage=metrics.WRITE,
+            )
 
-            read_ok, img = Ai.get_next_image(self, img)
+    def frame_ready(self) -> bool:
+        """Tell if `get_next_images` returns without waiting, because a frame is read or the video stream ended."""
+        return self.__capture.ready
 
-        # Stop the timer and display FPS information
-        fps.stop()
-        program_time = time.time() - start_time
-        logging.debug("--- {:.2f} seconds ---".format(program_time))
+    def stop(self, fps: FPS) -> None:
+        """Log the statistics of the processing, then stop the video stream and the output video.
+
+        Parameters
+        ----------
+        fps : FPS
+            The stopped FPS counter updated for each image.
+        """
         logging.debug("[AI] elapsed time: {:.2f}".format(fps.elapsed()))
         logging.debug("[AI] approx. FPS: {:.2f}".format(fps.fps()))
         logging.debug("[AI] Nb of object detected: " + str(Ai.__object_detection_counter))
+        if self.__motion_gate is not None:
+            logging.debug("[AI] Nb of frames skipped without motion: {}".format(self.__motion_gate.frames_skipped))
+        if len(self.__trackers) > 0:
+            logging.debug("[AI] Nb of frames tracked without the network: {}".format(self.__frames_tracked))
+        self.__capture.log_counters()
+        self.__detection_summary.flush()
+        for panel_debouncer in self.__debouncers.values():
+            # The panels still signaling are stopped
+            panel_debouncer.close()
+        if self.__raw_cache is not None:
+            self.__raw_cache.close()
 
         Ai.stop_video_stream_and_destroy_window(self)
 
-    def draw_boxes_and_call_state_machine(
+        if self.__output is not None:
+            # Once the frames left are written
+            self.__output.log_counters()
+
+    def process_images(self, frames: List[numpy.ndarray], gpio_led: Union[int, Iterable[int]], fps: FPS) -> bool:
+        """Process the images read together, then show and write them.
+
+        Parameters
+        ----------
+        frames : List[numpy.ndarray]
+            The images given by `get_next_images`.
+        gpio_led : Union[int, Iterable[int]]
+            The GPIOs number where we send our signals.
+        fps : FPS
+            The FPS counter updated for each image.
+
+        Returns
+        -------
+        bool
+            `False` if the window of the real-time processing was closed, `True` otherwise.
+        """
+        inferred, detected, crops = Ai.prepare_images(self, frames)
+        # Send the regions of all the frames to detect to the output layers at once
+        return Ai.finish_images(self, frames, inferred, detected, iter(Ai.forward(self, crops)), gpio_led, fps)
+
+    def prepare_images(self, frames: List[numpy.ndarray]) -> Tuple[List[bool], List[bool], List[numpy.ndarray]]:
+        """Choose how each image is processed, and get the parts of the images to send to the network.
+
+        Parameters
+        ----------
+        frames : List[numpy.ndarray]
+            The images given by `get_next_images`.
+
+        Returns
+        -------
+        Tuple[List[bool], List[bool], List[numpy.ndarray]]
+            For each image, `True` if it is processed, by the network or by the trackers, and `True` if it is
+            processed by the network. Then the tiles of the images processed by the network, in order.
+        """
+        # Skip the network for the frames without motion
+        inferred = [self.__motion_gate is None or self.__motion_gate.should_infer(img) for img in frames]
+        # Only track the boxes of the other frames between two detections
+        detected = [infer and Ai.is_detection_due(self) for infer in inferred]
+        crops = [crop for img, detect in zip(frames, detected) if detect for crop in Ai.get_tiles(self, img)]
+        return inferred, detected, crops
+
+    def finish_images(
         self,
-        indexes: List[List[int]],
-        boxes: List[List[int]],
-        confidences: List[float],
-        img: numpy.ndarray,
+        frames: List[numpy.ndarray],
+        inferred: List[bool],
+        detected: List[bool],
+        outs_per_crop: Iterator[numpy.ndarray],
         gpio_led: Union[int, Iterable[int]],
-    ) -> numpy.ndarray:
-        """Draw boxes around object detected and inform the gpio stateMachinePanel if a cyclist is detected or not.
+        fps: FPS,
+    ) -> bool:
+        """Find or track the boxes of the images prepared by `prepare_images`, then show and write them like
+        `bicycle_detector` does.
+
+        Parameters
+        ----------
+        frames : List[numpy.ndarray]
+            The images given by `get_next_images`.
+        inferred : List[bool]
+            `True` for each image processed, given by `prepare_images`.
+        detected : List[bool]
+            `True` for each image processed by the network, given by `prepare_images`.
+        outs_per_crop : Iterator[numpy.ndarray]
+            The detections of YOLO in each part of the images given by `prepare_images`.
+        gpio_led : Union[int, Iterable[int]]
+            The GPIOs number where we send our signals.
+        fps : FPS
+            The FPS counter updated for each image.
+
+        Returns
+        -------
+        bool
+            `False` if the window of the real-time processing was closed, `True` otherwise.
+        """
+        for detection in Ai.__records(self, frames, inferred, detected, outs_per_crop, gpio_led, fps):
+            if not Ai.show_and_write(self, detection):
+                return False
+
+        return True
+
+    def is_detection_due(self) -> bool:
+        """Tell if the next frame must be processed by the network, or if its boxes can be tracked.
+
+        Returns
+        -------
+        bool
+            `True` for one frame every `detection_interval` frames, or every interval chosen by the governor.
+        """
+        # The governor may process fewer frames than the configured interval
+        interval = self.__governor.interval if self.__governor is not None else self.__detection_interval
+        due = self.__frames_since_detection == 0
+        self.__frames_since_detection = (self.__frames_since_detection + 1) % interval
+        return due
+
+    def get_crops(self, img: numpy.ndarray) -> List[numpy.ndarray]:
+        """Get the parts of the image sent to the network, the regions of interest or the whole image.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The image to process.
+
+        Returns
+        -------
+        List[numpy.ndarray]
+            The views of the image inside each region of interest, or the whole image if there is no region.
+        """
+        if len(self.__regions_of_interest) == 0:
+            return [img]
+        return [region.crop(img) for region in self.__regions_of_interest]
+
+    def get_tiles(self, img: numpy.ndarray) -> List[numpy.ndarray]:
+        """Get the images sent to the network, the tiles of each part of the image given by `get_crops`.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The image to process.
+
+        Returns
+        -------
+        List[numpy.ndarray]
+            The views of the image inside each tile of each part, part by part.
+        """
+        if self.__tiling[:2] == (1, 1):
+            return Ai.get_crops(self, img)
+        return [tile for crop in Ai.get_crops(self, img) for tile in tiling.split(crop, *self.__tiling)]
+
+    def detect_frame(
+        self, img: numpy.ndarray, outs_per_crop: Iterator[numpy.ndarray]
+    ) -> List[Tuple[numpy.ndarray, numpy.ndarray]]:
+        """Find the boxes in the detections of each part of the image given by `get_crops`.
 
         Parameters
         ----------
-        indexes : [[int]]
-            List of object indexes used to remove multiple boxes that refer to the same object.
-        boxes : [[int]]
-            List of boxes with their information (center_x, center_y, width, height).
-        confidences : [int]
-            List of detection confidences concerning objects on the image being processed.
         img : numpy.ndarray
             The image being processed.
-        gpio_led : int
-            The gpio number where we send our signals.
+        outs_per_crop : Iterator[numpy.ndarray]
+            The detections of YOLO in the tiles of the image given by `get_tiles`, the next ones are consumed.
+
+        Returns
+        -------
+        List[Tuple[numpy.ndarray, numpy.ndarray]]
+            The boxes kept in each part of the image, in the coordinates of the image, and their confidences.
         """
-        # If something is detected
-        if len(boxes) != 0:
-            for i in range(len(boxes)):
-                if i in indexes:
-                    Ai.__object_detection_counter += 1
-                    logging.info(
-                        "[AI] {} detected with a probability of: {:.2f} %".format(
-                            Ai.__object_detection_id.name, confidences[i] * 100
-                        )
-                    )
-
-                    stateMachinePanel.signal(gpio_led)
-
-                    x, y, w, h = boxes[i]
-                    confidence_label = int(confidences[i] * 100)
-                    cv2.rectangle(img, (x, y), (x + w, y + h), Ai.__output_color, 2)
-                    cv2.putText(
-                        img,
-                        f"{Ai.__object_detection_id.name, confidence_label}",
-                        (x - 25, y + 75),
-                        Ai.__font,
-                        2,
-                        Ai.__output_color,
-                        2,
-                    )
-            stateMachinePanel.end_signal(gpio_led)
+        regions: List[Optional[roi.RegionOfInterest]] = list(self.__regions_of_interest) or [None]
+        parts = []
+        nb_tiles = self.__tiling[0] * self.__tiling[1]
 
-        return img
+        for index, (region, crop) in enumerate(zip(regions, Ai.get_crops(self, img))):
+            # Get dimensions of the processed part of the image
+            height, width = crop.shape[:2]
+
+            if nb_tiles == 1:
+                outs = next(outs_per_crop)
+            else:
+                # The rows of the tiles in the coordinates of the part, so the boxes found in the overlap of two tiles
+                # are merged by the Non Maximum Suppression of the part
+                outs = tiling.merge_outputs(
+                    [next(outs_per_crop) for _ in range(nb_tiles)], width, height, *self.__tiling
+                )
+            if self.__raw_cache is not None:
+                self.__raw_cache.add(self.__frame_index, index, outs)
+
+            # Table of 85 columns for the output layers: for each row Cx, Cy, w, h, confidence + probability for each
+            # class, decoded for all the rows at once
+            with metrics.stage(metrics.DECODE):
+                boxes, confidences = decode.decode_output_layers(
+                    (outs,), width, height, Ai.__object_detection_id, Ai.__prob_threshold
+                )
+
+                if region is not None:
+                    # Back to the coordinates of the image, only the boxes centered in the region are kept
+                    boxes, confidences = region.to_frame(img, boxes, confidences)
+
+            # To remove multiple boxes that refer to the same object and keep one by Non Maximum Supression
+            with metrics.stage(metrics.NMS):
+                indexes = decode.non_maximum_suppression(boxes, confidences, score_threshold=0.5, nms_threshold=0.4)
+
+            if len(self.__trackers) > 0:
+                # The tracked boxes are the kept boxes, with their identity
+                boxes, confidences, _ = self.__trackers[index].update(img, boxes[indexes], confidences[indexes])
+                parts.append((boxes, confidences))
+            else:
+                parts.append((boxes[indexes], confidences[indexes]))
+
+        return parts
+
+    def track_boxes(self, img: numpy.ndarray) -> List[Tuple[numpy.ndarray, numpy.ndarray]]:
+        """Move the boxes of the last detection of each part of the image to the image not processed by the network.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The image being processed.
+
+        Returns
+        -------
+        List[Tuple[numpy.ndarray, numpy.ndarray]]
+            The boxes tracked in each part of the image, in the coordinates of the image, and their confidences.
+        """
+        self.__frames_tracked += 1
+        return [region_tracker.track(img)[:2] for region_tracker in self.__trackers]
+
+    def __part_gpios(self, gpio_led: Union[int, Iterable[int]]) -> List[Union[int, Iterable[int]]]:
+        # The GPIOs signaling each part of the image, the GPIOs of the regions or the given ones for the whole image
+        if len(self.__regions_of_interest) == 0:
+            return [gpio_led]
+        return [region.panel_gpios for region in self.__regions_of_interest]
 
-    def get_next_image(self, img: numpy.ndarray) -> Tuple[bool, numpy.ndarray]:
-        """Write the processed image to the output video if it was asked and get the next image.
+    def draw_boxes(self, img: numpy.ndarray, boxes: numpy.ndarray, confidences: numpy.ndarray) -> numpy.ndarray:
+        """Draw boxes around the objects detected.
 
         Parameters
         ----------
         img : numpy.ndarray
-            The image processed.
+            The image being processed.
+        boxes : numpy.ndarray
+            Array of boxes with their information (x, y, width, height).
+        confidences : numpy.ndarray
+            Array of detection confidences concerning objects on the image being processed.
+
+        Returns
+        -------
+        numpy.ndarray
+            The image with the boxes drawn.
+        """
+        with metrics.stage(metrics.DRAW):
+            for (x, y, w, h), confidence in zip(boxes.tolist(), confidences.tolist()):
+                confidence_label = int(confidence * 100)
+                cv2.rectangle(img, (x, y), (x + w, y + h), Ai.__output_color, 2)
+                cv2.putText(
+                    img,
+                    f"{Ai.__object_detection_id.name, confidence_label}",
+                    (x - 25, y + 75),
+                    Ai.__font,
+                    2,
+                    Ai.__output_color,
+                    2,
+                )
+
+        return img
+
+    def debounce(self, gpio_led: Union[int, Iterable[int]], detected: bool) -> None:
+        """Tell the panels to start signaling on the rising edge of the detections, and to stop after the hold time.
+
+        Parameters
+        ----------
+        gpio_led : Union[int, Iterable[int]]
+            The GPIOs number where we send our signals.
+        detected : bool
+            `True` if something is detected in the processed image, or in its region signaled by `gpio_led`.
+        """
+        gpios = frozenset([gpio_led] if isinstance(gpio_led, int) else gpio_led)
+        if gpios not in self.__debouncers:
+            self.__debouncers[gpios] = debouncer.Debouncer(set(gpios), *self.__debounce_settings)
+        self.__debouncers[gpios].update(detected)
+
+    def forward(self, frames: List[numpy.ndarray]) -> List[numpy.ndarray]:
+        """Send the frames to YOLO together.
+
+        Parameters
+        ----------
+        frames : List[numpy.ndarray]
+            The images to process.
 
         Returns
         -------
-        Tuple[bool, numpy.ndarray]
-            The next image.
+        List[numpy.ndarray]
+            The (rows, 85) array of detections of each image.
+        """
+        if len(frames) == 0:
+            return []
+
+        return self.__backend.infer(frames)
+
+    def write_image(self, img: numpy.ndarray, detected: bool = False) -> None:
+        """Hand the processed image over to the writer thread of the output video or to the clip recorder.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The image processed, copied so that its slot of the capture ring buffer can be reused.
+        detected : bool, optional
+            `True` if something is detected in the image, to record a clip around it, by default `False`.
         """
-        # Write the image to the output video
-        if isinstance(self.__output_video, cv2.VideoWriter):
-            self.__output_video.write(img)
+        if isinstance(self.__output, writer.WriterThread):
+            self.__output.write(img)
+        elif isinstance(self.__output, recorder.EventRecorder):
+            self.__output.add(img, detected)
+
+    def get_next_images(self) -> List[numpy.ndarray]:
+        """Get the next images to process together, at most `batch_size` of them.
 
-        # Read the next frame
-        read_ok, img = self.__video_stream.read()
+        The images previously returned are released.
+
+        Returns
+        -------
+        List[numpy.ndarray]
+            The next images, empty at the end of the video stream.
+        """
+        frames: List[numpy.ndarray] = []
+        self.__frame_timestamps = []
+
+        with metrics.stage(metrics.CAPTURE):
+            read_ok, img = self.__capture.read()
+            while read_ok:
+                frames.append(img)
+                self.__frame_timestamps.append(self.__capture.ring_buffer.last_timestamp)
+                if len(frames) == self.__batch_size:
+                    break
+                # Keep the images already read until the whole batch is processed
+                read_ok, img = self.__capture.read(release_previous=False)
 
-        return read_ok, img
+        return frames
 
     def stop_video_stream_and_destroy_window(self) -> None:
         """Stop the video stream and destroy the openCV window in case of real-time processing."""
+        self.__capture.stop()
+
+        if self.__output is not None:
+            self.__output.stop()
+
         if self.__path_to_input_video is None:
             self.__video_stream.release()
 
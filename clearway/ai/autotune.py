@@ -0,0 +1,302 @@
+"""Choose the size of the blob, the backend and the number of threads on the host running ClearWay.
+
+Every combination of `SIZES`, available backends and thread counts is benchmarked on a few frames. The larger the
+size of the blob, the more accurate the detection, so the largest size reaching the target FPS is chosen, with its
+fastest backend and number of threads. If no combination reaches the target, the fastest one is chosen.
+
+The choice is cached in a JSON file, keyed by the model of the CPU, the hash of the YOLO files and the target FPS,
+so the benchmark only runs again when one of them changes.
+"""
+import time
+import logging
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy
+import cv2
+from clearway.ai import backend, cache
+
+SIZES: List[int] = [320, 416, 608]
+"""The sizes of the blob benchmarked, from the fastest to the most accurate."""
+
+NB_FRAMES: int = 10
+"""The number of frames processed to benchmark a combination, after a warm up frame."""
+
+CACHE_PATH: str = os.path.join(cache.CACHE_FOLDER, "autotune.json")
+"""The default path to the file caching the choices."""
+
+HASHES_NAME: str = "hashes.json"
+"""The name of the file remembering the digest of the model files, in the folder of the file caching the choices."""
+
+
+class Setting(NamedTuple):
+    """A combination of options of the inference, and its speed on the host."""
+
+    size: int
+    """The size of the images converted to blob."""
+    backend_name: str
+    """The name of the backend, one of `backend.BACKENDS`."""
+    threads: int
+    """The number of threads of the backend."""
+    fps: float
+    """The number of frames processed per second."""
+
+
+def cpu_model() -> str:
+    """Return the model of the CPU of the host.
+
+    Returns
+    -------
+    str
+        The model name given by `/proc/cpuinfo`, or by `platform` if it is not available.
+    """
+    try:
+        with open("/proc/cpuinfo") as file:
+            for line in file:
+                # "model name" on x86, "Model" on a Raspberry Pi
+                key, _, value = line.partition(":")
+                if key.strip() in ("model name", "Model", "Hardware"):
+                    return value.strip()
+    except OSError:
+        pass
+
+    return platform.processor() or platform.machine()
+
+
+def hash_files(*paths: str, memo_path: Optional[str] = None) -> str:
+    """Return the SHA-256 of the content of the files.
+
+    Parameters
+    ----------
+    *paths : str
+        The paths to the files, the empty ones are ignored.
+    memo_path : str, optional
+        The JSON file remembering the digest of the files by their `cache.file_key`, by default None to always read
+        the files. With it, the files are only read again when their path, size or modification time changes, so the
+        tens of MB of weights are not read from the SD card on every start.
+
+    Returns
+    -------
+    str
+        The hexadecimal digest.
+    """
+    memo = _read_memo(memo_path) if memo_path is not None else {}
+    stat_key = cache.file_key(*paths)
+    if stat_key in memo:
+        return memo[stat_key]
+
+    digest = hashlib.sha256()
+    for path in paths:
+        if path:
+            with open(path, "rb") as file:
+                chunk = file.read(1 << 20)
+                while len(chunk) > 0:
+                    digest.update(chunk)
+                    chunk = file.read(1 << 20)
+
+    if memo_path is not None:
+        memo[stat_key] = digest.hexdigest()
+        _write_memo(memo_path, memo)
+
+    return digest.hexdigest()
+
+
+def _read_memo(memo_path: str) -> Dict[str, str]:
+    """Return the digests remembered by `hash_files`, empty if the file is missing or broken."""
+    try:
+        with open(memo_path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        logging.debug("[AUTOTUNE] No usable digests in %s", memo_path)
+        return {}
+
+
+def _write_memo(memo_path: str, memo: Dict[str, str]) -> None:
+    """Remember the digests of `hash_files`, only logged if the file can not be written."""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(memo_path)), exist_ok=True)
+        with open(memo_path, "w") as file:
+            json.dump(memo, file, indent=4)
+    except OSError as error:
+        logging.warning("[AUTOTUNE] The digest can not be remembered in %s: %s", memo_path, error)
+
+
+def thread_counts() -> List[int]:
+    """Return the numbers of threads benchmarked: 1, half and all the cores."""
+    nb_cores = os.cpu_count() or 1
+    return sorted({1, max(1, nb_cores // 2), nb_cores})
+
+
+def backend_names(yolo_weights: str) -> List[str]:
+    """Return the backends able to run the model: OpenCV, and ONNX Runtime for an installed ONNX model."""
+    names = [backend.OPENCV]
+    if yolo_weights.endswith(".onnx") and importlib.util.find_spec("onnxruntime") is not None:
+        names.append(backend.ONNXRUNTIME)
+    return names
+
+
+def read_frames(path_to_input_video: Optional[str] = None) -> List[numpy.ndarray]:
+    """Return the frames of the benchmark, the first frames of the video or random 640x480 frames.
+
+    Parameters
+    ----------
+    path_to_input_video : str, optional
+        The path to the video, by default None to use random frames.
+
+    Returns
+    -------
+    List[numpy.ndarray]
+        `NB_FRAMES` BGR frames, the last frame of a short video is repeated.
+    """
+    frames: List[numpy.ndarray] = []
+    if path_to_input_video is not None:
+        video_stream = cv2.VideoCapture(path_to_input_video)
+        read_ok, img = video_stream.read()
+        while read_ok and len(frames) < NB_FRAMES:
+            frames.append(img)
+            read_ok, img = video_stream.read()
+        video_stream.release()
+
+    if len(frames) == 0:
+        generator = numpy.random.default_rng(0)
+        frames = [generator.integers(0, 256, (480, 640, 3), dtype=numpy.uint8)]
+
+    return frames + [frames[-1]] * (NB_FRAMES - len(frames))
+
+
+def benchmark(yolo_weights: str, yolo_cfg: str, frames: List[numpy.ndarray]) -> List[Setting]:
+    """Measure the speed of every combination of size, backend and number of threads.
+
+    The combinations that can not run, for instance a size not supported by an ONNX model, are skipped.
+
+    Parameters
+    ----------
+    yolo_weights : str
+        The path to the weights file of YOLO, or to the ONNX model.
+    yolo_cfg : str
+        The path to the config file of YOLO.
+    frames : List[numpy.ndarray]
+        The BGR frames processed.
+
+    Returns
+    -------
+    List[Setting]
+        The combinations that ran, and their speed.
+    """
+    settings = []
+    default_threads = cv2.getNumThreads()
+
+    for size in SIZES:
+        for backend_name in backend_names(yolo_weights):
+            for threads in thread_counts():
+                try:
+                    detector = backend.create(backend_name, yolo_weights, yolo_cfg, size, threads)
+                    detector.infer(frames[:1])
+                    start_time = time.perf_counter()
+                    for img in frames:
+                        detector.infer([img])
+                    fps = len(frames) / (time.perf_counter() - start_time)
+                except (cv2.error, RuntimeError, ValueError) as error:
+                    logging.debug(
+                        "[AUTOTUNE] %s size %d with %d threads skipped: %s", backend_name, size, threads, error
+                    )
+                    continue
+
+                logging.debug("[AUTOTUNE] %s size %d with %d threads: %.2f FPS", backend_name, size, threads, fps)
+                settings.append(Setting(size, backend_name, threads, fps))
+
+    cv2.setNumThreads(default_threads)
+    return settings
+
+
+def choose(settings: List[Setting], target_fps: float) -> Setting:
+    """Choose the most accurate combination reaching the target FPS, or the fastest one if none reaches it.
+
+    Parameters
+    ----------
+    settings : List[Setting]
+        The benchmarked combinations, at least one.
+    target_fps : float
+        The minimum number of frames processed per second.
+
+    Returns
+    -------
+    Setting
+        The chosen combination.
+    """
+    fast_enough = [setting for setting in settings if setting.fps >= target_fps]
+    if len(fast_enough) == 0:
+        logging.warning("[AUTOTUNE] No combination reaches %.1f FPS, the fastest one is used", target_fps)
+        return max(settings, key=lambda setting: setting.fps)
+
+    return max(fast_enough, key=lambda setting: (setting.size, setting.fps))
+
+
+def autotune(
+    yolo_weights: str,
+    yolo_cfg: str,
+    target_fps: float,
+    path_to_input_video: Optional[str] = None,
+    cache_path: str = CACHE_PATH,
+) -> Setting:
+    """Return the combination of options to use on the host, from the cache or by benchmarking them.
+
+    Parameters
+    ----------
+    yolo_weights : str
+        The path to the weights file of YOLO, or to the ONNX model.
+    yolo_cfg : str
+        The path to the config file of YOLO.
+    target_fps : float
+        The minimum number of frames processed per second.
+    path_to_input_video : str, optional
+        The path to a video whose first frames are benchmarked, by default None to use random frames.
+    cache_path : str, optional
+        The path to the JSON file caching the choices, by default `CACHE_PATH`.
+
+    Returns
+    -------
+    Setting
+        The chosen combination.
+
+    Raises
+    ------
+    RuntimeError
+        None of the combinations can run the model.
+    """
+    # The digest of the files is remembered next to the choices, the files are only read again when they change
+    hashes_path = os.path.join(os.path.dirname(os.path.abspath(cache_path)), HASHES_NAME)
+    key = "{}|{}|{}".format(cpu_model(), hash_files(yolo_weights, yolo_cfg, memo_path=hashes_path), target_fps)
+
+    cache: Dict[str, Dict[str, object]] = {}
+    try:
+        with open(cache_path) as file:
+            cache = json.load(file)
+        if key in cache:
+            setting = Setting(**cache[key])  # type: ignore[arg-type]
+            logging.info("[AUTOTUNE] Cached choice: %s", setting)
+            return setting
+    except (OSError, ValueError, TypeError):
+        logging.debug("[AUTOTUNE] No usable cache in %s", cache_path)
+
+    logging.info("[AUTOTUNE] Benchmark the inference on %s", cpu_model())
+    settings = benchmark(yolo_weights, yolo_cfg, read_frames(path_to_input_video))
+    if len(settings) == 0:
+        raise RuntimeError("[AUTOTUNE] None of the combinations can run the model {}".format(yolo_weights))
+
+    setting = choose(settings, target_fps)
+    logging.info("[AUTOTUNE] Chosen: %s", setting)
+
+    cache[key] = setting._asdict()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        with open(cache_path, "w") as file:
+            json.dump(cache, file, indent=4)
+    except OSError as error:
+        logging.warning("[AUTOTUNE] The choice can not be cached in %s: %s", cache_path, error)
+
+    return setting
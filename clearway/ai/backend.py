@@ -0,0 +1,328 @@
+"""Run YOLO on the frames with an interchangeable inference engine.
+
+Every backend has the same contract: `infer` takes a list of BGR frames and returns, for each frame, the rows of
+detections of YOLO as a single (rows, 85) array: Cx, Cy, w, h relative to the frame, the objectness and the score of
+each class multiplied by the objectness, like the region layer of Darknet. The rows are then decoded by
+`clearway.ai.decode` whatever the backend.
+
+- `OPENCV`: the Darknet weights and configuration files run by the DNN module of OpenCV.
+- `ONNXRUNTIME`: an ONNX export of the network run by ONNX Runtime on the CPU, the package `onnxruntime` must be
+  installed. The outputs of the model must already be the rows of detections described above.
+"""
+from abc import ABC, abstractmethod
+import logging
+import os
+from typing import Any, List, Optional
+
+import numpy
+import cv2
+from clearway.ai import cache, decode, metrics
+
+OPENCV: str = "opencv"
+"""The name of the backend running the Darknet files with OpenCV DNN."""
+
+ONNXRUNTIME: str = "onnxruntime"
+"""The name of the backend running an ONNX model with ONNX Runtime."""
+
+BACKENDS: List[str] = [OPENCV, ONNXRUNTIME]
+"""The names of the available backends."""
+
+
+def to_blob(frames: List[numpy.ndarray], size: int) -> numpy.ndarray:
+    """Convert the frames to the input blob of YOLO.
+
+    Parameters
+    ----------
+    frames : List[numpy.ndarray]
+        The BGR frames, at least one.
+    size : int
+        The size of the images converted to blob.
+
+    Returns
+    -------
+    numpy.ndarray
+        The (N, 3, size, size) blob of `float32` RGB pixels between 0 and 1.
+    """
+    # Scalefactor of 1/255 to scale the pixel values to [0..1]
+    if len(frames) == 1:
+        return cv2.dnn.blobFromImage(
+            frames[0], scalefactor=1 / 255, size=(size, size), mean=(0, 0, 0), swapRB=True, crop=False
+        )
+    return cv2.dnn.blobFromImages(
+        frames, scalefactor=1 / 255, size=(size, size), mean=(0, 0, 0), swapRB=True, crop=False
+    )
+
+
+class Preprocessor:
+    """Convert the frames to the input blob of YOLO in preallocated buffers, with the same result as `to_blob`.
+
+    Each frame is resized into a preallocated image, then each channel is extracted in reverse order into a preallocated
+    plane, converted straight into the preallocated blob and scaled to [0..1] in place. Once the blob is allocated for
+    the largest batch, the conversion allocates nothing, not even the casting buffers of NumPy.
+
+    Parameters
+    ----------
+    size : int
+        The size of the images converted to blob.
+    """
+
+    __scale: numpy.float32 = numpy.float32(1 / 255)
+
+    def __init__(self, size: int) -> None:
+        self.__size: int = size
+        self.__resized: numpy.ndarray = numpy.empty((size, size, 3), dtype=numpy.uint8)
+        self.__plane: numpy.ndarray = numpy.empty((size, size), dtype=numpy.uint8)
+        self.__blob: numpy.ndarray = numpy.empty((0, 3, size, size), dtype=numpy.float32)
+
+    def to_blob(self, frames: List[numpy.ndarray], batch_size: Optional[int] = None) -> numpy.ndarray:
+        """Convert the frames to the input blob of YOLO.
+
+        The blob is overwritten by the next call, it must be given to the network before.
+
+        Parameters
+        ----------
+        frames : List[numpy.ndarray]
+            The BGR frames, at least one.
+        batch_size : int, optional
+            The number of images of the blob, the images after the frames are black, by default None for one image
+            per frame.
+
+        Returns
+        -------
+        numpy.ndarray
+            The (N, 3, size, size) blob of `float32` RGB pixels between 0 and 1.
+        """
+        nb_frames = len(frames)
+        nb_images = max(nb_frames, batch_size or 0)
+        if len(self.__blob) < nb_images:
+            self.__blob = numpy.zeros((nb_images, 3, self.__size, self.__size), dtype=numpy.float32)
+
+        for index, frame in enumerate(frames):
+            cv2.resize(frame, (self.__size, self.__size), dst=self.__resized, interpolation=cv2.INTER_LINEAR)
+            for channel in range(3):
+                # The BGR channels of the frame are the RGB planes of the blob in reverse order
+                cv2.extractChannel(self.__resized, 2 - channel, self.__plane)
+                numpy.copyto(self.__blob[index, channel], self.__plane)
+                numpy.multiply(self.__blob[index, channel], Preprocessor.__scale, out=self.__blob[index, channel])
+
+        if nb_images > nb_frames:
+            self.__blob[nb_frames:nb_images].fill(0)
+
+        return self.__blob[:nb_images]
+
+
+def merge_layers(outs: List[numpy.ndarray], nb_frames: int) -> List[numpy.ndarray]:
+    """Split the output layers of a batch of frames and merge the layers of each frame into a single array.
+
+    Parameters
+    ----------
+    outs : List[numpy.ndarray]
+        The output layers of the network for the whole batch.
+    nb_frames : int
+        The number of frames of the batch.
+
+    Returns
+    -------
+    List[numpy.ndarray]
+        The (rows, 85) array of detections of each frame.
+    """
+    return [
+        layers[0] if len(layers) == 1 else numpy.concatenate(layers) for layers in decode.split_batch(outs, nb_frames)
+    ]
+
+
+class Backend(ABC):
+    """An inference engine running YOLO.
+
+    Parameters
+    ----------
+    size : int
+        The size of the images converted to blob.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size: int = size
+        """The size of the images converted to blob."""
+        self.preprocessor: Preprocessor = Preprocessor(size)
+        """The conversion of the frames to the input blob, reusing its buffers."""
+
+    @abstractmethod
+    def infer(self, frames: List[numpy.ndarray]) -> List[numpy.ndarray]:
+        """Detect the objects of the frames.
+
+        Parameters
+        ----------
+        frames : List[numpy.ndarray]
+            The BGR frames to process together, at least one.
+
+        Returns
+        -------
+        List[numpy.ndarray]
+            The (rows, 85) array of detections of each frame.
+        """
+
+
+class OpenCvBackend(Backend):
+    """Run the Darknet files of YOLO with the DNN module of OpenCV.
+
+    Parameters
+    ----------
+    yolo_weights : str
+        The path to the weights file of YOLO.
+    yolo_cfg : str
+        The path to the config file of YOLO.
+    size : int
+        The size of the images converted to blob.
+    threads : int, optional
+        The number of threads of OpenCV, by default 0 to keep the number chosen by OpenCV.
+    shared : bool, optional
+        `True` to share the network read from the same files with the other backends, by default `True`.
+        A network run on blobs of another size is reallocated by OpenCV on the next forward pass, so the backends of
+        different sizes used in turn must not share it.
+    """
+
+    def __init__(self, yolo_weights: str, yolo_cfg: str, size: int, threads: int = 0, shared: bool = True) -> None:
+        super().__init__(size)
+
+        if threads > 0:
+            cv2.setNumThreads(threads)
+
+        # Read the deep learning network Yolo
+        self.__network: cv2.dnn_Net = (
+            cache.read_network(yolo_weights, yolo_cfg) if shared else cv2.dnn.readNet(yolo_weights, yolo_cfg)
+        )
+        # Find names of all layers of the YOLO model architecture
+        layer_names = self.__network.getLayerNames()
+        # The indexes are given as an (N, 1) array before OpenCV 4.5.4 and as an (N,) array since
+        self.__output_layers: List[str] = [
+            layer_names[i - 1] for i in numpy.asarray(self.__network.getUnconnectedOutLayers()).reshape(-1)
+        ]
+
+    def infer(self, frames: List[numpy.ndarray]) -> List[numpy.ndarray]:
+        with metrics.stage(metrics.PREPROCESS):
+            blob = self.preprocessor.to_blob(frames)
+
+        with metrics.stage(metrics.FORWARD):
+            # Set input for YOLO object detection
+            self.__network.setInput(blob)
+            # Send Blob image data to the output layers
+            outs = self.__network.forward(self.__output_layers)
+            return merge_layers(outs, len(frames))
+
+
+class OnnxRuntimeBackend(Backend):
+    """Run an ONNX export of YOLO with ONNX Runtime on the CPU.
+
+    The graph optimized by ONNX Runtime is saved in the cache on the first start and loaded by the next ones,
+    see `clearway.ai.cache`.
+
+    Parameters
+    ----------
+    model : str
+        The path to the ONNX model.
+    size : int
+        The size of the images converted to blob.
+    threads : int, optional
+        The number of threads running each operator, by default 0 to let ONNX Runtime choose.
+
+    Raises
+    ------
+    ImportError
+        The package `onnxruntime` is not installed.
+    """
+
+    def __init__(self, model: str, size: int, threads: int = 0) -> None:
+        super().__init__(size)
+
+        import onnxruntime  # Optional dependency, only needed by this backend
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+
+        optimized_model = cache.optimized_model_path(model, onnxruntime.__version__)
+        temporary_file = None
+        if os.path.isfile(optimized_model):
+            logging.debug("[AI] Load the optimized graph %s", optimized_model)
+            model = optimized_model
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+        else:
+            # The extended optimizations do not depend on the CPU, unlike the layout ones
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+            try:
+                os.makedirs(os.path.dirname(optimized_model), exist_ok=True)
+                temporary_file = optimized_model + ".tmp.{}".format(os.getpid())
+                options.optimized_model_filepath = temporary_file
+            except OSError as error:
+                logging.warning("[AI] The optimized graph can not be cached: %s", error)
+
+        self.__session: Any = onnxruntime.InferenceSession(model, options, providers=["CPUExecutionProvider"])
+        if temporary_file is not None and os.path.isfile(temporary_file):
+            cache.save_optimized_model(optimized_model, temporary_file)
+
+        self.__input_name: str = self.__session.get_inputs()[0].name
+        self.__batch_size: Optional[int] = None
+
+        batch_dimension = self.__session.get_inputs()[0].shape[0]
+        if isinstance(batch_dimension, int):
+            # The model was exported with a fixed batch size
+            self.__batch_size = batch_dimension
+
+        logging.debug("[AI] ONNX Runtime %s, model inputs: %s", onnxruntime.__version__, self.__session.get_inputs())
+
+    def infer(self, frames: List[numpy.ndarray]) -> List[numpy.ndarray]:
+        if self.__batch_size is not None and self.__batch_size != len(frames):
+            # The frames are sent in chunks of the batch size of the model
+            outs: List[numpy.ndarray] = []
+            for start in range(0, len(frames), self.__batch_size):
+                stop = start + self.__batch_size
+                outs.extend(OnnxRuntimeBackend.__infer_chunk(self, frames[start:stop]))
+            return outs
+
+        return OnnxRuntimeBackend.__infer_chunk(self, frames)
+
+    def __infer_chunk(self, frames: List[numpy.ndarray]) -> List[numpy.ndarray]:
+        """Run the model on at most one batch of frames, the last chunk is padded to the batch size."""
+        with metrics.stage(metrics.PREPROCESS):
+            blob = self.preprocessor.to_blob(frames, self.__batch_size)
+
+        with metrics.stage(metrics.FORWARD):
+            outs = self.__session.run(None, {self.__input_name: blob})
+            return merge_layers(outs, len(blob))[: len(frames)]
+
+
+def create(name: str, yolo_weights: str, yolo_cfg: str, size: int, threads: int = 0, shared: bool = True) -> Backend:
+    """Create the backend of the given name.
+
+    Parameters
+    ----------
+    name : str
+        The name of the backend, one of `BACKENDS`.
+    yolo_weights : str
+        The path to the weights file of YOLO, or to the ONNX model for `ONNXRUNTIME`.
+    yolo_cfg : str
+        The path to the config file of YOLO, not used by `ONNXRUNTIME`.
+    size : int
+        The size of the images converted to blob.
+    threads : int, optional
+        The number of threads of the inference engine, by default 0 to let the engine choose.
+    shared : bool, optional
+        `True` to share the network of `OPENCV` read from the same files with the other backends, by default `True`.
+
+    Returns
+    -------
+    Backend
+        The backend.
+
+    Raises
+    ------
+    ValueError
+        The backend is unknown.
+    """
+    logging.info("[AI] Use the %s backend, size %d, %s threads", name, size, threads or "default")
+
+    if name == OPENCV:
+        return OpenCvBackend(yolo_weights, yolo_cfg, size, threads, shared)
+    if name == ONNXRUNTIME:
+        return OnnxRuntimeBackend(yolo_weights, size, threads)
+
+    raise ValueError("[AI] Unknown backend: {}, expected one of {}".format(name, BACKENDS))
@@ -0,0 +1,332 @@
+"""Benchmark the whole processing of the frames for several sizes and backends.
+
+Each combination runs the real `ai.Ai` pipeline, headless and without panel, over a clip or synthetic frames: the
+capture thread, the conversion to blob, the network, the decoding, the drawing and the handing over of the frames.
+The first frames warm the network up and are not measured, then the clip is replayed until enough frames are measured.
+The time spent opening and closing the clip is not measured, so the results are the steady state of the pipeline.
+
+The report gives the throughput and the 50th, 95th and 99th percentiles of the latency of each stage of
+`metrics.STAGES`, and of the whole processing of a frame (`TOTAL`). It is saved as JSON and compared with a previous
+report, for example the one of the last release on the same host.
+"""
+import time
+import importlib.util
+import logging
+import os
+import tempfile
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy
+import cv2
+from imutils.video import FPS
+from clearway.ai import ai, autotune, backend, metrics
+
+TOTAL: str = "total"
+"""The name of the latency of the whole processing of a frame, from the network to the output video."""
+
+PERCENTILES: Dict[str, float] = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+"""The percentiles of the latency reported, by name."""
+
+NB_SYNTHETIC_FRAMES: int = 30
+"""The number of random frames of the clip benchmarked without input video, replayed as many times as needed."""
+
+
+class Result(NamedTuple):
+    """The speed of the pipeline with a combination of options."""
+
+    size: int
+    """The size of the images converted to blob."""
+    backend_name: str
+    """The name of the backend, one of `backend.BACKENDS`."""
+    threads: int
+    """The number of threads of the backend, 0 if the backend chooses."""
+    frames: int
+    """The number of frames measured."""
+    fps: float
+    """The number of frames processed per second."""
+    latency: Dict[str, Dict[str, float]]
+    """The percentiles of `PERCENTILES` of the latency of each stage and of `TOTAL`, in milliseconds."""
+
+
+class Comparison(NamedTuple):
+    """A result compared with the result of the same combination in a baseline report."""
+
+    size: int
+    """The size of the images converted to blob."""
+    backend_name: str
+    """The name of the backend."""
+    threads: int
+    """The number of threads of the backend."""
+    fps: float
+    """The number of frames processed per second."""
+    baseline_fps: float
+    """The number of frames processed per second in the baseline."""
+    p99: float
+    """The 99th percentile of the latency of a frame, in milliseconds."""
+    baseline_p99: float
+    """The 99th percentile of the latency of a frame in the baseline, in milliseconds."""
+    regressed: bool
+    """`True` if the throughput or the 99th percentile is worse than the baseline beyond the tolerance."""
+
+
+def write_synthetic_video(path: str, nb_frames: int = NB_SYNTHETIC_FRAMES) -> None:
+    """Write a clip of random 640x480 frames, the same on each call.
+
+    Parameters
+    ----------
+    path : str
+        The path to the MP4 video.
+    nb_frames : int, optional
+        The number of frames, by default `NB_SYNTHETIC_FRAMES`.
+    """
+    generator = numpy.random.default_rng(0)
+    video_writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 15, (640, 480))
+    for _ in range(nb_frames):
+        video_writer.write(generator.integers(0, 256, (480, 640, 3), dtype=numpy.uint8))
+    video_writer.release()
+
+
+def run(
+    yolo_weights: str,
+    yolo_cfg: str,
+    size: int,
+    path_to_input_video: str,
+    backend_name: str = backend.OPENCV,
+    threads: int = 0,
+    nb_frames: int = 100,
+    warmup: int = 10,
+    batch_size: int = 1,
+) -> Result:
+    """Measure the pipeline with a combination of options.
+
+    Parameters
+    ----------
+    yolo_weights : str
+        The path to the weights file of YOLO, or to the ONNX model.
+    yolo_cfg : str
+        The path to the config file of YOLO.
+    size : int
+        The size of the images converted to blob.
+    path_to_input_video : str
+        The path to the clip processed, replayed until `warmup` and `nb_frames` frames are processed.
+    backend_name : str, optional
+        The name of the backend, one of `backend.BACKENDS`, by default `backend.OPENCV`.
+    threads : int, optional
+        The number of threads of the backend, by default 0 to let the backend choose.
+    nb_frames : int, optional
+        The number of frames measured, by default 100.
+    warmup : int, optional
+        The number of frames processed before the measure, by default 10.
+    batch_size : int, optional
+        The number of frames sent together to the network, by default 1.
+
+    Returns
+    -------
+    Result
+        The speed of the pipeline.
+
+    Raises
+    ------
+    ValueError
+        No frame could be read from the clip.
+    """
+    inference_backend = backend.create(backend_name, yolo_weights, yolo_cfg, size, threads)
+    total_histogram = metrics.Histogram()
+    nb_processed = 0
+    nb_measured = 0
+    elapsed = 0.0
+
+    while nb_measured < nb_frames:
+        detector = ai.Ai(
+            False,
+            False,
+            yolo_weights,
+            yolo_cfg,
+            size,
+            path_to_input_video,
+            batch_size=batch_size,
+            inference_backend=inference_backend,
+        )
+        fps = FPS().start()
+        detector.start()
+
+        frames = detector.get_next_images()
+        if len(frames) == 0:
+            fps.stop()
+            detector.stop(fps)
+            raise ValueError("[BENCH] No frame read from {}".format(path_to_input_video))
+
+        while len(frames) > 0 and nb_measured < nb_frames:
+            measured = nb_processed >= warmup
+            if measured and nb_measured == 0:
+                # The warm up is over
+                for name in metrics.STAGES:
+                    metrics.histogram(name).reset()
+
+            start_time = time.perf_counter()
+            detector.process_images(frames, [], fps)
+            # Each frame of a batch waits for the whole batch
+            batch_time = time.perf_counter() - start_time
+            nb_processed += len(frames)
+
+            if measured:
+                nb_measured += len(frames)
+                for _ in frames:
+                    total_histogram.record(batch_time)
+
+            frames = detector.get_next_images()
+            if measured:
+                elapsed += time.perf_counter() - start_time
+
+        fps.stop()
+        detector.stop(fps)
+
+    histograms = {name: metrics.histogram(name) for name in metrics.STAGES}
+    histograms[TOTAL] = total_histogram
+    latency = {
+        name: {key: round(histogram.percentile(quantile) * 1000, 3) for key, quantile in PERCENTILES.items()}
+        for name, histogram in histograms.items()
+    }
+
+    result = Result(size, backend_name, threads, nb_measured, nb_measured / elapsed, latency)
+    logging.info(
+        "[BENCH] %s size %d with %s threads: %.2f FPS, p99 %.2f ms",
+        backend_name,
+        size,
+        threads or "default",
+        result.fps,
+        latency[TOTAL]["p99"],
+    )
+    return result
+
+
+def _installed_backends(backend_names: List[str]) -> List[str]:
+    """Return the backends whose runtime is installed, warning about the others."""
+    names = []
+    for backend_name in backend_names:
+        if backend_name == backend.ONNXRUNTIME and importlib.util.find_spec("onnxruntime") is None:
+            logging.warning("[BENCH] %s skipped: onnxruntime is not installed", backend_name)
+            continue
+        names.append(backend_name)
+    return names
+
+
+def run_matrix(
+    yolo_weights: str,
+    yolo_cfg: str,
+    sizes: List[int],
+    backend_names: List[str],
+    threads: List[int],
+    path_to_input_video: Optional[str] = None,
+    nb_frames: int = 100,
+    warmup: int = 10,
+    batch_size: int = 1,
+) -> Dict[str, Any]:
+    """Measure the pipeline with every combination of sizes, backends and numbers of threads.
+
+    The combinations that can not run, for instance a size not supported by an ONNX model or a backend whose runtime
+    is not installed, are skipped.
+
+    Parameters
+    ----------
+    yolo_weights : str
+        The path to the weights file of YOLO, or to the ONNX model.
+    yolo_cfg : str
+        The path to the config file of YOLO.
+    sizes : List[int]
+        The sizes of the images converted to blob.
+    backend_names : List[str]
+        The names of the backends, among `backend.BACKENDS`.
+    threads : List[int]
+        The numbers of threads of the backends, 0 to let the backend choose.
+    path_to_input_video : str, optional
+        The path to the clip processed, by default None to process `NB_SYNTHETIC_FRAMES` random frames.
+    nb_frames : int, optional
+        The number of frames measured for each combination, by default 100.
+    warmup : int, optional
+        The number of frames processed before the measure of each combination, by default 10.
+    batch_size : int, optional
+        The number of frames sent together to the network, by default 1.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The report, with the host, the options of the benchmark and the `Result` of each combination under
+        `"results"`, ready to be saved as JSON.
+    """
+    report: Dict[str, Any] = {
+        "cpu": autotune.cpu_model(),
+        "input": path_to_input_video or "synthetic",
+        "frames": nb_frames,
+        "warmup": warmup,
+        "batch_size": batch_size,
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory() as folder:
+        if path_to_input_video is None:
+            path_to_input_video = os.path.join(folder, "synthetic.mp4")
+            write_synthetic_video(path_to_input_video)
+
+        for size in sizes:
+            for backend_name in _installed_backends(backend_names):
+                for thread_count in threads:
+                    try:
+                        result = run(
+                            yolo_weights,
+                            yolo_cfg,
+                            size,
+                            path_to_input_video,
+                            backend_name,
+                            thread_count,
+                            nb_frames,
+                            warmup,
+                            batch_size,
+                        )
+                    except (cv2.error, ImportError, RuntimeError) as error:
+                        logging.warning(
+                            "[BENCH] %s size %d with %d threads skipped: %s", backend_name, size, thread_count, error
+                        )
+                        continue
+
+                    report["results"].append(result._asdict())
+
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.1) -> List[Comparison]:
+    """Compare the results of a report with the results of the same combinations in a baseline report.
+
+    Parameters
+    ----------
+    report : Dict[str, Any]
+        The report given by `run_matrix`.
+    baseline : Dict[str, Any]
+        A previous report, usually loaded from JSON.
+    tolerance : float, optional
+        The fraction by which the throughput can drop, or the 99th percentile of the latency of a frame can grow,
+        before being a regression, by default 0.1.
+
+    Returns
+    -------
+    List[Comparison]
+        The comparison of each result whose combination is in the baseline.
+    """
+    baseline_results = {
+        (result["size"], result["backend_name"], result["threads"]): result for result in baseline["results"]
+    }
+    comparisons = []
+
+    for result in report["results"]:
+        key = (result["size"], result["backend_name"], result["threads"])
+        if key not in baseline_results:
+            logging.info("[BENCH] %s size %d with %d threads not in the baseline", key[1], key[0], key[2])
+            continue
+
+        baseline_result = baseline_results[key]
+        p99 = result["latency"][TOTAL]["p99"]
+        baseline_p99 = baseline_result["latency"][TOTAL]["p99"]
+        regressed = result["fps"] < baseline_result["fps"] * (1 - tolerance) or p99 > baseline_p99 * (1 + tolerance)
+        comparisons.append(Comparison(*key, result["fps"], baseline_result["fps"], p99, baseline_p99, regressed))
+
+    return comparisons
@@ -0,0 +1,121 @@
+"""Cache the networks so they are not loaded and optimized again on every start.
+
+- In a process, a network read by OpenCV is kept and given again to the next backend loading the same files, for
+  instance the autotune and then the AI.
+- On disk, the graph of an ONNX model optimized by ONNX Runtime is saved in `CACHE_FOLDER`. The next starts load the
+  optimized graph directly, without running the optimizations again.
+
+The entries are keyed by the path, the size and the modification time of the model files, so they are invalidated as
+soon as one of the files changes, without reading the files.
+"""
+import logging
+import hashlib
+import os
+from typing import Dict
+
+import cv2
+
+CACHE_FOLDER: str = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "clearway"
+)
+"""The folder of the files cached by ClearWay."""
+
+__networks: Dict[str, cv2.dnn_Net] = {}
+"""The networks read by OpenCV in this process, by key of their files."""
+
+
+def file_key(*paths: str) -> str:
+    """Return a key that changes as soon as one of the files changes.
+
+    Parameters
+    ----------
+    *paths : str
+        The paths to the files, the empty ones are ignored.
+
+    Returns
+    -------
+    str
+        The hexadecimal SHA-256 of the absolute path, the size and the modification time of each file.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if path:
+            status = os.stat(path)
+            digest.update("{}|{}|{};".format(os.path.abspath(path), status.st_size, status.st_mtime_ns).encode())
+    return digest.hexdigest()
+
+
+def read_network(yolo_weights: str, yolo_cfg: str) -> cv2.dnn_Net:
+    """Read the network with OpenCV, or return the network already read from the same files.
+
+    Parameters
+    ----------
+    yolo_weights : str
+        The path to the weights file of YOLO.
+    yolo_cfg : str
+        The path to the config file of YOLO.
+
+    Returns
+    -------
+    cv2.dnn_Net
+        The network.
+    """
+    if not all(os.path.isfile(path) for path in (yolo_weights, yolo_cfg) if path):
+        # Not cached, OpenCV reports the missing file
+        return cv2.dnn.readNet(yolo_weights, yolo_cfg)
+
+    key = file_key(yolo_weights, yolo_cfg)
+
+    if key not in __networks:
+        __networks[key] = cv2.dnn.readNet(yolo_weights, yolo_cfg)
+    else:
+        logging.debug("[CACHE] Network %s already read", yolo_weights)
+
+    return __networks[key]
+
+
+def clear() -> None:
+    """Forget the networks read in this process."""
+    __networks.clear()
+
+
+def optimized_model_path(model: str, runtime_version: str) -> str:
+    """Return the path to the optimized graph of the ONNX model in the cache, the file may not exist yet.
+
+    Parameters
+    ----------
+    model : str
+        The path to the ONNX model.
+    runtime_version : str
+        The version of ONNX Runtime optimizing the graph, the optimized graphs can only be run by the same version.
+
+    Returns
+    -------
+    str
+        The path to the optimized graph, in the folder `models` of `CACHE_FOLDER`.
+    """
+    name = os.path.splitext(os.path.basename(model))[0]
+    key = hashlib.sha256("{}|{}".format(file_key(model), runtime_version).encode()).hexdigest()
+    return os.path.join(CACHE_FOLDER, "models", "{}.{}.onnx".format(name, key[:16]))
+
+
+def save_optimized_model(optimized_model: str, temporary_file: str) -> None:
+    """Move the optimized graph written by ONNX Runtime into the cache, and remove the older graphs of the model.
+
+    Parameters
+    ----------
+    optimized_model : str
+        The path given by `optimized_model_path`.
+    temporary_file : str
+        The path to the optimized graph written by ONNX Runtime, in the same folder.
+    """
+    folder = os.path.dirname(optimized_model)
+    name = os.path.basename(optimized_model).rsplit(".", 2)[0]
+
+    for file_name in os.listdir(folder):
+        if file_name.rsplit(".", 2)[0] == name and file_name.endswith(".onnx"):
+            os.remove(os.path.join(folder, file_name))
+
+    # Renamed once complete, an interrupted start can not leave a truncated graph in the cache
+    os.replace(temporary_file, optimized_model)
+    logging.info("[CACHE] Optimized graph saved in %s", optimized_model)
@@ -0,0 +1,419 @@
+"""Capture the frames of a video stream on a dedicated thread.
+
+The frames are read into a bounded ring buffer of preallocated frames so that the capture and the inference do not
+wait for each other:
+
+- For a live camera, the oldest frames are dropped so that the inference always gets the freshest frame.
+- For a video file, the capture blocks while the buffer is full so that no frame is lost.
+
+The format of a camera can be negotiated with `negotiate` before the capture starts.
+"""
+from threading import Condition, Event, Thread
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy
+import cv2
+
+
+CAMERA_SETTINGS: Dict[str, int] = {
+    "fourcc": cv2.CAP_PROP_FOURCC,
+    "width": cv2.CAP_PROP_FRAME_WIDTH,
+    "height": cv2.CAP_PROP_FRAME_HEIGHT,
+    "fps": cv2.CAP_PROP_FPS,
+    "buffer_size": cv2.CAP_PROP_BUFFERSIZE,
+}
+"""The property of each camera setting, in the order they are set: the driver chooses the sizes for a pixel format."""
+
+
+def fourcc_to_str(fourcc: float) -> str:
+    """Convert a FOURCC code given by `cv2.CAP_PROP_FOURCC` to its 4 characters.
+
+    Parameters
+    ----------
+    fourcc : float
+        The FOURCC code.
+
+    Returns
+    -------
+    str
+        The 4 characters of the code, like `"MJPG"`.
+    """
+    code = int(fourcc)
+    return "".join(chr((code >> 8 * i) & 0xFF) for i in range(4))
+
+
+def negotiate(video_stream: cv2.VideoCapture, **settings: Any) -> Dict[str, Any]:
+    """Ask a camera for a format, then log the format it accepted.
+
+    A smaller format is cheaper to decode and to resize, and a shallow buffer of the driver gives fresher frames.
+    The driver can refuse a setting or choose the closest value it supports, so the settings are read back.
+
+    Parameters
+    ----------
+    video_stream : cv2.VideoCapture
+        The opened camera, with the V4L2 backend of OpenCV to set the buffer size.
+    **settings : Any
+        The settings of `CAMERA_SETTINGS` to ask for, the others are left to the driver: `fourcc` of 4 characters,
+        `width`, `height` and `buffer_size` in pixels and frames, `fps`.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The value of every setting accepted by the camera, `fourcc` as 4 characters.
+    """
+    for name, prop in CAMERA_SETTINGS.items():
+        if name not in settings:
+            continue
+        value = cv2.VideoWriter_fourcc(*settings[name]) if name == "fourcc" else settings[name]
+        if not video_stream.set(prop, value):
+            logging.warning("[CAPTURE] The camera does not support the setting %s", name)
+
+    negotiated: Dict[str, Any] = {
+        name: fourcc_to_str(video_stream.get(prop)) if name == "fourcc" else video_stream.get(prop)
+        for name, prop in CAMERA_SETTINGS.items()
+    }
+
+    for name, value in settings.items():
+        if negotiated.get(name) != value and not (name == "fps" and abs(negotiated[name] - value) < 0.5):
+            logging.warning("[CAPTURE] The camera gave %s = %s instead of %s", name, negotiated.get(name), value)
+
+    logging.info(
+        "[CAPTURE] Camera format: %s %dx%d at %.1f FPS, %d buffers",
+        negotiated["fourcc"],
+        negotiated["width"],
+        negotiated["height"],
+        negotiated["fps"],
+        negotiated["buffer_size"],
+    )
+    return negotiated
+
+
+class FrameRingBuffer:
+    """Bounded ring buffer of preallocated frames shared by one producer and one consumer.
+
+    Each slot of the buffer is either free, being written by the producer, queued, or held by the consumer.
+    The slots held by the consumer are only given back when the consumer asks for the next frame without keeping
+    them, so the frames returned by `get` can be used until then.
+
+    Parameters
+    ----------
+    capacity : int
+        The number of preallocated frames, at least 2.
+    drop_oldest : bool
+        `True` to drop the oldest frames when the buffer is full, `False` to block the producer.
+    ready_event : Event, optional
+        The event set each time a frame is published or the buffer is closed, shared by the buffers of several video
+        streams to wait for the first one ready, by default None.
+    """
+
+    def __init__(self, capacity: int, drop_oldest: bool, ready_event: Optional[Event] = None) -> None:
+        if capacity < 2:
+            raise ValueError("[CAPTURE] The capacity of the ring buffer must be at least 2: {}".format(capacity))
+
+        self.__capacity: int = capacity
+        self.__drop_oldest: bool = drop_oldest
+        self.__frames: List[Optional[numpy.ndarray]] = [None] * capacity
+        self.__timestamps: numpy.ndarray = numpy.zeros(capacity, dtype=numpy.float64)
+        self.__free: Deque[int] = deque(range(capacity))
+        self.__queued: Deque[int] = deque()
+        self.__held: Deque[int] = deque()
+        self.__closed: bool = False
+        self.__condition: Condition = Condition()
+        self.__ready_event: Optional[Event] = ready_event
+
+        self.frames_captured: int = 0
+        """The number of frames published by the producer."""
+        self.frames_dropped: int = 0
+        """The number of frames dropped before being given to the consumer."""
+        self.frames_consumed: int = 0
+        """The number of frames given to the consumer."""
+        self.last_age: float = 0.0
+        """The time in seconds between the capture of the last consumed frame and its consumption."""
+        self.last_timestamp: float = 0.0
+        """The `time.monotonic` time at which the last consumed frame was captured."""
+        self.max_age: float = 0.0
+        """The maximum time in seconds between the capture of a frame and its consumption."""
+        self.__sum_age: float = 0.0
+
+    @property
+    def drop_oldest(self) -> bool:
+        """`True` if the oldest frames are dropped when the buffer is full."""
+        return self.__drop_oldest
+
+    @property
+    def ready(self) -> bool:
+        """`True` if `get` returns without waiting: a frame is queued or the buffer is closed."""
+        with self.__condition:
+            return len(self.__queued) > 0 or self.__closed
+
+    @property
+    def mean_age(self) -> float:
+        """The mean time in seconds between the capture of a frame and its consumption."""
+        return self.__sum_age / self.frames_consumed if self.frames_consumed > 0 else 0.0
+
+    def allocate(self, frame: numpy.ndarray) -> None:
+        """Preallocate all the slots of the buffer with the shape and type of the given frame.
+
+        Parameters
+        ----------
+        frame : numpy.ndarray
+            A frame of the video stream.
+        """
+        with self.__condition:
+            self.__frames = [numpy.empty_like(frame) for _ in range(self.__capacity)]
+
+    def replace(self, index: int, frame: numpy.ndarray) -> None:
+        """Replace the frame of the given slot, when the size of the frames of the video stream changes.
+
+        Parameters
+        ----------
+        index : int
+            The index of the slot reserved by the producer.
+        frame : numpy.ndarray
+            The new frame of the slot.
+        """
+        with self.__condition:
+            self.__frames[index] = frame
+
+    def frame(self, index: int) -> Optional[numpy.ndarray]:
+        """Return the frame of the given slot, `None` if the buffer is not allocated yet.
+
+        Parameters
+        ----------
+        index : int
+            The index of the slot.
+        """
+        return self.__frames[index]
+
+    def reserve(self) -> Optional[int]:
+        """Reserve a slot for the producer to write the next frame in.
+
+        If no slot is free, then the oldest queued frame is dropped or the producer is blocked, depending on
+        `drop_oldest`.
+
+        Returns
+        -------
+        Optional[int]
+            The index of the reserved slot, `None` if the buffer is closed.
+        """
+        with self.__condition:
+            while not self.__closed and len(self.__free) == 0 and not self.__drop_oldest:
+                self.__condition.wait()
+
+            if self.__closed:
+                return None
+
+            if len(self.__free) > 0:
+                return self.__free.popleft()
+
+            if len(self.__queued) == 0:
+                # The consumer keeps all the other slots, wait for it to release one
+                while not self.__closed and len(self.__free) == 0:
+                    self.__condition.wait()
+                return None if self.__closed else self.__free.popleft()
+
+            self.frames_dropped += 1
+            return self.__queued.popleft()
+
+    def publish(self, index: int, timestamp: float) -> None:
+        """Queue the frame written by the producer in the reserved slot.
+
+        Parameters
+        ----------
+        index : int
+            The index of the slot given by `reserve`.
+        timestamp : float
+            The `time.monotonic` time at which the frame was captured.
+        """
+        with self.__condition:
+            self.__timestamps[index] = timestamp
+            self.__queued.append(index)
+            self.frames_captured += 1
+            self.__condition.notify_all()
+        if self.__ready_event is not None:
+            self.__ready_event.set()
+
+    def release(self, index: int) -> None:
+        """Give back a reserved slot that was not written.
+
+        Parameters
+        ----------
+        index : int
+            The index of the slot given by `reserve`.
+        """
+        with self.__condition:
+            self.__free.append(index)
+            self.__condition.notify_all()
+
+    def get(self, release_previous: bool = True) -> Optional[numpy.ndarray]:
+        """Give the next frame to the consumer, blocking until there is one.
+
+        When the oldest frames are dropped, only the freshest queued frame is given and the others are dropped.
+
+        Parameters
+        ----------
+        release_previous : bool, optional
+            `True` to release the frames previously given to the consumer, `False` to keep them, for instance to
+            process several frames together, by default `True`.
+            The producer is blocked or drops frames if the consumer keeps all the slots but one.
+
+        Returns
+        -------
+        Optional[numpy.ndarray]
+            The next frame, `None` if the buffer is closed and no frame is left.
+        """
+        with self.__condition:
+            if release_previous and len(self.__held) > 0:
+                self.__free.extend(self.__held)
+                self.__held.clear()
+                self.__condition.notify_all()
+
+            while not self.__closed and len(self.__queued) == 0:
+                self.__condition.wait()
+
+            if len(self.__queued) == 0:
+                return None
+
+            if self.__drop_oldest:
+                while len(self.__queued) > 1:
+                    self.__free.append(self.__queued.popleft())
+                    self.frames_dropped += 1
+                self.__condition.notify_all()
+
+            index = self.__queued.popleft()
+            self.__held.append(index)
+
+            self.frames_consumed += 1
+            self.last_timestamp = float(self.__timestamps[index])
+            self.last_age = time.monotonic() - self.last_timestamp
+            self.max_age = max(self.max_age, self.last_age)
+            self.__sum_age += self.last_age
+
+            return self.__frames[index]
+
+    def close(self) -> None:
+        """Close the buffer, the producer and the consumer are no longer blocked."""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        if self.__ready_event is not None:
+            self.__ready_event.set()
+
+
+class CaptureThread:
+    """Read the frames of a video stream on a dedicated thread into a `FrameRingBuffer`.
+
+    Parameters
+    ----------
+    video_stream : cv2.VideoCapture
+        The opened video stream.
+    drop_oldest : bool
+        `True` for a live camera, the oldest frames are dropped; `False` for a video file, no frame is lost.
+    capacity : int, optional
+        The number of preallocated frames, by default 4.
+    nb_frames : int, optional
+        The number of frames to read before ending the stream, by default `None` to read until the end.
+    ready_event : Event, optional
+        The event set each time a frame is read or the stream ends, see `FrameRingBuffer`, by default None.
+    """
+
+    def __init__(
+        self,
+        video_stream: cv2.VideoCapture,
+        drop_oldest: bool,
+        capacity: int = 4,
+        nb_frames: Optional[int] = None,
+        ready_event: Optional[Event] = None,
+    ) -> None:
+        self.__video_stream: cv2.VideoCapture = video_stream
+        self.__nb_frames: Optional[int] = nb_frames
+        self.__ring_buffer: FrameRingBuffer = FrameRingBuffer(capacity, drop_oldest, ready_event)
+        self.__thread: Optional[Thread] = None
+
+    @property
+    def ring_buffer(self) -> FrameRingBuffer:
+        """The ring buffer in which the frames are read, to get its counters."""
+        return self.__ring_buffer
+
+    @property
+    def ready(self) -> bool:
+        """`True` if `read` returns without waiting: a frame is read or the end of the stream is reached."""
+        return self.__ring_buffer.ready
+
+    def start(self) -> None:
+        """Start the capture thread."""
+        logging.debug(
+            "[CAPTURE] Start the capture thread, %s",
+            "drop the oldest frames" if self.__ring_buffer.drop_oldest else "keep all the frames",
+        )
+        self.__thread = Thread(target=self.__run, name="[AI-CAPTURE]", daemon=True)
+        self.__thread.start()
+
+    def read(self, release_previous: bool = True) -> Tuple[bool, Optional[numpy.ndarray]]:
+        """Return the next frame, like `cv2.VideoCapture.read`.
+
+        The frame is owned by the ring buffer and can only be used until it is released by a next call.
+
+        Parameters
+        ----------
+        release_previous : bool, optional
+            `True` to release the frames previously returned, `False` to keep them, by default `True`.
+
+        Returns
+        -------
+        Tuple[bool, Optional[numpy.ndarray]]
+            `True` and the next frame, or `False` and `None` at the end of the stream.
+        """
+        img = self.__ring_buffer.get(release_previous)
+        return img is not None, img
+
+    def stop(self) -> None:
+        """Stop the capture thread and wait for it."""
+        self.__ring_buffer.close()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def log_counters(self) -> None:
+        """Log the counters of the capture."""
+        logging.debug("[CAPTURE] Nb of frames captured: %d", self.__ring_buffer.frames_captured)
+        logging.debug("[CAPTURE] Nb of frames dropped: %d", self.__ring_buffer.frames_dropped)
+        logging.debug(
+            "[CAPTURE] capture-to-inference age: mean %.1f ms, max %.1f ms",
+            self.__ring_buffer.mean_age * 1000,
+            self.__ring_buffer.max_age * 1000,
+        )
+
+    def __run(self) -> None:
+        nb_frames_read = 0
+
+        while self.__nb_frames is None or nb_frames_read < self.__nb_frames:
+            index = self.__ring_buffer.reserve()
+            if index is None:
+                break
+
+            slot = self.__ring_buffer.frame(index)
+            if slot is None:
+                read_ok, img = self.__video_stream.read()
+            else:
+                # Decode directly into the preallocated frame
+                read_ok, img = self.__video_stream.read(slot)
+
+            if not read_ok:
+                self.__ring_buffer.release(index)
+                break
+
+            if slot is None:
+                self.__ring_buffer.allocate(img)
+                numpy.copyto(self.__ring_buffer.frame(index), img)
+            elif img is not slot:
+                # The size of the frames changed, the slot keeps the new frame
+                self.__ring_buffer.replace(index, img)
+
+            self.__ring_buffer.publish(index, time.monotonic())
+            nb_frames_read += 1
+
+        self.__ring_buffer.close()
@@ -0,0 +1,113 @@
+"""Decode the output layers of YOLO into boxes with NumPy.
+
+The output layers of YOLO are tables of 85 columns: Cx, Cy, w, h, objectness and the probability of each class.
+Rather than walking each row with a Python loop, the rows of every layer are handled as a single array.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy
+import cv2
+
+OBJECTNESS: int = 4
+"""The column of the output layers containing the objectness of the row."""
+
+
+def decode_output_layers(
+    outs: Sequence[numpy.ndarray], width: int, height: int, class_id: int, threshold: float
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Keep the rows of the output layers whose class score is above the threshold and scale their boxes.
+
+    The class scores given by OpenCV are already multiplied by the objectness of the row, so a row whose objectness
+    is not above the threshold can not have a class score above it. The objectness is therefore checked first on
+    every row, then the class score only on the remaining rows.
+
+    Parameters
+    ----------
+    outs : Sequence[numpy.ndarray]
+        The output layers of YOLO, each one of shape (rows, 85).
+    width : int
+        The width of the processed image.
+    height : int
+        The height of the processed image.
+    class_id : int
+        The column of the class to detect.
+    threshold : float
+        The minimum score of the class to keep a row.
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        The boxes (x, y, width, height) as an (N, 4) array of `int32` and their confidences as an (N,) array of
+        `float32`.
+    """
+    if len(outs) == 1:
+        detections = outs[0]
+    else:
+        detections = numpy.concatenate(outs, axis=0)
+
+    # Cheap pre-filter on the objectness, then the class score on the few rows left
+    detections = detections[detections[:, OBJECTNESS] > threshold]
+    detections = detections[detections[:, class_id] > threshold]
+
+    confidences = detections[:, class_id].astype(numpy.float32)
+
+    # Same rounding as int() on every coordinate: truncation toward zero
+    center_x = (detections[:, 0] * width).astype(numpy.int32)
+    center_y = (detections[:, 1] * height).astype(numpy.int32)
+    w = (detections[:, 2] * width).astype(numpy.int32)
+    h = (detections[:, 3] * height).astype(numpy.int32)
+
+    boxes = numpy.empty((len(detections), 4), dtype=numpy.int32)
+    boxes[:, 0] = center_x - w / 2
+    boxes[:, 1] = center_y - h / 2
+    boxes[:, 2] = w
+    boxes[:, 3] = h
+
+    return boxes, confidences
+
+
+def split_batch(outs: Sequence[numpy.ndarray], nb_frames: int) -> List[List[numpy.ndarray]]:
+    """Split the output layers of a batch of frames into the output layers of each frame.
+
+    Parameters
+    ----------
+    outs : Sequence[numpy.ndarray]
+        The output layers of YOLO for the whole batch.
+    nb_frames : int
+        The number of frames of the batch.
+
+    Returns
+    -------
+    List[List[numpy.ndarray]]
+        The output layers of each frame, each one of shape (rows, 85).
+    """
+    # A single frame gives (rows, 85) layers, a batch gives (nb_frames, rows, 85) layers
+    outs = [out.reshape(nb_frames, -1, out.shape[-1]) for out in outs]
+    return [[out[i] for out in outs] for i in range(nb_frames)]
+
+
+def non_maximum_suppression(
+    boxes: numpy.ndarray, confidences: numpy.ndarray, score_threshold: float = 0.5, nms_threshold: float = 0.4
+) -> numpy.ndarray:
+    """Remove the boxes that refer to the same object and keep one by Non Maximum Suppression.
+
+    Parameters
+    ----------
+    boxes : numpy.ndarray
+        The (N, 4) array of boxes (x, y, width, height).
+    confidences : numpy.ndarray
+        The (N,) array of confidences of the boxes.
+    score_threshold : float, optional
+        The minimum confidence of a box to be kept, by default 0.5.
+    nms_threshold : float, optional
+        The maximum overlap between two kept boxes, by default 0.4.
+
+    Returns
+    -------
+    numpy.ndarray
+        The flat array of the indexes of the kept boxes.
+    """
+    indexes = cv2.dnn.NMSBoxes(boxes, confidences, score_threshold=score_threshold, nms_threshold=nms_threshold)
+
+    # NMSBoxes gives an empty tuple, an (N,) or an (N, 1) array depending on the result and the OpenCV version
+    return numpy.asarray(indexes, dtype=numpy.int32).reshape(-1)
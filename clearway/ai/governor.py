@@ -0,0 +1,245 @@
+"""Send fewer frames to the network when the CPU heats up or the latency of the frames grows.
+
+A Raspberry Pi in a hot street cabinet lowers the frequency of its CPU once it reaches its thermal limit: each forward
+pass lasts longer, the processing falls behind the camera and the panels signal the cyclists later and later. The
+governor reads the temperature and the frequency of the CPU from sysfs, and measures the latency of each frame from
+its capture to the end of its processing. Once per period, it chooses the number of frames between two frames
+processed by the network, the boxes being tracked on the frames in between, see `clearway.ai.tracker`:
+
+- the interval grows with the square root of the ratio between the smoothed latency and the target latency, and
+  shrinks the same way once the latency is under the target;
+- between `soft_temperature` and `hard_temperature`, the interval is at least a value growing linearly up to
+  `max_interval`, before the latency grows;
+- above `soft_temperature`, the interval is at least the ratio between the maximum and the current frequency of the
+  CPU, since a forward pass lasts that much longer. The frequency under the soft temperature is not used, the
+  frequency of an idle CPU being lowered on purpose.
+
+Each change of the interval is logged with its reason, for example
+`[GOVERNOR] Detection interval 1 -> 2: latency 212.0 ms for a target of 150.0 ms, 76.2 °C, 1200 MHz of 1500 MHz`,
+and the readings and the decisions are exposed as metrics, see `clearway.ai.metrics`.
+"""
+import time
+import math
+import logging
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from clearway.ai import metrics
+
+TEMPERATURE_PATH: str = "/sys/class/thermal/thermal_zone0/temp"
+"""The default path to the temperature of the CPU in thousandths of degree Celsius."""
+
+FREQUENCY_PATH: str = "/sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq"
+"""The default path to the current frequency of the CPU in kHz."""
+
+MAX_FREQUENCY_PATH: str = "/sys/devices/system/cpu/cpu0/cpufreq/cpuinfo_max_freq"
+"""The default path to the maximum frequency of the CPU in kHz."""
+
+
+class Reading(NamedTuple):
+    """The state of the CPU read from sysfs, None for the values that can not be read."""
+
+    temperature: Optional[float]
+    """The temperature of the CPU in degrees Celsius."""
+    frequency: Optional[float]
+    """The current frequency of the CPU in MHz."""
+    max_frequency: Optional[float]
+    """The maximum frequency of the CPU in MHz."""
+
+
+def read_value(path: str) -> Optional[float]:
+    """Read a number from a file of sysfs.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file.
+
+    Returns
+    -------
+    Optional[float]
+        The number, or None if the file does not exist or does not contain a number.
+    """
+    try:
+        with open(path) as file:
+            return float(file.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def read_sensors(
+    temperature_path: str = TEMPERATURE_PATH,
+    frequency_path: str = FREQUENCY_PATH,
+    max_frequency_path: str = MAX_FREQUENCY_PATH,
+) -> Reading:
+    """Read the temperature and the frequency of the CPU.
+
+    Parameters
+    ----------
+    temperature_path : str, optional
+        The path to the temperature in thousandths of degree Celsius, by default `TEMPERATURE_PATH`.
+    frequency_path : str, optional
+        The path to the current frequency in kHz, by default `FREQUENCY_PATH`.
+    max_frequency_path : str, optional
+        The path to the maximum frequency in kHz, by default `MAX_FREQUENCY_PATH`.
+
+    Returns
+    -------
+    Reading
+        The temperature in degrees Celsius and the frequencies in MHz.
+    """
+    values = [read_value(path) for path in (temperature_path, frequency_path, max_frequency_path)]
+    return Reading(*(value / 1000 if value is not None else None for value in values))
+
+
+class Governor:
+    """Choose the number of frames between two frames processed by the network.
+
+    Parameters
+    ----------
+    target_latency : float
+        The maximum number of seconds between the capture of a frame and the end of its processing.
+    min_interval : int, optional
+        The smallest interval, the configured detection interval, by default 1.
+    max_interval : int, optional
+        The largest interval, by default 4.
+    soft_temperature : float, optional
+        The temperature in degrees Celsius from which the interval grows before the latency does, by default 70.0.
+    hard_temperature : float, optional
+        The temperature in degrees Celsius at which the interval reaches `max_interval`, by default 80.0.
+    period : float, optional
+        The number of seconds between two readings of the sensors and two choices of the interval, by default 1.0.
+    smoothing : float, optional
+        The weight of the latency of a frame in the smoothed latency, by default 0.1.
+    temperature_path : str, optional
+        The path to the temperature in thousandths of degree Celsius, by default `TEMPERATURE_PATH`.
+    frequency_path : str, optional
+        The path to the current frequency in kHz, by default `FREQUENCY_PATH`.
+    max_frequency_path : str, optional
+        The path to the maximum frequency in kHz, by default `MAX_FREQUENCY_PATH`.
+    clock : Callable[[], float], optional
+        The clock measuring the period in seconds, by default `time.monotonic`.
+    """
+
+    def __init__(
+        self,
+        target_latency: float,
+        min_interval: int = 1,
+        max_interval: int = 4,
+        soft_temperature: float = 70.0,
+        hard_temperature: float = 80.0,
+        period: float = 1.0,
+        smoothing: float = 0.1,
+        temperature_path: str = TEMPERATURE_PATH,
+        frequency_path: str = FREQUENCY_PATH,
+        max_frequency_path: str = MAX_FREQUENCY_PATH,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.__target_latency: float = target_latency
+        self.__interval_range: Tuple[int, int] = (min_interval, max(min_interval, max_interval))
+        self.__temperatures: Tuple[float, float] = (soft_temperature, hard_temperature)
+        self.__period: float = period
+        self.__smoothing: float = smoothing
+        self.__paths: Tuple[str, str, str] = (temperature_path, frequency_path, max_frequency_path)
+        self.__clock: Callable[[], float] = clock
+        self.__last_decision: float = clock()
+        # The interval before rounding, changed smoothly
+        self.__level: float = float(min_interval)
+
+        self.latency: Optional[float] = None
+        """The smoothed latency of the frames in seconds."""
+        self.reading: Reading = read_sensors(*self.__paths)
+        """The last reading of the sensors."""
+        self.interval: int = min_interval
+        """The number of frames between two frames processed by the network."""
+        self.nb_changes: int = 0
+        """The number of changes of the interval."""
+
+        Governor.__register_metrics(self)
+
+    def __register_metrics(self) -> None:
+        def known(value: Optional[float], scale: float = 1.0) -> float:
+            return value * scale if value is not None else math.nan
+
+        metrics.register(
+            "clearway_cpu_temperature_celsius",
+            "The temperature of the CPU read by the governor.",
+            lambda: known(self.reading.temperature),
+        )
+        metrics.register(
+            "clearway_cpu_frequency_hertz",
+            "The current frequency of the CPU read by the governor.",
+            lambda: known(self.reading.frequency, 1e6),
+        )
+        metrics.register(
+            "clearway_governor_latency_seconds",
+            "The smoothed latency between the capture of a frame and the end of its processing.",
+            lambda: known(self.latency),
+        )
+        metrics.register(
+            "clearway_governor_detection_interval",
+            "The number of frames between two frames processed by the network, chosen by the governor.",
+            lambda: self.interval,
+        )
+        metrics.register(
+            "clearway_governor_changes_total",
+            "The number of changes of the detection interval by the governor.",
+            lambda: self.nb_changes,
+            "counter",
+        )
+
+    def record(self, latency: float) -> int:
+        """Add the latency of a processed frame, and choose the interval again once per period.
+
+        Parameters
+        ----------
+        latency : float
+            The number of seconds between the capture of the frame and the end of its processing.
+
+        Returns
+        -------
+        int
+            The number of frames between two frames processed by the network, for the next frames.
+        """
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.__smoothing * (latency - self.latency)
+
+        now = self.__clock()
+        if now - self.__last_decision >= self.__period:
+            self.__last_decision = now
+            self.reading = read_sensors(*self.__paths)
+            Governor.__decide(self)
+
+        return self.interval
+
+    def __decide(self) -> None:
+        min_interval, max_interval = self.__interval_range
+        soft_temperature, hard_temperature = self.__temperatures
+        temperature, frequency, max_frequency = self.reading
+
+        # Proportional to the latency, smoothed by the square root to avoid oscillating
+        level = self.__level * math.sqrt(self.latency / self.__target_latency)
+
+        if temperature is not None and temperature >= soft_temperature:
+            heat = min(1.0, (temperature - soft_temperature) / max(hard_temperature - soft_temperature, 1e-6))
+            level = max(level, 1 + (max_interval - 1) * heat)
+            if frequency and max_frequency:
+                # The CPU is throttled, a forward pass lasts as much longer
+                level = max(level, max_frequency / frequency)
+
+        self.__level = min(max(level, min_interval), max_interval)
+        interval = int(round(self.__level))
+        if interval != self.interval:
+            logging.info("[GOVERNOR] Detection interval %d -> %d: %s", self.interval, interval, Governor.__reason(self))
+            self.interval = interval
+            self.nb_changes += 1
+
+    def __reason(self) -> str:
+        temperature, frequency, max_frequency = self.reading
+        reason = "latency {:.1f} ms for a target of {:.1f} ms".format(self.latency * 1000, self.__target_latency * 1000)
+        if temperature is not None:
+            reason += ", {:.1f} °C".format(temperature)
+        if frequency is not None and max_frequency is not None:
+            reason += ", {:.0f} MHz of {:.0f} MHz".format(frequency, max_frequency)
+        return reason
@@ -0,0 +1,111 @@
+"""Detect motion between frames to skip the network when nothing moves.
+
+Each frame is converted to a small grayscale image and compared with a running average of the previous ones,
+the background. If not enough pixels differ from the background, then there is no significant motion and the network
+does not need to process the frame.
+"""
+from typing import Optional
+
+import numpy
+import cv2
+
+WIDTH: int = 160
+"""The width of the grayscale copy of the frames, the height keeps the aspect ratio."""
+
+PIXEL_THRESHOLD: int = 25
+"""The minimum difference of gray level between a pixel and the background for the pixel to have changed."""
+
+BACKGROUND_RATE: float = 0.05
+"""The weight of a new frame in the running average of the background."""
+
+
+class MotionGate:
+    """Decide for each frame if it needs to be processed by the network.
+
+    Parameters
+    ----------
+    threshold : float
+        The fraction of the pixels, between 0 and 1, that must differ from the background for a motion to be
+        significant.
+    interval : int
+        The maximum number of frames between two frames processed by the network, even without motion.
+        0 to never force the network.
+    """
+
+    def __init__(self, threshold: float, interval: int) -> None:
+        self.__threshold: float = threshold
+        self.__interval: int = interval
+        self.__frames_since_inference: int = 0
+        self.__small: Optional[numpy.ndarray] = None
+        self.__gray: Optional[numpy.ndarray] = None
+        self.__background: Optional[numpy.ndarray] = None
+        self.__background_gray: Optional[numpy.ndarray] = None
+        self.__difference: Optional[numpy.ndarray] = None
+
+        self.frames_skipped: int = 0
+        """The number of frames not processed by the network."""
+
+    def has_motion(self, img: numpy.ndarray) -> bool:
+        """Tell if the frame differs significantly from the background, and update the background.
+
+        The first frame is always considered as a motion.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The BGR frame.
+
+        Returns
+        -------
+        bool
+            `True` if enough pixels differ from the background.
+        """
+        height, width = img.shape[:2]
+        small_size = (WIDTH, max(1, height * WIDTH // width))
+
+        if self.__small is None or self.__small.shape[:2] != small_size[::-1]:
+            # First frame, or the size of the frames changed: allocate the buffers and start a new background
+            self.__small = cv2.resize(img, small_size, interpolation=cv2.INTER_AREA)
+            self.__gray = cv2.cvtColor(self.__small, cv2.COLOR_BGR2GRAY)
+            self.__background = self.__gray.astype(numpy.float32)
+            self.__background_gray = numpy.empty_like(self.__gray)
+            self.__difference = numpy.empty_like(self.__gray)
+            return True
+
+        cv2.resize(img, small_size, dst=self.__small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.__small, cv2.COLOR_BGR2GRAY, dst=self.__gray)
+
+        cv2.convertScaleAbs(self.__background, dst=self.__background_gray)
+        cv2.absdiff(self.__gray, self.__background_gray, dst=self.__difference)
+        cv2.threshold(self.__difference, PIXEL_THRESHOLD, 255, cv2.THRESH_BINARY, dst=self.__difference)
+        changed = cv2.countNonZero(self.__difference)
+
+        cv2.accumulateWeighted(self.__gray, self.__background, BACKGROUND_RATE)
+
+        return changed > self.__threshold * self.__difference.size
+
+    def should_infer(self, img: numpy.ndarray) -> bool:
+        """Tell if the frame must be processed by the network.
+
+        The frame is processed if there is a significant motion, or if the last `interval` frames were skipped.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The BGR frame.
+
+        Returns
+        -------
+        bool
+            `True` if the frame must be processed by the network.
+        """
+        # The background is updated even when the inference is forced
+        motion = self.has_motion(img)
+
+        if motion or (self.__interval > 0 and self.__frames_since_inference >= self.__interval):
+            self.__frames_since_inference = 0
+            return True
+
+        self.__frames_since_inference += 1
+        self.frames_skipped += 1
+        return False
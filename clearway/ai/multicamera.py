@@ -0,0 +1,260 @@
+"""Process several video streams, one per approach of an intersection, in a single process with a single network.
+
+Each source is an `ai.Ai` reading its own camera or video file and signaling its own panel GPIOs, but all of them share
+the inference engine: the network is loaded once, and the frames of up to `batch_size` sources are sent to it
+together. The process, the interpreter and the panel threads are shared too.
+
+The sources whose next frame is ready are scheduled by smooth weighted round-robin: a source of priority 2 gets twice
+the turns of a source of priority 1, spread evenly, and sources of the same priority take turns. When no source is
+ready, the network waits for the capture threads, which all set a shared event each time they read a frame.
+"""
+from threading import Event
+import time
+import logging
+import os
+import resource
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy
+from imutils.video import FPS
+from clearway.ai import ai, backend, resolution, timing
+
+DEVICE: str = "device"
+"""The key of the camera device or the video file of a source."""
+
+PANEL_GPIOS: str = "panel_gpios"
+"""The key of the GPIOs of the panels signaling the cyclists detected by a source."""
+
+PRIORITY: str = "priority"
+"""The key of the priority of a source, its share of the turns of the network."""
+
+
+class Source(NamedTuple):
+    """A video stream and the panels signaling its detections."""
+
+    device: str
+    """The camera device, like `/dev/video2`, or the path to a video file."""
+    panel_gpios: List[int]
+    """The GPIOs of the panels signaling the cyclists detected in the video stream."""
+    priority: int = 1
+    """The share of the turns of the network, at least 1."""
+
+    @classmethod
+    def from_config(cls, source: Dict[str, Any]) -> "Source":
+        """Create a source from its configuration.
+
+        Parameters
+        ----------
+        source : Dict[str, Any]
+            The configuration of the source, with the `DEVICE` and `PANEL_GPIOS` keys and optionally the `PRIORITY`
+            key, see `clearway.config.save_config_ai`.
+
+        Returns
+        -------
+        Source
+            The source.
+        """
+        return cls(source[DEVICE], list(source[PANEL_GPIOS]), source.get(PRIORITY, 1))
+
+
+class Scheduler:
+    """Choose the next sources sent to the network, by smooth weighted round-robin.
+
+    Parameters
+    ----------
+    priorities : List[int]
+        The priority of each source, at least 1.
+    """
+
+    def __init__(self, priorities: List[int]) -> None:
+        self.__priorities: List[int] = priorities
+        self.__credits: List[int] = [0] * len(priorities)
+
+    def pick(self, ready: List[int], nb_sources: int) -> List[int]:
+        """Choose the next sources among the ready ones.
+
+        Parameters
+        ----------
+        ready : List[int]
+            The indexes of the sources whose next frame is ready.
+        nb_sources : int
+            The maximum number of sources chosen.
+
+        Returns
+        -------
+        List[int]
+            The indexes of the chosen sources, the most urgent first.
+        """
+        candidates = list(ready)
+        chosen: List[int] = []
+
+        while len(candidates) > 0 and len(chosen) < nb_sources:
+            for index in candidates:
+                self.__credits[index] += self.__priorities[index]
+            best = max(candidates, key=lambda index: self.__credits[index])
+            self.__credits[best] -= sum(self.__priorities[index] for index in candidates)
+            chosen.append(best)
+            candidates.remove(best)
+
+        return chosen
+
+
+class MultiCamera:
+    """Detect cyclists on several video streams with a single network.
+
+    Parameters
+    ----------
+    sources : List[Source]
+        The video streams.
+    on_raspberry : bool
+        Tells the program if we are using a raspberry or a computer.
+    yolo_weights : str
+        The path to the weights file of YOLO.
+    yolo_cfg : str
+        The path to the config file of YOLO.
+    size : int
+        The size of the images converted to blob.
+    path_to_output_video : str, optional
+        The path to the folder that will contain a subfolder `source_<index>` with the output video of each source,
+        by default None.
+    batch_size : int, optional
+        The maximum number of sources whose frames are sent together to the network, by default 1.
+    backend_name : str, optional
+        The name of the inference engine running YOLO, one of `backend.BACKENDS`, by default `backend.OPENCV`.
+    threads : int, optional
+        The number of threads of the inference engine, by default 0 to let the engine choose.
+    raw_cache : str, optional
+        The folder that will contain a subfolder `source_<index>` with the candidate boxes of the network for each
+        source, by default None to not save them.
+    sizes : Sequence[int], optional
+        The sizes of the blob between which the size of the shared network switches, see `resolution`, by default ()
+        to keep `size`.
+    target_latency : float, optional
+        The maximum number of seconds of the inference of the frames sent together, by default 0.0 to keep `size`.
+    **options : Any
+        The other optional keyword arguments given to the `ai.Ai` of each source, like `motion_threshold`.
+    """
+
+    def __init__(
+        self,
+        sources: List[Source],
+        on_raspberry: bool,
+        yolo_weights: str,
+        yolo_cfg: str,
+        size: int,
+        path_to_output_video: Optional[str] = None,
+        batch_size: int = 1,
+        backend_name: str = backend.OPENCV,
+        threads: int = 0,
+        raw_cache: Optional[str] = None,
+        sizes: Sequence[int] = (),
+        target_latency: float = 0.0,
+        **options: Any,
+    ) -> None:
+        self.__sources: List[Source] = sources
+        self.__batch_size: int = batch_size
+        self.__scheduler: Scheduler = Scheduler([source.priority for source in sources])
+        # Set by the capture thread of any source when it reads a frame or its video stream ends
+        self.__ready_event: Event = Event()
+
+        # Load the deep learning network Yolo once for all the sources
+        with timing.phase("model"):
+            self.__backend: backend.Backend = resolution.create(
+                backend_name, yolo_weights, yolo_cfg, size, threads, sizes, target_latency
+            )
+
+        self.__ais: List[ai.Ai] = []
+        for index, source in enumerate(sources):
+            output_folder = None
+            if path_to_output_video is not None:
+                output_folder = os.path.join(path_to_output_video, "source_{}".format(index))
+                os.makedirs(output_folder, exist_ok=True)
+            cache_folder = None
+            if raw_cache is not None:
+                cache_folder = os.path.join(raw_cache, "source_{}".format(index))
+
+            # A camera device is not a regular file
+            is_video_file = os.path.isfile(source.device)
+            logging.info("[MULTI] Source %d: %s, panels %s", index, source.device, source.panel_gpios)
+            self.__ais.append(
+                ai.Ai(
+                    on_raspberry,
+                    False,
+                    yolo_weights,
+                    yolo_cfg,
+                    size,
+                    source.device if is_video_file else None,
+                    output_folder,
+                    inference_backend=self.__backend,
+                    camera_device=source.device,
+                    raw_cache=cache_folder,
+                    ready_event=self.__ready_event,
+                    **options,
+                )
+            )
+
+    def run(self) -> None:
+        """Process the sources until all their video streams end."""
+        start_time = time.time()
+        first_frame_start = time.perf_counter()
+        fps = [FPS().start() for _ in self.__ais]
+        nb_frames = [0] * len(self.__ais)
+        running = set(range(len(self.__ais)))
+
+        for ai_instance in self.__ais:
+            ai_instance.start()
+
+        while len(running) > 0:
+            batch = MultiCamera.__next_batch(self, running)
+            if len(batch) == 0:
+                continue
+
+            # The frames of all the sources are sent to the output layers at once
+            crops = [crop for _, _, _, _, source_crops in batch for crop in source_crops]
+            outs_per_crop = iter(self.__backend.infer(crops) if len(crops) > 0 else [])
+
+            for index, frames, inferred, detected, _ in batch:
+                nb_frames[index] += len(frames)
+                self.__ais[index].finish_images(
+                    frames, inferred, detected, outs_per_crop, self.__sources[index].panel_gpios, fps[index]
+                )
+
+            if first_frame_start is not None:
+                timing.record("first frame", time.perf_counter() - first_frame_start)
+                timing.report()
+                first_frame_start = None
+
+        logging.debug("[MULTI] --- {:.2f} seconds ---".format(time.time() - start_time))
+        for index, ai_instance in enumerate(self.__ais):
+            fps[index].stop()
+            logging.debug("[MULTI] Source %d: %d frames, approx. FPS: %.2f", index, nb_frames[index], fps[index].fps())
+            ai_instance.stop(fps[index])
+
+        # ru_maxrss is in kilobytes on Linux
+        logging.debug(
+            "[MULTI] %d sources with one network, max resident memory: %.1f MB",
+            len(self.__ais),
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        )
+
+    def __next_batch(
+        self, running: Set[int]
+    ) -> List[Tuple[int, List[numpy.ndarray], List[bool], List[bool], List[numpy.ndarray]]]:
+        """Read and prepare the next frames of the chosen sources, the ended sources are removed from `running`."""
+        # Cleared before looking at the sources, so that a frame read in between sets it again
+        self.__ready_event.clear()
+        ready = [index for index in sorted(running) if self.__ais[index].frame_ready()]
+        if len(ready) == 0:
+            # No frame of any source is ready, wait for the first one without blocking on a single source
+            self.__ready_event.wait()
+            return []
+
+        batch = []
+        for index in self.__scheduler.pick(ready, self.__batch_size):
+            frames = self.__ais[index].get_next_images()
+            if len(frames) == 0:
+                running.discard(index)
+            else:
+                batch.append((index, frames, *self.__ais[index].prepare_images(frames)))
+
+        return batch
@@ -0,0 +1,269 @@
+"""Process an input video on several CPU cores.
+
+The video is split into ranges of frames and each range is processed by a worker process with its own network.
+The annotated segments are then merged in order into `video_processed.mp4`, or their clips around the detections are
+moved to the output folder, and the logs of the workers are emitted in order by the main process, as if the video had
+been processed frame by frame.
+"""
+import time
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess  # noqa: S404 ffmpeg is only called with a list of arguments
+import tempfile
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+from clearway.ai import ai, rawcache
+
+OUTPUT_VIDEO_NAME: str = "video_processed.mp4"
+"""The name of the output video in the output folder."""
+
+
+class _Segment(NamedTuple):
+    """The work given to a worker process."""
+
+    yolo_weights: str
+    yolo_cfg: str
+    size: int
+    path_to_input_video: str
+    path_to_output_video: Optional[str]
+    frame_range: Optional[Tuple[int, int]]
+    log_level: int
+    options: Dict[str, Any]
+    """The optional keyword arguments of `ai.Ai`."""
+
+
+class _RecordCollector(logging.Handler):
+    """Keep the log records of a worker process to send them back to the main process."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Merge the arguments in the message, like `logging.handlers.QueueHandler`, so the record can be pickled
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+def split_frame_ranges(nb_frames: int, nb_ranges: int) -> List[Tuple[int, int]]:
+    """Split the frames of a video into contiguous ranges of almost the same length.
+
+    Parameters
+    ----------
+    nb_frames : int
+        The number of frames of the video.
+    nb_ranges : int
+        The maximum number of ranges.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        The ranges [start, stop) of frames, in order and without empty range.
+    """
+    nb_ranges = max(1, min(nb_ranges, nb_frames))
+    bounds = [nb_frames * i // nb_ranges for i in range(nb_ranges + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(nb_ranges) if bounds[i] < bounds[i + 1]]
+
+
+def _process_segment(segment: _Segment) -> List[logging.LogRecord]:
+    """Process a range of frames of the input video in a worker process.
+
+    Parameters
+    ----------
+    segment : _Segment
+        The range of frames to process and the configuration of the network.
+
+    Returns
+    -------
+    List[logging.LogRecord]
+        The log records emitted while processing the range.
+    """
+    collector = _RecordCollector()
+    root_logger = logging.getLogger()
+    root_logger.handlers = [collector]
+    root_logger.setLevel(segment.log_level)
+
+    ai_instance = ai.Ai(
+        False,
+        False,
+        segment.yolo_weights,
+        segment.yolo_cfg,
+        segment.size,
+        segment.path_to_input_video,
+        segment.path_to_output_video,
+        frame_range=segment.frame_range,
+        **segment.options,
+    )
+    # No GPIO in the workers, the panels are driven by the main process only
+    ai_instance.bicycle_detector(())
+
+    return collector.records
+
+
+def move_clips(segment_folders: List[str], output_folder: str) -> None:
+    """Move the clips around the detections recorded by the workers to the output folder.
+
+    The clips are named after their first frame in the input video, so they do not collide. A clip can be cut in two
+    at the end of a segment.
+
+    Parameters
+    ----------
+    segment_folders : List[str]
+        The output folders of the segments.
+    output_folder : str
+        The folder of the clips.
+    """
+    for segment_folder in segment_folders:
+        for clip_file in sorted(os.listdir(segment_folder)):
+            shutil.move(os.path.join(segment_folder, clip_file), output_folder)
+
+
+def merge_videos(segment_files: List[str], output_file: str) -> None:
+    """Concatenate the videos of the segments, in order.
+
+    The segments are concatenated without re-encoding with `ffmpeg` if it is installed,
+    otherwise they are decoded and encoded again with OpenCV.
+
+    Parameters
+    ----------
+    segment_files : List[str]
+        The paths to the videos of the segments, in order.
+    output_file : str
+        The path to the merged video.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+
+    if ffmpeg is not None:
+        list_file = output_file + ".txt"
+        with open(list_file, "w") as file:
+            file.writelines("file '{}'\n".format(os.path.abspath(path)) for path in segment_files)
+        try:
+            subprocess.run(  # noqa: S603 no shell and the arguments are paths
+                [
+                    ffmpeg,
+                    "-y",
+                    "-loglevel",
+                    "error",
+                    "-f",
+                    "concat",
+                    "-safe",
+                    "0",
+                    "-i",
+                    list_file,
+                    "-c",
+                    "copy",
+                    output_file,
+                ],
+                check=True,
+            )
+        finally:
+            os.remove(list_file)
+        return
+
+    output_video: Optional[cv2.VideoWriter] = None
+    for path in segment_files:
+        segment_video = cv2.VideoCapture(path)
+        read_ok, img = segment_video.read()
+        while read_ok:
+            if output_video is None:
+                four_cc = cv2.VideoWriter_fourcc("m", "p", "4", "v")
+                output_video = cv2.VideoWriter(output_file, four_cc, fps=15, frameSize=(img.shape[1], img.shape[0]))
+            output_video.write(img)
+            read_ok, img = segment_video.read()
+        segment_video.release()
+
+    if output_video is not None:
+        output_video.release()
+
+
+def process_video(
+    yolo_weights: str,
+    yolo_cfg: str,
+    size: int,
+    path_to_input_video: str,
+    path_to_output_video: Optional[str] = None,
+    jobs: Optional[int] = None,
+    **options: Any,
+) -> None:
+    """Process an input video with several worker processes.
+
+    Parameters
+    ----------
+    yolo_weights : str
+        The path to the weights file of YOLO.
+    yolo_cfg : str
+        The path to the config file of YOLO.
+    size : int
+        The size of the images converted to blob.
+    path_to_input_video : str
+        The path to the input video that is going to be processed.
+    path_to_output_video : str, optional
+        The path to the folder that will contain the output video with boxes around detected bicycles,
+        by default None.
+    jobs : int, optional
+        The number of worker processes, by default None to use one per CPU core.
+    **options : Any
+        The optional keyword arguments given to the `ai.Ai` of each worker, like `batch_size`.
+    """
+    start_time: float = time.time()
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    video_stream = cv2.VideoCapture(path_to_input_video)
+    nb_frames = int(video_stream.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_stream.release()
+
+    frame_ranges: List[Optional[Tuple[int, int]]] = list(split_frame_ranges(nb_frames, jobs))
+    if len(frame_ranges) == 0:
+        logging.warning("[OFFLINE] The number of frames of the video is unknown, it is processed by a single worker")
+        frame_ranges = [None]
+
+    logging.info("[OFFLINE] Process %d frames with %d worker processes", nb_frames, len(frame_ranges))
+
+    if options.get("raw_cache") is not None:
+        # The files of a previous run with another split of the frames would be merged with the ones of the workers
+        options = dict(options, raw_cache_run=rawcache.start_run(options["raw_cache"]))
+
+    with tempfile.TemporaryDirectory(prefix="clearway_", dir=path_to_output_video) as temporary_folder:
+        segments = []
+        segment_files = []
+        for index, frame_range in enumerate(frame_ranges):
+            segment_folder = None
+            if path_to_output_video is not None:
+                segment_folder = os.path.join(temporary_folder, str(index))
+                os.mkdir(segment_folder)
+                segment_files.append(os.path.join(segment_folder, OUTPUT_VIDEO_NAME))
+
+            segments.append(
+                _Segment(
+                    yolo_weights,
+                    yolo_cfg,
+                    size,
+                    path_to_input_video,
+                    segment_folder,
+                    frame_range,
+                    logging.getLogger().getEffectiveLevel(),
+                    options,
+                )
+            )
+
+        # Spawn the workers, forking a process running the panel threads and OpenCV is not safe
+        with multiprocessing.get_context("spawn").Pool(len(segments)) as pool:
+            # The records of each segment are emitted in order as soon as the previous segments are done
+            for index, records in enumerate(pool.imap(_process_segment, segments)):
+                for record in records:
+                    logging.getLogger(record.name).handle(record)
+                logging.debug("[OFFLINE] End of the segment %d: %s", index, frame_ranges[index])
+
+        if path_to_output_video is not None and options.get("clip_before", 0) + options.get("clip_after", 0) > 0:
+            move_clips([os.path.dirname(segment_file) for segment_file in segment_files], path_to_output_video)
+        elif path_to_output_video is not None:
+            merge_videos(segment_files, os.path.join(path_to_output_video, OUTPUT_VIDEO_NAME))
+
+    logging.debug("[OFFLINE] --- {:.2f} seconds ---".format(time.time() - start_time))
@@ -0,0 +1,260 @@
+"""Quantize an ONNX export of YOLO to INT8 and compare it with the float model.
+
+The weights and the activations of the model are quantized to 8 bits by ONNX Runtime. The ranges of the activations
+are calibrated on frames of videos, so they match the images seen by the camera. The quantized model is then run by
+the `onnxruntime` backend like the float one.
+
+The package `onnxruntime` must be installed.
+"""
+import time
+import logging
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy
+import cv2
+import onnxruntime
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+from clearway.ai import backend, decode, tracker
+
+THRESHOLD: float = 0.5
+"""The minimum objectness of a detection compared between the models."""
+
+MATCH_IOU: float = 0.5
+"""The minimum Intersection over Union between a float and a quantized detection for them to agree."""
+
+
+class Report(NamedTuple):
+    """The comparison of the quantized model with the float model."""
+
+    nb_frames: int
+    """The number of frames processed by each model."""
+    float_latency: float
+    """The median time in seconds to process a frame with the float model."""
+    quantized_latency: float
+    """The median time in seconds to process a frame with the quantized model."""
+    float_detections: int
+    """The number of objects detected by the float model."""
+    quantized_detections: int
+    """The number of objects detected by the quantized model."""
+    matched_detections: int
+    """The number of objects detected by both models."""
+
+    @property
+    def speedup(self) -> float:
+        """How many times the quantized model is faster than the float model."""
+        return self.float_latency / self.quantized_latency if self.quantized_latency > 0 else 0.0
+
+    @property
+    def agreement(self) -> float:
+        """The fraction of the detections of both models that agree, 1 if none of the models detects anything."""
+        total = self.float_detections + self.quantized_detections
+        return 2 * self.matched_detections / total if total > 0 else 1.0
+
+
+def read_frames(videos: Sequence[str], nb_frames: int) -> List[numpy.ndarray]:
+    """Read frames evenly spread over the videos.
+
+    Parameters
+    ----------
+    videos : Sequence[str]
+        The paths to the videos.
+    nb_frames : int
+        The number of frames to read from each video, at most.
+
+    Returns
+    -------
+    List[numpy.ndarray]
+        The BGR frames.
+    """
+    frames = []
+    for path in videos:
+        video_stream = cv2.VideoCapture(path)
+        step = max(1, int(video_stream.get(cv2.CAP_PROP_FRAME_COUNT)) // nb_frames)
+
+        index = 0
+        read_ok, img = video_stream.read()
+        while read_ok and index < step * nb_frames:
+            if index % step == 0:
+                frames.append(img)
+            index += 1
+            read_ok, img = video_stream.read()
+
+        video_stream.release()
+        logging.debug("[QUANTIZE] %d frames read from %s", index // step, path)
+
+    return frames
+
+
+def split_frames(frames: List[numpy.ndarray], holdout: float) -> Tuple[List[numpy.ndarray], List[numpy.ndarray]]:
+    """Split the frames between the calibration and the comparison of the models.
+
+    The models must be compared on frames not used for the calibration, otherwise the agreement of the quantized model
+    is measured on the data it was fitted to and overstates its accuracy.
+
+    Parameters
+    ----------
+    frames : List[numpy.ndarray]
+        The frames given by `read_frames`.
+    holdout : float
+        The fraction of the frames, strictly between 0 and 1, kept for the comparison. They are spread over the frames,
+        every other frame with 0.5.
+
+    Returns
+    -------
+    Tuple[List[numpy.ndarray], List[numpy.ndarray]]
+        The frames calibrating the model, and the frames comparing the models.
+
+    Raises
+    ------
+    ValueError
+        One of the two sets of frames is empty.
+    """
+    calibration_frames: List[numpy.ndarray] = []
+    comparison_frames: List[numpy.ndarray] = []
+    for index, img in enumerate(frames):
+        # The frame is held out each time the number of held out frames must grow by one
+        if int((index + 1) * holdout) > int(index * holdout):
+            comparison_frames.append(img)
+        else:
+            calibration_frames.append(img)
+
+    if len(calibration_frames) == 0 or len(comparison_frames) == 0:
+        raise ValueError("[QUANTIZE] {} frames can not be split with a holdout of {}".format(len(frames), holdout))
+
+    return calibration_frames, comparison_frames
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """Give the frames to the calibration of the activations, as blobs of YOLO.
+
+    Parameters
+    ----------
+    frames : List[numpy.ndarray]
+        The BGR calibration frames.
+    input_name : str
+        The name of the input of the model.
+    size : int
+        The size of the images converted to blob.
+    """
+
+    def __init__(self, frames: List[numpy.ndarray], input_name: str, size: int) -> None:
+        self.__frames: List[numpy.ndarray] = frames
+        self.__input_name: str = input_name
+        self.__size: int = size
+        self.__iterator: Iterator[numpy.ndarray] = iter(frames)
+
+    def get_next(self) -> Optional[Dict[str, numpy.ndarray]]:
+        """Return the input of the model for the next frame, `None` after the last frame."""
+        img = next(self.__iterator, None)
+        if img is None:
+            return None
+        return {self.__input_name: backend.to_blob([img], self.__size)}
+
+    def rewind(self) -> None:
+        """Start again from the first frame."""
+        self.__iterator = iter(self.__frames)
+
+
+def quantize_model(
+    float_model: str, quantized_model: str, frames: List[numpy.ndarray], size: int, per_channel: bool = False
+) -> None:
+    """Quantize the weights and the activations of an ONNX model to INT8.
+
+    Parameters
+    ----------
+    float_model : str
+        The path to the float ONNX model.
+    quantized_model : str
+        The path to the quantized ONNX model written.
+    frames : List[numpy.ndarray]
+        The BGR frames used to calibrate the ranges of the activations.
+    size : int
+        The size of the images converted to blob.
+    per_channel : bool, optional
+        `True` to quantize the weights of each channel of the convolutions with its own range, more accurate but
+        slower on some CPUs, by default `False`.
+    """
+    input_name = onnxruntime.InferenceSession(float_model, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    logging.info("[QUANTIZE] Calibrate %s on %d frames", float_model, len(frames))
+    start_time = time.perf_counter()
+    quantize_static(
+        float_model,
+        quantized_model,
+        FrameCalibrationReader(frames, input_name, size),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel,
+    )
+    logging.info("[QUANTIZE] %s written in %.1f s", quantized_model, time.perf_counter() - start_time)
+
+
+def _detect(detector: backend.Backend, img: numpy.ndarray) -> numpy.ndarray:
+    """Return the boxes of the objects detected by the model in the frame, whatever their class."""
+    height, width = img.shape[:2]
+    # The objectness column is used as the class, so the detections of every class are compared
+    boxes, confidences = decode.decode_output_layers(detector.infer([img]), width, height, decode.OBJECTNESS, THRESHOLD)
+    return boxes[decode.non_maximum_suppression(boxes, confidences, THRESHOLD)]
+
+
+def _latency(detector: backend.Backend, frames: List[numpy.ndarray]) -> float:
+    """Return the median time in seconds to process a frame, after a warm up run."""
+    detector.infer(frames[:1])
+    latencies = []
+    for img in frames:
+        start_time = time.perf_counter()
+        detector.infer([img])
+        latencies.append(time.perf_counter() - start_time)
+    return float(numpy.median(latencies))
+
+
+def compare_models(float_model: str, quantized_model: str, frames: List[numpy.ndarray], size: int) -> Report:
+    """Compare the latency and the detections of the quantized model with the float model.
+
+    A detection of the float model agrees with a detection of the quantized model if their boxes overlap by at least
+    `MATCH_IOU`.
+
+    Parameters
+    ----------
+    float_model : str
+        The path to the float ONNX model.
+    quantized_model : str
+        The path to the quantized ONNX model.
+    frames : List[numpy.ndarray]
+        The BGR frames processed by both models, at least one.
+    size : int
+        The size of the images converted to blob.
+
+    Returns
+    -------
+    Report
+        The comparison of the models.
+    """
+    float_detector = backend.create(backend.ONNXRUNTIME, float_model, "", size)
+    quantized_detector = backend.create(backend.ONNXRUNTIME, quantized_model, "", size)
+
+    float_detections = quantized_detections = matched_detections = 0
+    for img in frames:
+        float_boxes = _detect(float_detector, img)
+        quantized_boxes = _detect(quantized_detector, img)
+        float_detections += len(float_boxes)
+        quantized_detections += len(quantized_boxes)
+
+        if len(float_boxes) > 0 and len(quantized_boxes) > 0:
+            overlaps = tracker.iou(float_boxes, quantized_boxes)
+            # Greedy matching, each detection agrees with at most one detection of the other model
+            while overlaps.size > 0 and overlaps.max() >= MATCH_IOU:
+                i, j = numpy.unravel_index(numpy.argmax(overlaps), overlaps.shape)
+                overlaps[i, :] = 0
+                overlaps[:, j] = 0
+                matched_detections += 1
+
+    return Report(
+        len(frames),
+        _latency(float_detector, frames),
+        _latency(quantized_detector, frames),
+        float_detections,
+        quantized_detections,
+        matched_detections,
+    )
@@ -0,0 +1,373 @@
+"""Save the candidate boxes of the network for each processed frame, and decode them again with other thresholds.
+
+Tuning the threshold of the class score and the thresholds of the Non Maximum Suppression on recorded videos would
+otherwise need to run the network again on every frame. While a video is processed, `RawCacheWriter` keeps the rows
+of the output layers whose objectness is above `FLOOR`, with the objectness and the score of every class, so another
+class or any threshold above `FLOOR` can be decoded again by `redecode` without the network.
+
+The rows are appended as `float16` to a binary file, and their location to an index file, so a crash loses nothing
+already written. Each writer has its own pair of files named after the run and its first frame, so the worker
+processes of `offline.process_video` write to the same folder. The run is started by `start_run` in the parent process
+before the workers: it removes the files of the previous runs and gives the identifier of the run shared by the
+writers, which `RawCache` checks so that the files of another run in a reused folder are never merged. `RawCache` maps
+the files in memory, so only the rows of the decoded frames are read from the disk.
+
+```text
+raw_cache/
+    rawcache.json               # the run, the number of columns of the rows and `FLOOR`
+    rows_<run>_00000000.bin     # the rows of the frames from 0, (N, columns) float16
+    index_<run>_00000000.bin    # the frame, the part of the frame and the range of its rows, (M, 4) int64
+```
+"""
+import time
+import logging
+import glob
+import json
+import os
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy
+import cv2
+from clearway.ai import decode, roi
+
+FLOOR: float = 0.05
+"""The minimum objectness of a row to be saved, the lowest threshold that can be decoded again."""
+
+CLASSES: Dict[str, int] = {"person": 5, "bicycle": 6, "car": 7, "motorbike": 8, "bus": 10, "truck": 12}
+"""The column of the score of the road users in the rows of the output layers of YOLO trained on COCO."""
+
+_META_FILE: str = "rawcache.json"
+"""The name of the file describing the rows in the folder of the cache."""
+
+_COLOR: Tuple[int, int, int] = (0, 0, 255)
+"""The color of the boxes drawn, the same as `ai.Ai`."""
+
+
+def start_run(folder: str) -> str:
+    """Start a new run of the cache in a folder, before its writers are created.
+
+    Parameters
+    ----------
+    folder : str
+        The folder of the cache, created if needed. The files of the previous runs are removed.
+
+    Returns
+    -------
+    str
+        The identifier of the run, given to each `RawCacheWriter` of the run.
+    """
+    os.makedirs(folder, exist_ok=True)
+    for path in glob.glob(os.path.join(folder, "rows_*.bin")) + glob.glob(os.path.join(folder, "index_*.bin")):
+        os.remove(path)
+
+    run = uuid.uuid4().hex
+    _write_meta(folder, {"run": run})
+    return run
+
+
+def _write_meta(folder: str, meta: Dict[str, Any]) -> None:
+    """Replace the file describing the rows at once, the writers of a run may write it at the same time."""
+    temporary_path = os.path.join(folder, "{}.{}.tmp".format(_META_FILE, uuid.uuid4().hex))
+    with open(temporary_path, "w") as file:
+        json.dump(meta, file)
+    os.replace(temporary_path, os.path.join(folder, _META_FILE))
+
+
+class RawCacheWriter:
+    """Append the candidate rows of the processed frames to the folder of the cache.
+
+    Parameters
+    ----------
+    folder : str
+        The folder of the cache, created if needed.
+    first_frame : int, optional
+        The index of the first frame processed, which names the files of the writer, by default 0.
+    floor : float, optional
+        The minimum objectness of a row to be saved, by default `FLOOR`.
+    run : str, optional
+        The identifier of the run given by `start_run`, shared by the writers of the worker processes, by default
+        None to start a new run, removing the files of the previous runs.
+    """
+
+    def __init__(self, folder: str, first_frame: int = 0, floor: float = FLOOR, run: Optional[str] = None) -> None:
+        self.__folder: str = folder
+        self.__floor: float = floor
+        self.__run: str = run if run is not None else start_run(folder)
+        self.__columns: Optional[int] = None
+        self.__rows_file = open(os.path.join(folder, "rows_{}_{:08d}.bin".format(self.__run, first_frame)), "wb")
+        self.__index_file = open(os.path.join(folder, "index_{}_{:08d}.bin".format(self.__run, first_frame)), "wb")
+        self.__nb_rows: int = 0
+
+        self.nb_entries: int = 0
+        """The number of parts of frames saved."""
+
+    def add(self, frame_index: int, crop_index: int, outs: numpy.ndarray) -> None:
+        """Save the candidate rows of a part of a frame.
+
+        Parameters
+        ----------
+        frame_index : int
+            The index of the frame in the video.
+        crop_index : int
+            The index of the part of the frame sent to the network, the region of interest or 0 for the whole frame.
+        outs : numpy.ndarray
+            The (rows, columns) output of the network for the part of the frame.
+        """
+        if self.__columns is None:
+            self.__columns = outs.shape[-1]
+            _write_meta(self.__folder, {"run": self.__run, "columns": self.__columns, "floor": self.__floor})
+
+        rows = outs[outs[:, decode.OBJECTNESS] > self.__floor].astype(numpy.float16)
+        self.__rows_file.write(rows.tobytes())
+        self.__index_file.write(
+            numpy.array(
+                [frame_index, crop_index, self.__nb_rows, self.__nb_rows + len(rows)], dtype=numpy.int64
+            ).tobytes()
+        )
+        self.__nb_rows += len(rows)
+        self.nb_entries += 1
+
+    def close(self) -> None:
+        """Flush and close the files of the writer."""
+        self.__rows_file.close()
+        self.__index_file.close()
+        logging.debug("[AI] %d candidate rows of %d parts of frames saved", self.__nb_rows, self.nb_entries)
+
+
+class RawCache:
+    """Read the candidate rows saved by the writers of a folder, mapped in memory.
+
+    Parameters
+    ----------
+    folder : str
+        The folder of the cache.
+
+    Raises
+    ------
+    FileNotFoundError
+        The folder is not a cache.
+    ValueError
+        The run of the folder saved no row.
+    """
+
+    def __init__(self, folder: str) -> None:
+        with open(os.path.join(folder, _META_FILE)) as file:
+            meta = json.load(file)
+        if "columns" not in meta:
+            raise ValueError("[AI] The run {} of the cache {} saved no row".format(meta.get("run"), folder))
+
+        self.floor: float = meta["floor"]
+        """The minimum objectness of the rows saved."""
+        # The parts of each frame and their rows, mapped in the files of the writers
+        self.__entries: Dict[int, List[Tuple[int, numpy.ndarray]]] = {}
+
+        # Only the files of the last run, a reused folder may keep the files of another split of the frames
+        for index_path in sorted(glob.glob(os.path.join(folder, "index_{}_*.bin".format(meta["run"])))):
+            rows_path = os.path.join(folder, os.path.basename(index_path).replace("index_", "rows_", 1))
+            if os.path.getsize(index_path) == 0:
+                continue
+
+            index = numpy.fromfile(index_path, dtype=numpy.int64).reshape(-1, 4)
+            rows = numpy.zeros((0, meta["columns"]), dtype=numpy.float16)
+            if os.path.getsize(rows_path) > 0:
+                rows = numpy.memmap(rows_path, dtype=numpy.float16, mode="r").reshape(-1, meta["columns"])
+
+            for frame_index, crop_index, start, stop in index.tolist():
+                self.__entries.setdefault(frame_index, []).append((crop_index, rows[start:stop]))
+
+    @property
+    def nb_frames(self) -> int:
+        """Return the number of frames saved."""
+        return len(self.__entries)
+
+    @property
+    def frame_indexes(self) -> List[int]:
+        """Return the indexes of the frames saved, in order."""
+        return sorted(self.__entries)
+
+    def candidates(self, frame_index: int) -> List[Tuple[int, numpy.ndarray]]:
+        """Return the candidate rows of a frame.
+
+        Parameters
+        ----------
+        frame_index : int
+            The index of the frame in the video.
+
+        Returns
+        -------
+        List[Tuple[int, numpy.ndarray]]
+            The index of each part of the frame and its (rows, columns) `float16` rows, empty if the frame was not
+            processed by the network.
+        """
+        return self.__entries.get(frame_index, [])
+
+
+class Summary(NamedTuple):
+    """The detections decoded again from a cache."""
+
+    nb_frames: int
+    """The number of frames of the cache."""
+    nb_detections: int
+    """The number of boxes kept."""
+    nb_frames_with_detection: int
+    """The number of frames with at least one box kept."""
+
+
+def decode_frame(
+    candidates: List[Tuple[int, numpy.ndarray]],
+    img: numpy.ndarray,
+    regions_of_interest: List[roi.RegionOfInterest],
+    class_id: int,
+    threshold: float,
+    score_threshold: float,
+    nms_threshold: float,
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Decode the candidate rows of a frame like `ai.Ai.detect_frame`.
+
+    Parameters
+    ----------
+    candidates : List[Tuple[int, numpy.ndarray]]
+        The rows of each part of the frame, given by `RawCache.candidates`.
+    img : numpy.ndarray
+        The frame, or a frame of the same shape.
+    regions_of_interest : List[roi.RegionOfInterest]
+        The regions of interest of the processing, empty if the whole frames were processed.
+    class_id : int
+        The column of the class to detect, see `CLASSES`.
+    threshold : float
+        The minimum score of the class to keep a row.
+    score_threshold : float
+        The minimum confidence of a box kept by the Non Maximum Suppression.
+    nms_threshold : float
+        The maximum overlap between two boxes kept by the Non Maximum Suppression.
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        The (N, 4) boxes kept in the coordinates of the frame, and their (N,) confidences.
+    """
+    all_boxes = [numpy.zeros((0, 4), dtype=numpy.int32)]
+    all_confidences = [numpy.zeros(0, dtype=numpy.float32)]
+
+    for crop_index, rows in candidates:
+        region = regions_of_interest[crop_index] if len(regions_of_interest) > 0 else None
+        height, width = (region.crop(img) if region is not None else img).shape[:2]
+
+        boxes, confidences = decode.decode_output_layers(
+            (numpy.asarray(rows, dtype=numpy.float32),), width, height, class_id, threshold
+        )
+        if region is not None:
+            boxes, confidences = region.to_frame(img, boxes, confidences)
+
+        indexes = decode.non_maximum_suppression(boxes, confidences, score_threshold, nms_threshold)
+        all_boxes.append(boxes[indexes])
+        all_confidences.append(confidences[indexes])
+
+    return numpy.concatenate(all_boxes), numpy.concatenate(all_confidences)
+
+
+def redecode(
+    folder: str,
+    path_to_input_video: str,
+    path_to_output_video: Optional[str] = None,
+    class_id: int = CLASSES["bicycle"],
+    threshold: float = 0.5,
+    score_threshold: float = 0.5,
+    nms_threshold: float = 0.4,
+    regions_of_interest: Optional[Iterable[roi.RegionOfInterest]] = None,
+) -> Summary:
+    """Decode the cache of a video again with other thresholds, and draw the boxes on the video.
+
+    The frames not processed by the network, because nothing moved or because their boxes were tracked, are written
+    without box.
+
+    Parameters
+    ----------
+    folder : str
+        The folder of the cache.
+    path_to_input_video : str
+        The path to the video processed when the cache was saved.
+    path_to_output_video : str, optional
+        The path to the folder that will contain the output video with the boxes, by default None to only count the
+        detections without decoding the video.
+    class_id : int, optional
+        The column of the class to detect, see `CLASSES`, by default the bicycles.
+    threshold : float, optional
+        The minimum score of the class to keep a row, by default 0.5.
+    score_threshold : float, optional
+        The minimum confidence of a box kept by the Non Maximum Suppression, by default 0.5.
+    nms_threshold : float, optional
+        The maximum overlap between two boxes kept by the Non Maximum Suppression, by default 0.4.
+    regions_of_interest : Iterable[roi.RegionOfInterest], optional
+        The regions of interest of the processing, by default None if the whole frames were processed.
+
+    Returns
+    -------
+    Summary
+        The number of detections.
+    """
+    start_time = time.time()
+    raw_cache = RawCache(folder)
+    regions = list(regions_of_interest or ())
+    if min(threshold, score_threshold) < raw_cache.floor:
+        logging.warning(
+            "[AI] The rows under %.2f were not saved, the lower thresholds find less boxes", raw_cache.floor
+        )
+
+    video_stream = cv2.VideoCapture(path_to_input_video)
+    roi.check_regions(
+        regions, int(video_stream.get(cv2.CAP_PROP_FRAME_WIDTH)), int(video_stream.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    )
+    output_video: Optional[cv2.VideoWriter] = None
+    if path_to_output_video is not None:
+        fps = video_stream.get(cv2.CAP_PROP_FPS)
+        output_video = cv2.VideoWriter(
+            os.path.join(path_to_output_video, "video_processed.mp4"),
+            cv2.VideoWriter_fourcc("m", "p", "4", "v"),
+            fps=fps if fps > 0 else 15,
+            frameSize=(
+                int(video_stream.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(video_stream.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            ),
+        )
+        frames = _read_frames(video_stream)
+    else:
+        # Without output video, only the shape of the frames is needed and only the cached frames are decoded
+        img = numpy.zeros(
+            (int(video_stream.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(video_stream.get(cv2.CAP_PROP_FRAME_WIDTH)), 3),
+            dtype=numpy.uint8,
+        )
+        frames = ((frame_index, img) for frame_index in raw_cache.frame_indexes)
+
+    nb_detections = 0
+    nb_frames_with_detection = 0
+    for frame_index, img in frames:
+        boxes, confidences = decode_frame(
+            raw_cache.candidates(frame_index), img, regions, class_id, threshold, score_threshold, nms_threshold
+        )
+        nb_detections += len(boxes)
+        nb_frames_with_detection += int(len(boxes) > 0)
+
+        if output_video is not None:
+            for (x, y, w, h), confidence in zip(boxes.tolist(), confidences.tolist()):
+                cv2.rectangle(img, (x, y), (x + w, y + h), _COLOR, 2)
+                cv2.putText(img, str(int(confidence * 100)), (x, y - 5), cv2.FONT_HERSHEY_DUPLEX, 1, _COLOR, 2)
+            output_video.write(img)
+
+    video_stream.release()
+    if output_video is not None:
+        output_video.release()
+
+    logging.debug("[AI] --- {:.2f} seconds to decode the cache again ---".format(time.time() - start_time))
+    return Summary(raw_cache.nb_frames, nb_detections, nb_frames_with_detection)
+
+
+def _read_frames(video_stream: cv2.VideoCapture) -> Iterator[Tuple[int, numpy.ndarray]]:
+    """Yield the index and the image of each frame of the video."""
+    frame_index = 0
+    read_ok, img = video_stream.read()
+    while read_ok:
+        yield frame_index, img
+        frame_index += 1
+        read_ok, img = video_stream.read()
@@ -0,0 +1,206 @@
+"""Record clips of the processed frames around the detections, instead of the whole video stream.
+
+The last processed frames are kept in a preallocated ring buffer. A detection opens a clip starting `seconds_before`
+the detection, every new detection extends it until `seconds_after` the last one. The clips are encoded on a
+dedicated thread while the next frames are processed, straight from the ring buffer.
+
+The ring buffer holds the frames of a clip around a single detection: a clip is only cut if its encoding lags that far
+behind the processing.
+"""
+from threading import Condition, Thread
+import time
+import logging
+import os
+from collections import deque
+from typing import Deque, List, Optional
+
+import numpy
+import cv2
+
+
+class EventRecorder:
+    """Keep the last processed frames and encode the clips around the detections on a dedicated thread.
+
+    Parameters
+    ----------
+    folder : str
+        The folder of the clips.
+    fps : float
+        The number of frames per second of the video stream, and of the clips.
+    seconds_before : float
+        The number of seconds recorded before a detection.
+    seconds_after : float
+        The number of seconds recorded after the last detection of a clip.
+    first_frame : int, optional
+        The number of the first frame added in the video stream, used to name the clips, by default 0.
+    prefix : str, optional
+        The start of the name of the clips, followed by the number of their first frame, by default `"clip"`.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        fps: float,
+        seconds_before: float,
+        seconds_after: float,
+        first_frame: int = 0,
+        prefix: str = "clip",
+    ) -> None:
+        self.__folder: str = folder
+        self.__fps: float = fps
+        self.__frames_before: int = int(round(seconds_before * fps))
+        self.__frames_after: int = max(1, int(round(seconds_after * fps)))
+        self.__capacity: int = self.__frames_before + 1 + self.__frames_after
+        self.__first_frame: int = first_frame
+        self.__prefix: str = prefix
+        self.__ring: Optional[numpy.ndarray] = None
+        self.__scratch: Optional[numpy.ndarray] = None
+        # The number of frames added, the frame `n` is kept at `n % capacity` until it is overwritten
+        self.__head: int = 0
+        # The range [start, stop) of the frames of each clip waiting to be encoded, the last one can be extended
+        self.__clips: Deque[List[int]] = deque()
+        self.__last_stop: int = 0
+        self.__closed: bool = False
+        self.__condition: Condition = Condition()
+        self.__thread: Optional[Thread] = None
+
+        self.clips_written: int = 0
+        """The number of clips encoded."""
+        self.frames_lost: int = 0
+        """The number of frames of the clips overwritten before being encoded."""
+        self.encode_time: float = 0.0
+        """The total time in seconds spent encoding the clips."""
+
+    @property
+    def memory(self) -> int:
+        """The size in bytes of the ring buffer, 0 until the first frame is added."""
+        return self.__ring.nbytes if self.__ring is not None else 0
+
+    def start(self) -> None:
+        """Start the encoding thread."""
+        logging.debug(
+            "[RECORDER] Record %d frames before and %d frames after the detections",
+            self.__frames_before,
+            self.__frames_after,
+        )
+        self.__thread = Thread(target=self.__run, name="[AI-RECORDER]", daemon=True)
+        self.__thread.start()
+
+    def add(self, img: numpy.ndarray, detected: bool) -> None:
+        """Keep a processed frame, and open or extend a clip if something is detected in it.
+
+        The frame is copied into the ring buffer, so it can be reused as soon as this returns.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The processed frame.
+        detected : bool
+            `True` if something is detected in the frame.
+        """
+        with self.__condition:
+            if self.__ring is None:
+                self.__ring = numpy.empty((self.__capacity,) + img.shape, dtype=img.dtype)
+                self.__scratch = numpy.empty_like(img)
+                logging.info(
+                    "[RECORDER] Ring buffer of %d frames: %.1f MB", self.__capacity, self.__ring.nbytes / 1024**2
+                )
+
+            slot = self.__ring[self.__head % self.__capacity]
+            if img.shape == slot.shape:
+                numpy.copyto(slot, img)
+            else:
+                # The size of the frames of the video stream changed
+                cv2.resize(img, (slot.shape[1], slot.shape[0]), dst=slot)
+
+            if detected:
+                if len(self.__clips) > 0 and self.__clips[-1][1] > self.__head:
+                    # The frame is already in the last clip
+                    self.__clips[-1][1] = self.__head + 1 + self.__frames_after
+                else:
+                    start = max(0, self.__head - self.__frames_before, self.__last_stop)
+                    self.__clips.append([start, self.__head + 1 + self.__frames_after])
+                self.__last_stop = self.__clips[-1][1]
+
+            self.__head += 1
+            self.__condition.notify_all()
+
+    def stop(self) -> None:
+        """Encode the clips left, cut at the last frame added, and stop the encoding thread."""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        else:
+            # Not started, the clips left are encoded by the caller
+            self.__run()
+
+    def log_counters(self) -> None:
+        """Log the counters of the recorder."""
+        logging.debug("[RECORDER] Nb of clips: %d", self.clips_written)
+        logging.debug("[RECORDER] Nb of frames lost before being encoded: %d", self.frames_lost)
+        logging.debug("[RECORDER] ring buffer: %d frames, %.1f MB", self.__capacity, self.memory / 1024**2)
+        if self.clips_written > 0:
+            logging.debug("[RECORDER] encode time: mean %.2f s per clip", self.encode_time / self.clips_written)
+
+    def __next_frame(self, clip: List[int], frame_number: int) -> Optional[int]:
+        # Copy the frame into the scratch frame once it is added, return its number or `None` at the end of the clip
+        with self.__condition:
+            while not self.__closed and frame_number < clip[1] and frame_number >= self.__head:
+                self.__condition.wait()
+
+            if frame_number >= min(clip[1], self.__head):
+                return None
+
+            oldest = self.__head - self.__capacity
+            if frame_number < oldest:
+                # The encoding lags behind, these frames were overwritten
+                self.frames_lost += min(oldest, clip[1]) - frame_number
+                frame_number = oldest
+                if frame_number >= clip[1]:
+                    return None
+
+            numpy.copyto(self.__scratch, self.__ring[frame_number % self.__capacity])
+            return frame_number
+
+    def __encode(self, clip: List[int]) -> None:
+        path = os.path.join(self.__folder, "{}_{:06d}.mp4".format(self.__prefix, self.__first_frame + clip[0]))
+        video_writer: Optional[cv2.VideoWriter] = None
+        nb_frames = 0
+        encode_time = 0.0
+
+        frame_number = EventRecorder.__next_frame(self, clip, clip[0])
+        while frame_number is not None:
+            start_time = time.perf_counter()
+            if video_writer is None:
+                height, width = self.__scratch.shape[:2]
+                video_writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), self.__fps, (width, height))
+            video_writer.write(self.__scratch)
+            encode_time += time.perf_counter() - start_time
+            nb_frames += 1
+            frame_number = EventRecorder.__next_frame(self, clip, frame_number + 1)
+
+        if video_writer is not None:
+            start_time = time.perf_counter()
+            video_writer.release()
+            encode_time += time.perf_counter() - start_time
+            self.clips_written += 1
+            self.encode_time += encode_time
+            logging.info("[RECORDER] Clip %s: %d frames encoded in %.2f s", path, nb_frames, encode_time)
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while not self.__closed and len(self.__clips) == 0:
+                    self.__condition.wait()
+                if len(self.__clips) == 0:
+                    break
+                clip = self.__clips[0]
+
+            EventRecorder.__encode(self, clip)
+
+            with self.__condition:
+                self.__clips.popleft()
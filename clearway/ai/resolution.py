@@ -0,0 +1,223 @@
+"""Switch the size of the blob between levels from the latency measured on the last frames.
+
+The size chosen at startup is a guess: a Raspberry Pi throttled in a hot cabinet or busy with another process falls
+behind the camera, while a quiet scene on a cool CPU leaves room for a larger, more accurate blob. The latency of the
+inference of each frame is measured, and its 90th percentile over a rolling window drives the size:
+
+- above the target latency, the size steps down to the next smaller level;
+- when the latency predicted at the next larger level, growing with the number of pixels of the blob, stays under
+  `headroom` times the target, the size steps up.
+
+The gap between the target and `headroom` times the target, and the window measured again after each change, keep the
+size from switching back and forth. Each change is logged with its reason, for example
+`[AI] Size 320 -> 224: p90 latency 182.4 ms over the last 30 frames above the target 150.0 ms`.
+
+A backend is created and warmed up for each level at startup, each with its own network, so a change of size only
+switches the backend used for the next frames, without reading or reallocating the network.
+"""
+import time
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy
+from clearway.ai import backend, metrics
+
+PERCENTILE: float = 90
+"""The percentile of the latency of the frames of the window compared with the target."""
+
+
+class Change(NamedTuple):
+    """A change of the size of the blob."""
+
+    previous: int
+    """The size of the blob before the change."""
+    size: int
+    """The size of the blob after the change."""
+    reason: str
+    """Why the size changed."""
+
+
+class ResolutionController:
+    """Choose the size of the blob from the latency of the last frames.
+
+    Parameters
+    ----------
+    sizes : Iterable[int]
+        The sizes of the blob to choose from, at least one.
+    size : int
+        The size of the blob used first, the nearest level if it is not one of `sizes`.
+    target_latency : float
+        The maximum number of seconds to process a frame.
+    window : int, optional
+        The number of last frames whose latency is compared with the target, also the minimum number of frames
+        between two changes, by default 30.
+    headroom : float, optional
+        The fraction of the target that the latency predicted at the next larger size must stay under to step up,
+        by default 0.8.
+    """
+
+    def __init__(
+        self, sizes: Iterable[int], size: int, target_latency: float, window: int = 30, headroom: float = 0.8
+    ) -> None:
+        self.__sizes: List[int] = sorted(set(sizes))
+        self.__index: int = min(range(len(self.__sizes)), key=lambda index: abs(self.__sizes[index] - size))
+        self.__target_latency: float = target_latency
+        self.__headroom: float = headroom
+        self.__latencies: Deque[float] = deque(maxlen=window)
+
+        self.nb_changes: int = 0
+        """The number of changes of the size."""
+
+    @property
+    def size(self) -> int:
+        """The size of the blob to use for the next frames."""
+        return self.__sizes[self.__index]
+
+    @property
+    def sizes(self) -> List[int]:
+        """The sizes of the blob to choose from, in increasing order."""
+        return list(self.__sizes)
+
+    def record(self, latency: float) -> Optional[Change]:
+        """Add the latency of a frame, and change the size if the latency of the window asks for it.
+
+        Parameters
+        ----------
+        latency : float
+            The number of seconds to process the frame at the current size.
+
+        Returns
+        -------
+        Optional[Change]
+            The change of the size, or None to keep it.
+        """
+        self.__latencies.append(latency)
+        if len(self.__latencies) < self.__latencies.maxlen:
+            return None
+
+        rolling = float(numpy.percentile(self.__latencies, PERCENTILE))
+        summary = "p{:.0f} latency {:.1f} ms over the last {} frames".format(
+            PERCENTILE, rolling * 1000, len(self.__latencies)
+        )
+
+        if rolling > self.__target_latency and self.__index > 0:
+            reason = "{} above the target {:.1f} ms".format(summary, self.__target_latency * 1000)
+            return ResolutionController.__change(self, self.__index - 1, reason)
+
+        if self.__index + 1 < len(self.__sizes):
+            # The latency grows with the number of pixels of the blob
+            larger = self.__sizes[self.__index + 1]
+            predicted = rolling * (larger / self.size) ** 2
+            if predicted < self.__headroom * self.__target_latency:
+                reason = "{}, about {:.1f} ms at size {}, under {:.0f} % of the target {:.1f} ms".format(
+                    summary, predicted * 1000, larger, self.__headroom * 100, self.__target_latency * 1000
+                )
+                return ResolutionController.__change(self, self.__index + 1, reason)
+
+        return None
+
+    def __change(self, index: int, reason: str) -> Change:
+        change = Change(self.size, self.__sizes[index], reason)
+        self.__index = index
+        self.nb_changes += 1
+        # The latency of the new size is measured on a whole window before the next change
+        self.__latencies.clear()
+        return change
+
+
+class AdaptiveBackend(backend.Backend):
+    """Run YOLO with the backend of the size chosen by a `ResolutionController`.
+
+    Parameters
+    ----------
+    backends : Dict[int, backend.Backend]
+        The backend of each size of the controller, already loaded.
+    controller : ResolutionController
+        The choice of the size from the latency of the frames.
+    clock : Callable[[], float], optional
+        The clock measuring the latency in seconds, by default `time.perf_counter`.
+    """
+
+    def __init__(
+        self,
+        backends: Dict[int, backend.Backend],
+        controller: ResolutionController,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        super().__init__(controller.size)
+        self.__backends: Dict[int, backend.Backend] = backends
+        self.__controller: ResolutionController = controller
+        self.__clock: Callable[[], float] = clock
+        self.preprocessor = backends[controller.size].preprocessor
+
+        metrics.register("clearway_blob_size", "The size of the images converted to blob.", lambda: self.size)
+        metrics.register(
+            "clearway_blob_size_changes_total",
+            "The number of changes of the size of the blob.",
+            lambda: controller.nb_changes,
+            "counter",
+        )
+
+    def infer(self, frames: List[numpy.ndarray]) -> List[numpy.ndarray]:
+        start = self.__clock()
+        outs = self.__backends[self.size].infer(frames)
+
+        # Each frame of the batch waits for the whole batch
+        change = self.__controller.record(self.__clock() - start)
+        if change is not None:
+            logging.info("[AI] Size %d -> %d: %s", change.previous, change.size, change.reason)
+            self.size = change.size
+            self.preprocessor = self.__backends[change.size].preprocessor
+
+        return outs
+
+
+def create(
+    name: str,
+    yolo_weights: str,
+    yolo_cfg: str,
+    size: int,
+    threads: int = 0,
+    sizes: Iterable[int] = (),
+    target_latency: float = 0.0,
+) -> backend.Backend:
+    """Create the backend of the given name, switching its size between `sizes` if a target latency is given.
+
+    Parameters
+    ----------
+    name : str
+        The name of the backend, one of `backend.BACKENDS`.
+    yolo_weights : str
+        The path to the weights file of YOLO, or to the ONNX model for `backend.ONNXRUNTIME`.
+    yolo_cfg : str
+        The path to the config file of YOLO, not used by `backend.ONNXRUNTIME`.
+    size : int
+        The size of the images converted to blob, the first size of the levels.
+    threads : int, optional
+        The number of threads of the inference engine, by default 0 to let the engine choose.
+    sizes : Iterable[int], optional
+        The sizes of the blob to choose from, by default () to keep `size`.
+        With `backend.ONNXRUNTIME`, the height and the width of the input of the model must be dynamic.
+    target_latency : float, optional
+        The maximum number of seconds to process a frame, by default 0.0 to keep `size`.
+
+    Returns
+    -------
+    backend.Backend
+        The `AdaptiveBackend` if there are at least two sizes and a target latency, the backend of `size` otherwise.
+    """
+    sizes = sorted(set(sizes))
+    if len(sizes) < 2 or target_latency <= 0:
+        return backend.create(name, yolo_weights, yolo_cfg, size, threads)
+
+    logging.info(
+        "[AI] Switch the size between %s for a latency of %.1f ms", ", ".join(map(str, sizes)), target_latency * 1000
+    )
+    backends = {}
+    for level in sizes:
+        backends[level] = backend.create(name, yolo_weights, yolo_cfg, level, threads, shared=False)
+        # The first forward pass allocates the layers of the network for the size of the blob
+        backends[level].infer([numpy.zeros((level, level, 3), dtype=numpy.uint8)])
+
+    return AdaptiveBackend(backends, ResolutionController(sizes, size, target_latency))
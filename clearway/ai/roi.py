@@ -0,0 +1,164 @@
+"""Regions of interest of the frames, each one driving its own panels.
+
+Only the bounding rectangle of a region is sent to the network, so the sky or the parked cars are not processed and
+a distant cyclist keeps more pixels in the blob. The boxes detected in the rectangle are then moved back to the
+coordinates of the frame, and only the boxes whose center is inside the region are kept.
+"""
+from typing import Any, Dict, FrozenSet, Iterable, Tuple
+
+import numpy
+import cv2
+
+RECTANGLE: str = "rectangle"
+"""The key of a region given by a rectangle `[x, y, width, height]`."""
+
+POLYGON: str = "polygon"
+"""The key of a region given by a polygon `[[x1, y1], [x2, y2], ...]`."""
+
+PANEL_GPIOS: str = "panel_gpios"
+"""The key of the GPIOs of the panels signaling the cyclists detected in a region."""
+
+
+class RegionOfInterest:
+    """A polygon of the frames whose detections are signaled on a subset of the panels.
+
+    Parameters
+    ----------
+    points : Iterable[Iterable[int]]
+        The vertices (x, y) of the polygon, in pixels of the frame.
+    panel_gpios : Iterable[int]
+        The GPIOs of the panels signaling the cyclists detected in the region.
+    """
+
+    def __init__(self, points: Iterable[Iterable[int]], panel_gpios: Iterable[int]) -> None:
+        self.__points: numpy.ndarray = numpy.array([list(point) for point in points], dtype=numpy.int32)
+        self.__panel_gpios: FrozenSet[int] = frozenset(panel_gpios)
+        self.__rectangle: Tuple[int, int, int, int] = cv2.boundingRect(self.__points)
+
+    @classmethod
+    def from_config(cls, region: Dict[str, Any]) -> "RegionOfInterest":
+        """Create a region from its configuration.
+
+        Parameters
+        ----------
+        region : Dict[str, Any]
+            The configuration of the region, with the `PANEL_GPIOS` key and either the `RECTANGLE` or the `POLYGON`
+            key, see `clearway.config.save_config_ai`.
+
+        Returns
+        -------
+        RegionOfInterest
+            The region.
+        """
+        if POLYGON in region:
+            return cls(region[POLYGON], region[PANEL_GPIOS])
+
+        x, y, width, height = region[RECTANGLE]
+        right, bottom = x + width - 1, y + height - 1
+        return cls([(x, y), (right, y), (right, bottom), (x, bottom)], region[PANEL_GPIOS])
+
+    @property
+    def panel_gpios(self) -> FrozenSet[int]:
+        """The GPIOs of the panels signaling the cyclists detected in the region."""
+        return self.__panel_gpios
+
+    @property
+    def points(self) -> numpy.ndarray:
+        """The (N, 2) array of the vertices of the polygon."""
+        return self.__points
+
+    def overlaps(self, width: int, height: int) -> bool:
+        """Return whether the bounding rectangle of the region shares pixels with frames of the given size.
+
+        Parameters
+        ----------
+        width : int
+            The width of the frames.
+        height : int
+            The height of the frames.
+
+        Returns
+        -------
+        bool
+            False if the crop of the region in these frames would be empty.
+        """
+        x, y, w, h = self.__rectangle
+        return x < width and y < height and x + w > 0 and y + h > 0
+
+    def __origin(self, img: numpy.ndarray) -> Tuple[int, int, int, int]:
+        """Return the bounding rectangle of the region clipped to the frame, as (x0, y0, x1, y1)."""
+        height, width = img.shape[:2]
+        x, y, w, h = self.__rectangle
+        return max(0, x), max(0, y), min(width, x + w), min(height, y + h)
+
+    def crop(self, img: numpy.ndarray) -> numpy.ndarray:
+        """Return the bounding rectangle of the region in the frame, without copying it.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The frame.
+
+        Returns
+        -------
+        numpy.ndarray
+            The view of the frame inside the bounding rectangle.
+        """
+        x0, y0, x1, y1 = self.__origin(img)
+        return img[y0:y1, x0:x1]
+
+    def to_frame(
+        self, img: numpy.ndarray, boxes: numpy.ndarray, confidences: numpy.ndarray
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Move the boxes detected in the crop to the coordinates of the frame, keep the ones centered in the region.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The frame.
+        boxes : numpy.ndarray
+            The (N, 4) array of boxes (x, y, width, height) in the coordinates of the crop.
+        confidences : numpy.ndarray
+            The (N,) array of confidences of the boxes.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            The boxes in the coordinates of the frame whose center is inside the region, and their confidences.
+        """
+        x0, y0, _, _ = self.__origin(img)
+        boxes = boxes + numpy.array([x0, y0, 0, 0], dtype=boxes.dtype)
+
+        centers = boxes[:, :2] + boxes[:, 2:] / 2
+        inside = numpy.array(
+            [cv2.pointPolygonTest(self.__points, (float(x), float(y)), False) >= 0 for x, y in centers], dtype=bool
+        )
+
+        return boxes[inside], confidences[inside]
+
+
+def check_regions(regions: Iterable[RegionOfInterest], width: int, height: int) -> None:
+    """Check that no region is entirely outside of the frames, the network can not process an empty crop.
+
+    Parameters
+    ----------
+    regions : Iterable[RegionOfInterest]
+        The regions of interest.
+    width : int
+        The width of the frames, 0 if unknown to skip the check.
+    height : int
+        The height of the frames, 0 if unknown to skip the check.
+
+    Raises
+    ------
+    ValueError
+        If a region is entirely outside of the frames.
+    """
+    if width <= 0 or height <= 0:
+        return
+
+    outside = [region.points.tolist() for region in regions if not region.overlaps(width, height)]
+    if len(outside) > 0:
+        raise ValueError(
+            "[AI] The regions of interest {} are outside of the {}x{} frames".format(outside, width, height)
+        )
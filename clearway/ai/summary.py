@@ -0,0 +1,77 @@
+"""Aggregate the detections logged by the processing of the frames.
+
+Logging each detected box costs a log record for every box of every frame, written to the log file and the standard
+output. The detections are instead counted and logged at most once per interval, with the highest probability, for
+example `[AI] 12 BICYCLE detected in the last 1.0 s, max probability 87.00 %`.
+"""
+import time
+import logging
+from typing import Callable, Iterable, Optional
+
+
+class DetectionSummary:
+    """Count the detections and log them at most once per interval.
+
+    Parameters
+    ----------
+    name : str
+        The name of the detected objects in the logs.
+    interval : float, optional
+        The minimum number of seconds between two logs, by default 1.0.
+        With 0, each detection is logged on its own.
+    clock : Callable[[], float], optional
+        The clock measuring the interval in seconds, by default `time.monotonic`.
+    """
+
+    def __init__(self, name: str, interval: float = 1.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.__name: str = name
+        self.__interval: float = interval
+        self.__clock: Callable[[], float] = clock
+        # The time of the first detection not logged yet
+        self.__start: Optional[float] = None
+        self.__count: int = 0
+        self.__max_confidence: float = 0.0
+
+        self.nb_logs: int = 0
+        """The number of logs of detections."""
+
+    def add(self, confidences: Iterable[float]) -> None:
+        """Count the detections of a processed frame, and log them if the interval elapsed.
+
+        This is called for every processed frame, even without detection, to log the last detections in time.
+
+        Parameters
+        ----------
+        confidences : Iterable[float]
+            The probability of each detection of the frame, between 0 and 1.
+        """
+        for confidence in confidences:
+            if self.__interval <= 0:
+                logging.info("[AI] %s detected with a probability of: %.2f %%", self.__name, confidence * 100)
+                self.nb_logs += 1
+                continue
+
+            if self.__start is None:
+                self.__start = self.__clock()
+            self.__count += 1
+            self.__max_confidence = max(self.__max_confidence, float(confidence))
+
+        if self.__start is not None and self.__clock() - self.__start >= self.__interval:
+            DetectionSummary.flush(self)
+
+    def flush(self) -> None:
+        """Log the detections not logged yet."""
+        if self.__count == 0:
+            return
+
+        logging.info(
+            "[AI] %d %s detected in the last %.1f s, max probability %.2f %%",
+            self.__count,
+            self.__name,
+            self.__clock() - self.__start,
+            self.__max_confidence * 100,
+        )
+        self.nb_logs += 1
+        self.__start = None
+        self.__count = 0
+        self.__max_confidence = 0.0
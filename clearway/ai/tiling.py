@@ -0,0 +1,118 @@
+"""Cut the images into overlapping tiles sent together to the network, and merge the detections of the tiles.
+
+A far away cyclist is only a few pixels wide once a high resolution frame is resized to the blob of the network.
+Each tile is resized to the blob on its own, so the objects are larger in the blob: a 1920x1080 frame cut into 2x2
+tiles is seen by the network like four 960x540 frames. The tiles are sent to the network in the same batch, so the
+cost of the forward pass grows with the number of tiles, not with the square of the size of the blob.
+
+The rows of each tile are moved to the coordinates of the whole image, so the tiles are decoded like a single image
+and the boxes found twice in the overlap of two tiles are merged by a single Non Maximum Suppression on the whole
+image. The overlap must be larger than the objects, so an object cut by the border of a tile is whole in its
+neighbour.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy
+
+
+def tile_rectangles(
+    width: int, height: int, columns: int, rows: int, overlap: float
+) -> List[Tuple[int, int, int, int]]:
+    """Return the tiles covering an image.
+
+    Parameters
+    ----------
+    width : int
+        The width of the image.
+    height : int
+        The height of the image.
+    columns : int
+        The number of tiles on the width.
+    rows : int
+        The number of tiles on the height.
+    overlap : float
+        The fraction of a tile, between 0 and 0.5, shared with its neighbour.
+
+    Returns
+    -------
+    List[Tuple[int, int, int, int]]
+        The rectangles (x, y, width, height) of the tiles, row by row, of the same size and inside the image.
+    """
+    xs, tile_width = _axis(width, columns, overlap)
+    ys, tile_height = _axis(height, rows, overlap)
+    return [(x, y, tile_width, tile_height) for y in ys for x in xs]
+
+
+def split(img: numpy.ndarray, columns: int, rows: int, overlap: float) -> List[numpy.ndarray]:
+    """Cut the image into tiles.
+
+    Parameters
+    ----------
+    img : numpy.ndarray
+        The image.
+    columns : int
+        The number of tiles on the width.
+    rows : int
+        The number of tiles on the height.
+    overlap : float
+        The fraction of a tile shared with its neighbour.
+
+    Returns
+    -------
+    List[numpy.ndarray]
+        The views of the image inside each tile, see `tile_rectangles`.
+    """
+    height, width = img.shape[:2]
+    tiles: List[numpy.ndarray] = []
+    for x, y, w, h in tile_rectangles(width, height, columns, rows, overlap):
+        bottom, right = y + h, x + w
+        tiles.append(img[y:bottom, x:right])
+    return tiles
+
+
+def merge_outputs(
+    outs_per_tile: Sequence[numpy.ndarray], width: int, height: int, columns: int, rows: int, overlap: float
+) -> numpy.ndarray:
+    """Move the rows of the output of each tile to the coordinates of the whole image.
+
+    Parameters
+    ----------
+    outs_per_tile : Sequence[numpy.ndarray]
+        The (rows, 85) output of the network for each tile given by `split`, in order.
+    width : int
+        The width of the image.
+    height : int
+        The height of the image.
+    columns : int
+        The number of tiles on the width.
+    rows : int
+        The number of tiles on the height.
+    overlap : float
+        The fraction of a tile shared with its neighbour.
+
+    Returns
+    -------
+    numpy.ndarray
+        The rows of all the tiles, whose Cx, Cy, w and h are relative to the whole image.
+    """
+    merged = []
+    for outs, (x, y, w, h) in zip(outs_per_tile, tile_rectangles(width, height, columns, rows, overlap)):
+        outs = outs.copy()
+        outs[:, 0] = (x + outs[:, 0] * w) / width
+        outs[:, 1] = (y + outs[:, 1] * h) / height
+        outs[:, 2] *= w / width
+        outs[:, 3] *= h / height
+        merged.append(outs)
+
+    return numpy.concatenate(merged, axis=0)
+
+
+def _axis(length: int, nb_tiles: int, overlap: float) -> Tuple[List[int], int]:
+    """Return the start of each tile on an axis, and the length of the tiles."""
+    if nb_tiles == 1:
+        return [0], length
+
+    # nb_tiles tiles sharing (nb_tiles - 1) overlaps cover the length
+    tile_length = int(numpy.ceil(length / (nb_tiles - (nb_tiles - 1) * overlap)))
+    step = (length - tile_length) / (nb_tiles - 1)
+    return [int(round(i * step)) for i in range(nb_tiles)], tile_length
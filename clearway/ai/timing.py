@@ -0,0 +1,95 @@
+"""Measure the phases of the start of ClearWay, until the first frame is processed.
+
+The phases are always measured, it costs a few calls to `time.perf_counter`. The report is only logged if it was
+enabled, with `enable`.
+"""
+import time
+import logging
+from contextlib import contextmanager
+import os
+from typing import Iterator, List, Optional, Tuple
+
+__enabled: bool = False
+"""`True` if the report is logged."""
+
+__phases: List[Tuple[str, float]] = []
+"""The name and the duration in seconds of each phase measured, in order."""
+
+
+def enable(p_value: bool = True) -> None:
+    """Tell if the report must be logged by `report`.
+
+    Parameters
+    ----------
+    p_value : bool, optional
+        `True` to log the report, by default `True`.
+    """
+    global __enabled
+    __enabled = p_value
+
+
+def reset() -> None:
+    """Forget the phases measured."""
+    __phases.clear()
+
+
+def record(name: str, duration: float) -> None:
+    """Add a phase measured elsewhere.
+
+    Parameters
+    ----------
+    name : str
+        The name of the phase.
+    duration : float
+        The duration of the phase in seconds.
+    """
+    __phases.append((name, duration))
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Measure the duration of the block as a phase.
+
+    Parameters
+    ----------
+    name : str
+        The name of the phase.
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start_time)
+
+
+def phases() -> List[Tuple[str, float]]:
+    """Return the name and the duration in seconds of each phase measured, in order."""
+    return list(__phases)
+
+
+def process_age() -> Optional[float]:
+    """Return the time in seconds since the start of the process, `None` if it is unknown.
+
+    The age is read from `/proc`, so it includes the start of the interpreter and the imports.
+    """
+    try:
+        with open("/proc/self/stat") as file:
+            # The name of the command, between parentheses, can contain spaces
+            start_ticks = int(file.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as file:
+            uptime = float(file.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+def report() -> None:
+    """Log the duration of each phase, if the report was enabled, then forget them."""
+    if __enabled and len(__phases) > 0:
+        logging.info("[TIMING] Start-up phases:")
+        for name, duration in __phases:
+            logging.info("[TIMING]   %-24s %8.1f ms", name, duration * 1000)
+        logging.info("[TIMING]   %-24s %8.1f ms", "total", sum(duration for _, duration in __phases) * 1000)
+
+    reset()
@@ -0,0 +1,224 @@
+"""Track the detected objects between two frames processed by the network.
+
+The network only processes one frame every `detection_interval` frames. On the frames in between, the boxes of the
+last detection are moved by the sparse optical flow of a grid of points in each box, which costs far less than a
+forward pass. Each tracked box keeps an identity: the boxes of a new detection are matched to the tracked boxes by
+their overlap, so a cyclist keeps the same track from one detection to the next.
+"""
+from itertools import count
+import logging
+from typing import Iterator, List, Optional, Tuple
+
+import numpy
+import cv2
+
+IOU_THRESHOLD: float = 0.3
+"""The minimum Intersection over Union between a tracked box and a detected box to match them."""
+
+MAX_MISSED: int = 1
+"""The number of detections in a row a track can be missing from before being removed."""
+
+GRID_SIZE: int = 5
+"""The number of points per side of the grid followed by the optical flow in each box."""
+
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+"""The parameters of `cv2.calcOpticalFlowPyrLK`."""
+
+
+class Track:
+    """A detected object followed from frame to frame.
+
+    Parameters
+    ----------
+    track_id : int
+        The identity of the track.
+    box : numpy.ndarray
+        The box (x, y, width, height) of the object.
+    confidence : float
+        The confidence of the last detection of the object.
+    """
+
+    __slots__ = ("track_id", "box", "confidence", "velocity", "missed")
+
+    def __init__(self, track_id: int, box: numpy.ndarray, confidence: float) -> None:
+        self.track_id: int = track_id
+        self.box: numpy.ndarray = box.astype(numpy.float32)
+        self.confidence: float = confidence
+        self.velocity: numpy.ndarray = numpy.zeros(2, dtype=numpy.float32)
+        """The displacement (dx, dy) of the box between the last two frames."""
+        self.missed: int = 0
+        """The number of detections in a row the track is missing from."""
+
+
+def iou(boxes_a: numpy.ndarray, boxes_b: numpy.ndarray) -> numpy.ndarray:
+    """Compute the Intersection over Union of every pair of boxes.
+
+    Parameters
+    ----------
+    boxes_a : numpy.ndarray
+        The (N, 4) array of boxes (x, y, width, height).
+    boxes_b : numpy.ndarray
+        The (M, 4) array of boxes (x, y, width, height).
+
+    Returns
+    -------
+    numpy.ndarray
+        The (N, M) array of the Intersection over Union of each pair.
+    """
+    a = boxes_a.astype(numpy.float32)[:, None, :]
+    b = boxes_b.astype(numpy.float32)[None, :, :]
+
+    width = numpy.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - numpy.maximum(a[..., 0], b[..., 0])
+    height = numpy.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - numpy.maximum(a[..., 1], b[..., 1])
+    intersection = numpy.clip(width, 0, None) * numpy.clip(height, 0, None)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - intersection
+
+    return numpy.divide(intersection, union, out=numpy.zeros_like(intersection), where=union > 0)
+
+
+class Tracker:
+    """Follow the boxes given by the network on the frames it does not process.
+
+    `update` must be called with the boxes of the frames processed by the network and `track` with the other frames,
+    in the order of the video stream.
+    """
+
+    __ids: Iterator[int] = count(1)
+    """The identities of the tracks, shared by all the trackers."""
+
+    def __init__(self) -> None:
+        self.__tracks: List[Track] = []
+        self.__gray: Optional[numpy.ndarray] = None
+        self.__previous_gray: Optional[numpy.ndarray] = None
+
+    @property
+    def tracks(self) -> List[Track]:
+        """The tracks followed, including the ones missing from the last detection."""
+        return self.__tracks
+
+    def update(
+        self, img: numpy.ndarray, boxes: numpy.ndarray, confidences: numpy.ndarray
+    ) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Match the boxes detected by the network with the tracks.
+
+        A detected box matched with a track takes its identity, the other detected boxes start new tracks.
+        The tracks not matched for more than `MAX_MISSED` detections are removed.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The frame processed by the network.
+        boxes : numpy.ndarray
+            The (N, 4) array of boxes (x, y, width, height) kept after the Non Maximum Suppression.
+        confidences : numpy.ndarray
+            The (N,) array of confidences of the boxes.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+            The boxes of the tracks found in the frame, their confidences and their identities.
+        """
+        Tracker.__to_gray(self, img)
+
+        matched_tracks = set()
+        matched_boxes = set()
+        if len(self.__tracks) > 0 and len(boxes) > 0:
+            overlaps = iou(numpy.array([track.box for track in self.__tracks]), boxes)
+            # Greedy matching, the pairs with the largest overlap first
+            for flat_index in numpy.argsort(overlaps, axis=None)[::-1]:
+                track_index, box_index = numpy.unravel_index(flat_index, overlaps.shape)
+                if overlaps[track_index, box_index] < IOU_THRESHOLD:
+                    break
+                if track_index in matched_tracks or box_index in matched_boxes:
+                    continue
+                matched_tracks.add(track_index)
+                matched_boxes.add(box_index)
+
+                track = self.__tracks[track_index]
+                track.box = boxes[box_index].astype(numpy.float32)
+                track.confidence = float(confidences[box_index])
+                track.missed = 0
+
+        tracks = []
+        for track_index, track in enumerate(self.__tracks):
+            if track_index not in matched_tracks:
+                track.missed += 1
+                if track.missed > MAX_MISSED:
+                    logging.debug("[TRACKER] Track %d lost", track.track_id)
+                    continue
+            tracks.append(track)
+
+        for box_index in range(len(boxes)):
+            if box_index not in matched_boxes:
+                track = Track(next(Tracker.__ids), boxes[box_index], float(confidences[box_index]))
+                logging.debug("[TRACKER] New track %d", track.track_id)
+                tracks.append(track)
+
+        self.__tracks = tracks
+        return Tracker.__active(self)
+
+    def track(self, img: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Move the tracks to their position in a frame not processed by the network.
+
+        Each box is moved by the median displacement of a grid of points followed by the optical flow, or by its last
+        displacement if none of the points is found. The tracks leaving the frame are removed.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The frame following the previous one given to `update` or `track`.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+            The boxes of the tracks in the frame, their confidences and their identities.
+        """
+        Tracker.__to_gray(self, img)
+
+        # The tracks missing from the last detection are moved too, to be matched by the next one
+        tracks = self.__tracks
+        if len(tracks) == 0 or self.__previous_gray is None:
+            return Tracker.__active(self)
+
+        # The same grid of points in every box, flowed all at once
+        steps = (numpy.arange(GRID_SIZE, dtype=numpy.float32) + 0.5) / GRID_SIZE
+        grid = numpy.stack(numpy.meshgrid(steps, steps), axis=-1).reshape(-1, 2)
+        points = numpy.concatenate([track.box[:2] + grid * track.box[2:] for track in tracks]).reshape(-1, 1, 2)
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.__previous_gray, self.__gray, points, None, **LK_PARAMS)
+        displacements = (new_points - points).reshape(len(tracks), -1, 2)
+        found = status.reshape(len(tracks), -1).astype(bool)
+
+        height, width = self.__gray.shape
+        for track, displacement, track_found in zip(tracks, displacements, found):
+            if numpy.any(track_found):
+                track.velocity = numpy.median(displacement[track_found], axis=0)
+            track.box[:2] += track.velocity
+
+            center_x, center_y = track.box[:2] + track.box[2:] / 2
+            if not (0 <= center_x < width and 0 <= center_y < height):
+                logging.debug("[TRACKER] Track %d left the frame", track.track_id)
+                track.missed = MAX_MISSED + 1
+
+        self.__tracks = [track for track in self.__tracks if track.missed <= MAX_MISSED]
+        return Tracker.__active(self)
+
+    def __to_gray(self, img: numpy.ndarray) -> None:
+        """Convert the frame to gray level in the buffer of the previous frame, which becomes the current one."""
+        if self.__gray is None or self.__gray.shape != img.shape[:2]:
+            self.__gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            self.__previous_gray = None
+            return
+
+        if self.__previous_gray is None:
+            self.__previous_gray = numpy.empty_like(self.__gray)
+        self.__previous_gray, self.__gray = self.__gray, self.__previous_gray
+        cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=self.__gray)
+
+    def __active(self) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Return the boxes, the confidences and the identities of the tracks found by the last detection."""
+        active = [track for track in self.__tracks if track.missed == 0]
+        boxes = numpy.array([track.box for track in active], dtype=numpy.float32).reshape(-1, 4)
+        confidences = numpy.array([track.confidence for track in active], dtype=numpy.float32)
+        track_ids = numpy.array([track.track_id for track in active], dtype=numpy.int32)
+        return numpy.rint(boxes).astype(numpy.int32), confidences, track_ids
@@ -0,0 +1,192 @@
+"""Write the processed frames to the output video on a dedicated thread.
+
+The encoding of the output video no longer slows down the inference: the frames are copied into a bounded queue of
+preallocated frames and encoded by the writer thread. When the queue is full, the policy decides what happens to the
+next frame:
+
+- `BLOCK`: the inference waits for a free frame, no frame is lost.
+- `DROP`: the frame is not written.
+- `DOWNSCALE`: once the queue is half full, every other frame is not written, halving the frame rate of the output
+  video until the writer thread catches up, and the frames handed over while the queue is full are not written.
+  The inference never waits and the encoder has half the frames to encode.
+
+The frames are always written at the size of the output video: a frame of another size is resized into its slot of
+the queue, since the encoder silently ignores the frames of the wrong size.
+"""
+from threading import Condition, Thread
+import logging
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import numpy
+import cv2
+
+BLOCK = "block"
+"""Wait for a free frame when the queue is full."""
+
+DROP = "drop"
+"""Do not write the frames handed over while the queue is full."""
+
+DOWNSCALE = "downscale"
+"""Halve the frame rate of the output video once the queue is half full."""
+
+POLICIES: Tuple[str, ...] = (BLOCK, DROP, DOWNSCALE)
+"""The policies when the queue is full."""
+
+
+class WriterThread:
+    """Encode the frames handed over by `write` on a dedicated thread.
+
+    Parameters
+    ----------
+    video_writer : cv2.VideoWriter
+        The opened output video, released by `stop`.
+    policy : str, optional
+        What to do with a frame when the queue is full, one of `POLICIES`, by default `BLOCK`.
+    capacity : int, optional
+        The number of preallocated frames of the queue, by default 8.
+    frame_size : Tuple[int, int], optional
+        The width and the height of the output video, by default None to write the frames at their own size.
+    """
+
+    def __init__(
+        self,
+        video_writer: cv2.VideoWriter,
+        policy: str = BLOCK,
+        capacity: int = 8,
+        frame_size: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError("[WRITER] Unknown policy {}, expected one of {}".format(policy, ", ".join(POLICIES)))
+        if capacity < 1:
+            raise ValueError("[WRITER] The capacity of the queue must be at least 1: {}".format(capacity))
+
+        self.__video_writer: cv2.VideoWriter = video_writer
+        self.__policy: str = policy
+        self.__capacity: int = capacity
+        self.__frame_size: Optional[Tuple[int, int]] = frame_size
+        self.__frames: List[Optional[numpy.ndarray]] = [None] * capacity
+        self.__free: Deque[int] = deque(range(capacity))
+        self.__queued: Deque[int] = deque()
+        # With `DOWNSCALE`, `True` if the previous frame was written while the queue was half full
+        self.__skip_next: bool = False
+        self.__closed: bool = False
+        self.__condition: Condition = Condition()
+        self.__thread: Optional[Thread] = None
+
+        self.frames_written: int = 0
+        """The number of frames encoded."""
+        self.frames_dropped: int = 0
+        """The number of frames not written because the queue was full, or half full with `DOWNSCALE`."""
+        self.max_depth: int = 0
+        """The maximum number of frames waiting in the queue when a frame was handed over."""
+        self.__sum_depth: int = 0
+        self.__nb_handovers: int = 0
+
+    @property
+    def mean_depth(self) -> float:
+        """The mean number of frames waiting in the queue when a frame was handed over."""
+        return self.__sum_depth / self.__nb_handovers if self.__nb_handovers > 0 else 0.0
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        logging.debug("[WRITER] Start the writer thread, %s policy", self.__policy)
+        self.__thread = Thread(target=self.__run, name="[AI-WRITER]", daemon=True)
+        self.__thread.start()
+
+    def write(self, img: numpy.ndarray) -> None:
+        """Hand a frame over to the writer thread.
+
+        The frame is copied into a preallocated frame of the queue, so it can be reused as soon as this returns.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The frame to write.
+        """
+        with self.__condition:
+            depth = len(self.__queued)
+            self.max_depth = max(self.max_depth, depth)
+            self.__sum_depth += depth
+            self.__nb_handovers += 1
+
+            if WriterThread.__is_dropped(self, depth):
+                self.frames_dropped += 1
+                return
+
+            while not self.__closed and len(self.__free) == 0:
+                self.__condition.wait()
+            if self.__closed:
+                return
+
+            index = self.__free.popleft()
+
+        # The reserved frame is only used by this thread until it is queued
+        WriterThread.__copy(self, index, img)
+
+        with self.__condition:
+            self.__queued.append(index)
+            self.__condition.notify_all()
+
+    def __is_dropped(self, depth: int) -> bool:
+        if self.__policy == BLOCK:
+            return False
+        if len(self.__free) == 0:
+            return True
+        if self.__policy == DOWNSCALE and 2 * depth >= self.__capacity:
+            # Every other frame while the queue is half full
+            self.__skip_next = not self.__skip_next
+            return not self.__skip_next
+        self.__skip_next = False
+        return False
+
+    def __copy(self, index: int, img: numpy.ndarray) -> None:
+        height, width = img.shape[:2]
+        size = self.__frame_size if self.__frame_size is not None else (width, height)
+        frame = self.__frames[index]
+        if frame is None or frame.shape != (size[1], size[0]) + img.shape[2:] or frame.dtype != img.dtype:
+            frame = self.__frames[index] = numpy.empty((size[1], size[0]) + img.shape[2:], img.dtype)
+
+        if (width, height) == size:
+            numpy.copyto(frame, img)
+        else:
+            cv2.resize(img, size, dst=frame, interpolation=cv2.INTER_LINEAR)
+
+    def stop(self) -> None:
+        """Write the frames left in the queue, stop the writer thread and release the output video."""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        else:
+            # Not started, the frames left are written by the caller
+            self.__run()
+
+        self.__video_writer.release()
+
+    def log_counters(self) -> None:
+        """Log the counters of the writer."""
+        logging.debug("[WRITER] Nb of frames written: %d", self.frames_written)
+        logging.debug("[WRITER] Nb of frames dropped: %d", self.frames_dropped)
+        logging.debug("[WRITER] queue depth: mean %.1f, max %d of %d", self.mean_depth, self.max_depth, self.__capacity)
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while not self.__closed and len(self.__queued) == 0:
+                    self.__condition.wait()
+                if len(self.__queued) == 0:
+                    break
+                # The frame stays in the queue until it is written, so that its slot is not reused
+                index = self.__queued[0]
+
+            self.__video_writer.write(self.__frames[index])
+
+            with self.__condition:
+                self.__queued.popleft()
+                self.__free.append(index)
+                self.frames_written += 1
+                self.__condition.notify_all()
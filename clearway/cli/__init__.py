@@ -1,17 +1,21 @@
 """Command-line implementation of ClearWay."""
 
 import logging
+import logging.handlers
 import argparse
+import atexit
+import importlib
+import queue
 import sys
 import signal
 import types
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import clearway
 import clearway.config as config
 import clearway.gpio as gpio
 from clearway.gpio import stateMachinePanel, servo
-from clearway.ai import ai
+from clearway.ai import ai, autotune, backend, metrics, multicamera, offline, roi, timing, writer
 
 VERSION_MESAGE: str = """
    ________               _       __
@@ -30,6 +34,13 @@ This program may be freely redistributed under the terms of the {} license.
 )
 """The message displayed when using the `clearway --version` command."""
 
+COMMANDS: Dict[str, str] = {
+    "quantize": "clearway.cli.quantize",
+    "bench": "clearway.cli.bench",
+    "redecode": "clearway.cli.redecode",
+}
+"""The sub-commands of `clearway` and the module implementing each one, with a `main(p_args)` function."""
+
 
 def __signal_handler(p_signum: int, _p_stack_frame: Optional[types.FrameType] = None) -> None:
     """Signal handler.
@@ -66,6 +77,13 @@ def __parse_arg() -> None:
                               tells the program which gpio to use
         --no-gpio             tells the program to not use the GPIOs, only the logs will be displayed
         --use-gpio            tells the program to use the GPIOs
+        --hold-time HOLD_TIME
+                              the number of seconds without detection before the panels stop signaling
+        --confirm-frames CONFIRM_FRAMES
+                              the number of processed frames with a detection, among the last --confirm-window
+                              ones, needed for the panels to start signaling
+        --confirm-window CONFIRM_WINDOW
+                              the number of last processed frames in which the detections are counted
         --on-raspberry        tells the program if we are using a raspberry or a computer
         --see-rtp             tells the program if we want to see a window with the real-time processing in it
         -i INPUT_PATH, --input-path INPUT_PATH
@@ -74,6 +92,50 @@ def __parse_arg() -> None:
         -o OUTPUT_PATH, --output-path OUTPUT_PATH
                               the path to the folder that will contain the output video with boxes around detected
                               bicycles
+        -j JOBS, --jobs JOBS  the number of worker processes used to process the input video, each one processes a
+                              range of frames
+        --batch-size BATCH_SIZE
+                              the number of frames of the input video sent together to the network
+        --motion-threshold MOTION_THRESHOLD
+                              the fraction of the pixels, between 0 and 1, that must change for a frame to be processed
+                              by the network, 0 to process all the frames
+        --motion-interval MOTION_INTERVAL
+                              the maximum number of frames skipped in a row without motion, 0 for no maximum
+        --detection-interval DETECTION_INTERVAL
+                              the number of frames between two frames processed by the network, the boxes are
+                              tracked on the frames in between, 1 to process all the frames
+        --backend {opencv,onnxruntime}
+                              the inference engine running yolo, with onnxruntime the yolo weights file is the ONNX
+                              model
+        --threads THREADS     the number of threads of the inference engine, 0 to let the engine choose
+        --autotune            tells the program to choose the size, the backend and the number of threads by
+                              benchmarking them, the choice is cached for the CPU and the yolo files
+        --target-fps TARGET_FPS
+                              the minimum number of frames per second targeted by --autotune
+        --timing              log the duration of each phase of the start, until the first frame is processed
+        --output-policy {block,drop,downscale}
+                              what to do with a processed frame when the queue of the output video is full, wait for
+                              the writer thread, do not write it or halve the frame rate once the queue is half full
+        --clip-before CLIP_BEFORE
+                              the number of seconds recorded before a detection, the output video is replaced by
+                              clips around the detections if --clip-before or --clip-after is strictly positive
+        --clip-after CLIP_AFTER
+                              the number of seconds recorded after the last detection of a clip
+        --metrics METRICS     the address on which the latency of each stage and the counters are exposed in the
+                              Prometheus text format, host:port like localhost:9100 or unix:PATH for a Unix socket
+        --raw-cache RAW_CACHE
+                              the folder where the candidate boxes of the network are saved for each processed
+                              frame, to decode them again with other thresholds by clearway redecode
+        --tiles COLUMNS ROWS  the number of columns and rows of the tiles cut in each part of the frames and sent
+                              together to the network, to detect the small objects of the high resolution cameras
+        --tile-overlap TILE_OVERLAP
+                              the fraction of a tile shared with its neighbour, between 0 and 0.5
+        --sizes SIZES [SIZES ...]
+                              the sizes of the blob between which the size switches to keep the latency of the
+                              inference of a frame under --target-latency, like 224 320 416
+        --target-latency TARGET_LATENCY
+                              the maximum number of seconds of the inference of a frame, the size of the blob
+                              steps down above it and steps up when the next larger size fits under it
         -v {WARNING,INFO,DEBUG}, --verbosity {WARNING,INFO,DEBUG}
                               indicates the level of verbosity
         -V, --version         print the ClearWay version and exit
@@ -140,6 +202,31 @@ def __parse_arg() -> None:
         default=None,
     )
 
+    l_parser.add_argument(
+        "--hold-time",
+        help="the number of seconds without detection before the panels stop signaling",
+        action="store",
+        type=float,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--confirm-frames",
+        help="""the number of processed frames with a detection, among the last --confirm-window ones, needed for the
+panels to start signaling""",
+        action="store",
+        type=int,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--confirm-window",
+        help="the number of last processed frames in which the detections are counted",
+        action="store",
+        type=int,
+        default=None,
+    )
+
     l_parser.add_argument(
         "--on-raspberry",
         help="tells the program if we are using a raspberry or a computer",
@@ -172,6 +259,168 @@ def __parse_arg() -> None:
         default=None,
     )
 
+    l_parser.add_argument(
+        "-j",
+        "--jobs",
+        help="the number of worker processes used to process the input video, each one processes a range of frames",
+        action="store",
+        type=int,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--batch-size",
+        help="the number of frames of the input video sent together to the network",
+        action="store",
+        type=int,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--motion-threshold",
+        help="""the fraction of the pixels, between 0 and 1, that must change for a frame to be processed by the
+network, 0 to process all the frames""",
+        action="store",
+        type=float,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--motion-interval",
+        help="the maximum number of frames skipped in a row without motion, 0 for no maximum",
+        action="store",
+        type=int,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--detection-interval",
+        help="""the number of frames between two frames processed by the network, the boxes are tracked on the frames
+in between, 1 to process all the frames""",
+        action="store",
+        type=int,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--backend",
+        choices=backend.BACKENDS,
+        help="the inference engine running yolo, with onnxruntime the yolo weights file is the ONNX model",
+        action="store",
+        type=str,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--threads",
+        help="the number of threads of the inference engine, 0 to let the engine choose",
+        action="store",
+        type=int,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--autotune",
+        help="""tells the program to choose the size, the backend and the number of threads by benchmarking them,
+the choice is cached for the CPU and the yolo files""",
+        action="store_true",
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--target-fps",
+        help="the minimum number of frames per second targeted by --autotune",
+        action="store",
+        type=float,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--timing",
+        help="log the duration of each phase of the start, until the first frame is processed",
+        action="store_true",
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--output-policy",
+        choices=writer.POLICIES,
+        help="""what to do with a processed frame when the queue of the output video is full, wait for the writer
+thread, do not write it or halve the frame rate once the queue is half full""",
+        action="store",
+        type=str,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--clip-before",
+        help="""the number of seconds recorded before a detection, the output video is replaced by clips around the
+detections if --clip-before or --clip-after is strictly positive""",
+        action="store",
+        type=float,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--clip-after",
+        help="the number of seconds recorded after the last detection of a clip",
+        action="store",
+        type=float,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--metrics",
+        help="""the address on which the latency of each stage and the counters are exposed in the Prometheus text
+format, host:port like localhost:9100 or unix:PATH for a Unix socket""",
+        action="store",
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--raw-cache",
+        help="""the folder where the candidate boxes of the network are saved for each processed frame, to decode them
+again with other thresholds by clearway redecode""",
+        action="store",
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--tiles",
+        help="""the number of columns and rows of the tiles cut in each part of the frames and sent together to the
+network, to detect the small objects of the high resolution cameras""",
+        nargs=2,
+        metavar=("COLUMNS", "ROWS"),
+        type=int,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--tile-overlap",
+        help="the fraction of a tile shared with its neighbour, between 0 and 0.5",
+        action="store",
+        type=float,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--sizes",
+        help="""the sizes of the blob between which the size switches to keep the latency of the inference of a frame
+under --target-latency, like 224 320 416""",
+        nargs="+",
+        type=int,
+        default=None,
+    )
+
+    l_parser.add_argument(
+        "--target-latency",
+        help="""the maximum number of seconds of the inference of a frame, the size of the blob steps down above it and
+steps up when the next larger size fits under it""",
+        action="store",
+        type=float,
+        default=None,
+    )
+
     l_parser.add_argument(
         "-v",
         "--verbosity",
@@ -248,7 +497,13 @@ The configuration file must then contain the size of the image""",
         config.save_config_from_file(l_args.config)
 
     # Save GPIO config module
-    config.save_config_gpio(p_use_gpio=l_args.use_gpio, p_gpios=l_args.panel_gpios)
+    config.save_config_gpio(
+        p_use_gpio=l_args.use_gpio,
+        p_gpios=l_args.panel_gpios,
+        p_hold_time=l_args.hold_time,
+        p_confirm_frames=l_args.confirm_frames,
+        p_confirm_window=l_args.confirm_window,
+    )
 
     # Save AI config module
     config.save_config_ai(
@@ -259,6 +514,25 @@ The configuration file must then contain the size of the image""",
         p_size=l_args.size,
         p_on_raspberry=l_args.on_raspberry,
         p_real_time_processing=l_args.see_rtp,
+        p_jobs=l_args.jobs,
+        p_batch_size=l_args.batch_size,
+        p_motion_threshold=l_args.motion_threshold,
+        p_motion_interval=l_args.motion_interval,
+        p_detection_interval=l_args.detection_interval,
+        p_backend=l_args.backend,
+        p_threads=l_args.threads,
+        p_autotune=l_args.autotune,
+        p_target_fps=l_args.target_fps,
+        p_timing=l_args.timing,
+        p_output_policy=l_args.output_policy,
+        p_clip_before=l_args.clip_before,
+        p_clip_after=l_args.clip_after,
+        p_metrics=l_args.metrics,
+        p_raw_cache=l_args.raw_cache,
+        p_tiles=l_args.tiles,
+        p_tile_overlap=l_args.tile_overlap,
+        p_sizes=l_args.sizes,
+        p_target_latency=l_args.target_latency,
     )
 
     # Save logging config module
@@ -270,6 +544,8 @@ def __apply_config_logging() -> None:
 
     The log file is stored in `DEFAULT_LOG_PATH` and every time the program
     restart, the file is cleared.
+    The records are put in a queue and written to the log file and the standard output by a background thread, so a
+    slow storage does not slow down the detection. The log file is rotated once it reaches `LOG_MAX_BYTES`.
     Is format is:
         `Date Time FileName:FunctionName Level >> Message`
         example:
@@ -285,44 +561,172 @@ def __apply_config_logging() -> None:
     All these values are the ones provided when using `save_config_logging`,
     otherwise the default values provided by the module will be used
     """
+    l_formatter = logging.Formatter(config.get_config(config.MODULE_LOGGING, config.LOG_FORMAT))
+    l_handlers = [
+        logging.handlers.RotatingFileHandler(
+            config.get_config(config.MODULE_LOGGING, config.LOG_PATH),
+            maxBytes=config.get_config(config.MODULE_LOGGING, config.LOG_MAX_BYTES),
+            backupCount=config.get_config(config.MODULE_LOGGING, config.LOG_BACKUP_COUNT),
+        ),
+        logging.StreamHandler(sys.stdout),
+    ]
+    for l_handler in l_handlers:
+        l_handler.setFormatter(l_formatter)
+
+    l_queue: queue.SimpleQueue = queue.SimpleQueue()
+    l_listener = logging.handlers.QueueListener(l_queue, *l_handlers)
+    l_listener.start()
+    # The records left are written before the program exits, even on a signal
+    atexit.register(l_listener.stop)
+
+    # The records are formatted by the handlers of the listener
+    l_queue_handler = logging.handlers.QueueHandler(l_queue)
+    l_queue_handler.setFormatter(logging.Formatter("%(message)s"))
     logging.basicConfig(
         level=config.get_config(config.MODULE_LOGGING, config.LOG_VERBOSITY_LEVEL),
-        format=config.get_config(config.MODULE_LOGGING, config.LOG_FORMAT),
-        handlers=[
-            logging.FileHandler(config.get_config(config.MODULE_LOGGING, config.LOG_PATH)),
-            logging.StreamHandler(sys.stdout),
-        ],
+        handlers=[l_queue_handler],
     )
 
 
 def main() -> None:
-    """Program input function."""
-    __parse_arg()
-    __apply_config_logging()
+    """Program input function.
+
+    If the first argument is one of `COMMANDS`, then the sub-command is run instead of the detection.
+    """
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        # Imported only when run, a sub-command can need optional packages
+        importlib.import_module(COMMANDS[sys.argv[1]]).main(sys.argv[2:])
+        return
+
+    l_process_age = timing.process_age()
+    if l_process_age is not None:
+        timing.record("interpreter and imports", l_process_age)
+
+    with timing.phase("configuration"):
+        __parse_arg()
+        __apply_config_logging()
+
+    timing.enable(config.get_config(config.MODULE_AI, config.TIMING))
 
     # Add signal handler
     signal.signal(signal.SIGINT, __signal_handler)  # Interrupt from keyboard (CTRL + C)
     signal.signal(signal.SIGTERM, __signal_handler)  # Termination signal
 
-    gpio.use_gpio(config.get_config(config.MODULE_GPIO, config.USE_GPIO))
-    servo.set_angle()
+    with timing.phase("gpio"):
+        gpio.use_gpio(config.get_config(config.MODULE_GPIO, config.USE_GPIO))
+        servo.set_angle()
+
+    l_regions_of_interest = [
+        roi.RegionOfInterest.from_config(l_region) for l_region in config.get_config(config.MODULE_AI, config.ROI)
+    ]
+    l_sources = [
+        multicamera.Source.from_config(l_source) for l_source in config.get_config(config.MODULE_AI, config.SOURCES)
+    ]
+    l_unknown_gpios = set().union(
+        *(l_region.panel_gpios for l_region in l_regions_of_interest),
+        *(l_source.panel_gpios for l_source in l_sources),
+    ) - set(config.get_config(config.MODULE_GPIO, config.PANEL_GPIOS))
+    if len(l_unknown_gpios) > 0:
+        raise ValueError(
+            "[CLI] The GPIOs of the regions of interest or of the sources are not panel GPIOs: {}".format(
+                l_unknown_gpios
+            )
+        )
 
     stateMachinePanel.new(config.get_config(config.MODULE_GPIO, config.PANEL_GPIOS))
     stateMachinePanel.start()
 
-    # Give the path to the input video to process it
-    # Otherwise it will use the Raspberry Pi camera
-    ai_instance = ai.Ai(
-        config.get_config(config.MODULE_AI, config.ON_RASPBERRY),
-        config.get_config(config.MODULE_AI, config.SEE_REAL_TIME_PROCESS),
-        config.get_config(config.MODULE_AI, config.YOLO_WEIGHTS_PATH),
-        config.get_config(config.MODULE_AI, config.YOLO_CFG_PATH),
-        config.get_config(config.MODULE_AI, config.IMG_SIZE),
-        config.get_config(config.MODULE_AI, config.INPUT_PATH),
-        config.get_config(config.MODULE_AI, config.OUTPUT_PATH),
-    )
-
-    ai_instance.bicycle_detector(config.get_config(config.MODULE_GPIO, config.PANEL_GPIOS))
+    if config.get_config(config.MODULE_AI, config.METRICS) != "":
+        # Expose the latency of each stage and the counters while the detection runs
+        metrics.serve(config.get_config(config.MODULE_AI, config.METRICS))
+        metrics.register(
+            "clearway_panel_queue_depth",
+            "The number of events waiting for the state machines of the panels.",
+            stateMachinePanel.queue_depth,
+        )
+
+    if config.get_config(config.MODULE_AI, config.AUTOTUNE):
+        # Replace the size, the backend and the threads by the fastest accurate ones on this host
+        with timing.phase("autotune"):
+            l_setting = autotune.autotune(
+                config.get_config(config.MODULE_AI, config.YOLO_WEIGHTS_PATH),
+                config.get_config(config.MODULE_AI, config.YOLO_CFG_PATH),
+                config.get_config(config.MODULE_AI, config.TARGET_FPS),
+                config.get_config(config.MODULE_AI, config.INPUT_PATH),
+            )
+        config.save_config_ai(p_size=l_setting.size, p_backend=l_setting.backend_name, p_threads=l_setting.threads)
+
+    # The optional arguments of the AI, shared by the single process and the worker processes
+    l_ai_options: Dict[str, Any] = {
+        "batch_size": config.get_config(config.MODULE_AI, config.BATCH_SIZE),
+        "motion_threshold": config.get_config(config.MODULE_AI, config.MOTION_THRESHOLD),
+        "motion_interval": config.get_config(config.MODULE_AI, config.MOTION_INTERVAL),
+        "regions_of_interest": l_regions_of_interest,
+        "detection_interval": config.get_config(config.MODULE_AI, config.DETECTION_INTERVAL),
+        "backend_name": config.get_config(config.MODULE_AI, config.BACKEND),
+        "threads": config.get_config(config.MODULE_AI, config.THREADS),
+        "output_policy": config.get_config(config.MODULE_AI, config.OUTPUT_POLICY),
+        "clip_before": config.get_config(config.MODULE_AI, config.CLIP_BEFORE),
+        "clip_after": config.get_config(config.MODULE_AI, config.CLIP_AFTER),
+        "camera_settings": config.get_config(config.MODULE_AI, config.CAMERA),
+        "hold_time": config.get_config(config.MODULE_GPIO, config.HOLD_TIME),
+        "confirm_frames": config.get_config(config.MODULE_GPIO, config.CONFIRM_FRAMES),
+        "confirm_window": config.get_config(config.MODULE_GPIO, config.CONFIRM_WINDOW),
+        "log_interval": config.get_config(config.MODULE_LOGGING, config.LOG_SUMMARY_INTERVAL),
+        "raw_cache": config.get_config(config.MODULE_AI, config.RAW_CACHE) or None,
+        "tiles": tuple(config.get_config(config.MODULE_AI, config.TILES)),
+        "tile_overlap": config.get_config(config.MODULE_AI, config.TILE_OVERLAP),
+        "sizes": config.get_config(config.MODULE_AI, config.SIZES),
+        "target_latency": config.get_config(config.MODULE_AI, config.TARGET_LATENCY),
+        "governor_settings": config.get_config(config.MODULE_AI, config.GOVERNOR),
+    }
+
+    if len(l_sources) > 0:
+        # Process the video streams of all the sources with a single network, each one signaled on its own GPIOs
+        del l_ai_options["regions_of_interest"]
+        multicamera.MultiCamera(
+            l_sources,
+            config.get_config(config.MODULE_AI, config.ON_RASPBERRY),
+            config.get_config(config.MODULE_AI, config.YOLO_WEIGHTS_PATH),
+            config.get_config(config.MODULE_AI, config.YOLO_CFG_PATH),
+            config.get_config(config.MODULE_AI, config.IMG_SIZE),
+            config.get_config(config.MODULE_AI, config.OUTPUT_PATH),
+            **l_ai_options,
+        ).run()
+    elif (
+        config.get_config(config.MODULE_AI, config.INPUT_PATH) is not None
+        and config.get_config(config.MODULE_AI, config.JOBS) > 1
+    ):
+        # Split the input video between several worker processes
+        offline.process_video(
+            config.get_config(config.MODULE_AI, config.YOLO_WEIGHTS_PATH),
+            config.get_config(config.MODULE_AI, config.YOLO_CFG_PATH),
+            config.get_config(config.MODULE_AI, config.IMG_SIZE),
+            config.get_config(config.MODULE_AI, config.INPUT_PATH),
+            config.get_config(config.MODULE_AI, config.OUTPUT_PATH),
+            config.get_config(config.MODULE_AI, config.JOBS),
+            **l_ai_options,
+        )
+        # The workers start on their own, only the start of the main process is reported
+        timing.report()
+    else:
+        # Give the path to the input video to process it
+        # Otherwise it will use the Raspberry Pi camera
+        ai_instance = ai.Ai(
+            config.get_config(config.MODULE_AI, config.ON_RASPBERRY),
+            config.get_config(config.MODULE_AI, config.SEE_REAL_TIME_PROCESS),
+            config.get_config(config.MODULE_AI, config.YOLO_WEIGHTS_PATH),
+            config.get_config(config.MODULE_AI, config.YOLO_CFG_PATH),
+            config.get_config(config.MODULE_AI, config.IMG_SIZE),
+            config.get_config(config.MODULE_AI, config.INPUT_PATH),
+            config.get_config(config.MODULE_AI, config.OUTPUT_PATH),
+            **l_ai_options,
+        )
+
+        ai_instance.bicycle_detector(config.get_config(config.MODULE_GPIO, config.PANEL_GPIOS))
+
+    metrics.log_summary()
+    metrics.stop()
 
     stateMachinePanel.stop()
     stateMachinePanel.free()
@@ -0,0 +1,200 @@
+"""Command-line implementation of `clearway bench`.
+
+```text
+usage: clearway bench [-h] [-c CONFIG] [--yolo-weights YOLO_WEIGHTS] [--yolo-cfg YOLO_CFG] [-i INPUT_PATH]
+                      [--sizes SIZE [SIZE ...]] [--backends {opencv,onnxruntime} [{opencv,onnxruntime} ...]]
+                      [--threads THREADS [THREADS ...]] [--frames FRAMES] [--warmup WARMUP] [--batch-size BATCH_SIZE]
+                      [-o OUTPUT] [--baseline BASELINE] [--tolerance TOLERANCE] [-v {WARNING,INFO,DEBUG}]
+
+measure the throughput and the latency of each stage of the processing for several sizes and backends
+
+optional arguments:
+  -h, --help            show this help message and exit
+  -c CONFIG, --config CONFIG
+                        the path to the config file giving the yolo files, the size, the backend and the threads
+  --yolo-weights YOLO_WEIGHTS
+                        the path to the weights file of yolo, or to the ONNX model
+  --yolo-cfg YOLO_CFG   the path to the configuration file of yolo
+  -i INPUT_PATH, --input-path INPUT_PATH
+                        the clip processed, replayed as many times as needed, by default random frames
+  --sizes SIZE [SIZE ...]
+                        the sizes of the images converted to blob, by default the size of the configuration
+  --backends {opencv,onnxruntime} [{opencv,onnxruntime} ...]
+                        the inference engines running yolo, by default the backend of the configuration
+  --threads THREADS [THREADS ...]
+                        the numbers of threads of the inference engine, 0 to let the engine choose, by default the
+                        threads of the configuration
+  --frames FRAMES       the number of frames measured for each combination, by default 100
+  --warmup WARMUP       the number of frames processed before the measure of each combination, by default 10
+  --batch-size BATCH_SIZE
+                        the number of frames sent together to the network, by default the batch size of the
+                        configuration
+  -o OUTPUT, --output OUTPUT
+                        the path to the JSON report to write, by default the report is printed
+  --baseline BASELINE   the path to a previous JSON report to compare with, the command fails on a regression
+  --tolerance TOLERANCE
+                        the fraction by which the FPS can drop, or the 99th percentile of the latency of a frame
+                        can grow, before being a regression, by default 0.1
+  -v {WARNING,INFO,DEBUG}, --verbosity {WARNING,INFO,DEBUG}
+                        indicates the level of verbosity
+```
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import List
+
+import clearway.config as config
+from clearway.ai import backend, bench
+
+
+def main(p_args: List[str]) -> None:
+    """Benchmark the combinations, then print or write the report and compare it with the baseline.
+
+    Parameters
+    ----------
+    p_args : `List[str]`
+        The arguments of the command, without `clearway bench`.
+
+    Raises
+    ------
+    ValueError
+        No combination could run the model.
+    """
+    l_parser = argparse.ArgumentParser(
+        prog="clearway bench",
+        description="measure the throughput and the latency of each stage of the processing for several sizes and "
+        "backends",
+    )
+    l_parser.add_argument(
+        "-c",
+        "--config",
+        help="the path to the config file giving the yolo files, the size, the backend and the threads",
+        default=None,
+    )
+    l_parser.add_argument("--yolo-weights", help="the path to the weights file of yolo, or to the ONNX model")
+    l_parser.add_argument("--yolo-cfg", help="the path to the configuration file of yolo")
+    l_parser.add_argument(
+        "-i",
+        "--input-path",
+        help="the clip processed, replayed as many times as needed, by default random frames",
+        default=None,
+    )
+    l_parser.add_argument(
+        "--sizes",
+        metavar="SIZE",
+        nargs="+",
+        type=int,
+        help="the sizes of the images converted to blob, by default the size of the configuration",
+    )
+    l_parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=backend.BACKENDS,
+        help="the inference engines running yolo, by default the backend of the configuration",
+    )
+    l_parser.add_argument(
+        "--threads",
+        nargs="+",
+        type=int,
+        help="the numbers of threads of the inference engine, 0 to let the engine choose, by default the threads of "
+        "the configuration",
+    )
+    l_parser.add_argument(
+        "--frames",
+        type=int,
+        help="the number of frames measured for each combination, by default %(default)s",
+        default=100,
+    )
+    l_parser.add_argument(
+        "--warmup",
+        type=int,
+        help="the number of frames processed before the measure of each combination, by default %(default)s",
+        default=10,
+    )
+    l_parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="the number of frames sent together to the network, by default the batch size of the configuration",
+    )
+    l_parser.add_argument(
+        "-o", "--output", help="the path to the JSON report to write, by default the report is printed", default=None
+    )
+    l_parser.add_argument(
+        "--baseline",
+        help="the path to a previous JSON report to compare with, the command fails on a regression",
+        default=None,
+    )
+    l_parser.add_argument(
+        "--tolerance",
+        type=float,
+        help="the fraction by which the FPS can drop, or the 99th percentile of the latency of a frame can grow, "
+        "before being a regression, by default %(default)s",
+        default=0.1,
+    )
+    l_parser.add_argument(
+        "-v",
+        "--verbosity",
+        choices=[
+            logging.getLevelName(logging.WARNING),
+            logging.getLevelName(logging.INFO),
+            logging.getLevelName(logging.DEBUG),
+        ],
+        help="indicates the level of verbosity",
+        default=logging.getLevelName(logging.WARNING),
+    )
+    l_args = l_parser.parse_args(p_args)
+
+    logging.basicConfig(
+        level=l_args.verbosity,
+        format=config.get_config(config.MODULE_LOGGING, config.LOG_FORMAT),
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+
+    if l_args.config is not None:
+        config.save_config_from_file(l_args.config)
+
+    l_report = bench.run_matrix(
+        l_args.yolo_weights or config.get_config(config.MODULE_AI, config.YOLO_WEIGHTS_PATH),
+        l_args.yolo_cfg or config.get_config(config.MODULE_AI, config.YOLO_CFG_PATH),
+        l_args.sizes or [config.get_config(config.MODULE_AI, config.IMG_SIZE)],
+        l_args.backends or [config.get_config(config.MODULE_AI, config.BACKEND)],
+        l_args.threads or [config.get_config(config.MODULE_AI, config.THREADS)],
+        l_args.input_path,
+        l_args.frames,
+        l_args.warmup,
+        l_args.batch_size or config.get_config(config.MODULE_AI, config.BATCH_SIZE),
+    )
+    if len(l_report["results"]) == 0:
+        raise ValueError("[BENCH] None of the combinations can run the model")
+
+    if l_args.output is not None:
+        with open(l_args.output, "w") as l_file:
+            json.dump(l_report, l_file, indent=4)
+    else:
+        print(json.dumps(l_report, indent=4))
+
+    if l_args.baseline is not None:
+        with open(l_args.baseline) as l_file:
+            l_comparisons = bench.compare(l_report, json.load(l_file), l_args.tolerance)
+
+        for l_comparison in l_comparisons:
+            print(
+                "{:<12} size {:<4} {:>2} threads: {:7.2f} FPS (baseline {:7.2f}), "
+                "p99 {:8.2f} ms (baseline {:8.2f}){}".format(
+                    l_comparison.backend_name,
+                    l_comparison.size,
+                    l_comparison.threads,
+                    l_comparison.fps,
+                    l_comparison.baseline_fps,
+                    l_comparison.p99,
+                    l_comparison.baseline_p99,
+                    "  REGRESSION" if l_comparison.regressed else "",
+                ),
+                file=sys.stderr,
+            )
+
+        if any(l_comparison.regressed for l_comparison in l_comparisons):
+            sys.exit(1)
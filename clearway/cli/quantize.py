@@ -0,0 +1,132 @@
+"""Command-line implementation of `clearway quantize`.
+
+```text
+usage: clearway quantize [-h] [-i VIDEO [VIDEO ...]] [--size SIZE] [--calibration-frames CALIBRATION_FRAMES]
+                         [--holdout HOLDOUT] [--per-channel] [-v {WARNING,INFO,DEBUG}]
+                         FLOAT_MODEL QUANTIZED_MODEL
+
+quantize an ONNX export of yolo to INT8 and compare it with the float model
+
+positional arguments:
+  FLOAT_MODEL           the path to the float ONNX model
+  QUANTIZED_MODEL       the path to the quantized ONNX model to write
+
+optional arguments:
+  -h, --help            show this help message and exit
+  -i VIDEO [VIDEO ...], --input-path VIDEO [VIDEO ...]
+                        the videos whose frames calibrate the model and compare the models,
+                        by default the videos of resources/videos
+  --size SIZE           the size of the images converted to blob, by default 320
+  --calibration-frames CALIBRATION_FRAMES
+                        the number of frames read from each video, by default 50
+  --holdout HOLDOUT     the fraction of the frames not used for the calibration, on which the models are compared,
+                        by default 0.5
+  --per-channel         quantize the weights of each channel with its own range
+  -v {WARNING,INFO,DEBUG}, --verbosity {WARNING,INFO,DEBUG}
+                        indicates the level of verbosity
+```
+"""
+
+import argparse
+import glob
+import logging
+import sys
+from typing import List
+
+import clearway.config as config
+from clearway.ai import quantize
+
+DEFAULT_VIDEOS: str = "resources/videos/*.mp4"
+"""The videos used when none is given."""
+
+
+def main(p_args: List[str]) -> None:
+    """Quantize the model, then print the comparison of the quantized model with the float model.
+
+    Parameters
+    ----------
+    p_args : `List[str]`
+        The arguments of the command, without `clearway quantize`.
+
+    Raises
+    ------
+    ValueError
+        No frame could be read from the videos.
+    """
+    l_parser = argparse.ArgumentParser(
+        prog="clearway quantize",
+        description="quantize an ONNX export of yolo to INT8 and compare it with the float model",
+    )
+    l_parser.add_argument("float_model", metavar="FLOAT_MODEL", help="the path to the float ONNX model")
+    l_parser.add_argument(
+        "quantized_model", metavar="QUANTIZED_MODEL", help="the path to the quantized ONNX model to write"
+    )
+    l_parser.add_argument(
+        "-i",
+        "--input-path",
+        metavar="VIDEO",
+        nargs="+",
+        help="the videos whose frames calibrate the model and compare the models, by default the videos of {}".format(
+            DEFAULT_VIDEOS
+        ),
+        default=None,
+    )
+    l_parser.add_argument(
+        "--size",
+        type=int,
+        help="the size of the images converted to blob, by default %(default)s",
+        default=config.get_config(config.MODULE_AI, config.IMG_SIZE),
+    )
+    l_parser.add_argument(
+        "--calibration-frames",
+        type=int,
+        help="the number of frames read from each video, by default %(default)s",
+        default=50,
+    )
+    l_parser.add_argument(
+        "--holdout",
+        type=float,
+        help="the fraction of the frames not used for the calibration, on which the models are compared, by default "
+        "%(default)s",
+        default=0.5,
+    )
+    l_parser.add_argument(
+        "--per-channel", help="quantize the weights of each channel with its own range", action="store_true"
+    )
+    l_parser.add_argument(
+        "-v",
+        "--verbosity",
+        choices=[
+            logging.getLevelName(logging.WARNING),
+            logging.getLevelName(logging.INFO),
+            logging.getLevelName(logging.DEBUG),
+        ],
+        help="indicates the level of verbosity",
+        default=logging.getLevelName(logging.INFO),
+    )
+    l_args = l_parser.parse_args(p_args)
+
+    logging.basicConfig(
+        level=l_args.verbosity,
+        format=config.get_config(config.MODULE_LOGGING, config.LOG_FORMAT),
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+
+    l_videos = l_args.input_path if l_args.input_path is not None else sorted(glob.glob(DEFAULT_VIDEOS))
+    l_frames = quantize.read_frames(l_videos, l_args.calibration_frames)
+    if len(l_frames) == 0:
+        raise ValueError("[QUANTIZE] No frame read from the videos: {}".format(l_videos))
+
+    # The models are compared on frames the calibration did not see
+    l_calibration_frames, l_comparison_frames = quantize.split_frames(l_frames, l_args.holdout)
+    quantize.quantize_model(
+        l_args.float_model, l_args.quantized_model, l_calibration_frames, l_args.size, l_args.per_channel
+    )
+    l_report = quantize.compare_models(l_args.float_model, l_args.quantized_model, l_comparison_frames, l_args.size)
+
+    print("Frames compared:      {}".format(l_report.nb_frames))
+    print("Float latency:        {:.2f} ms".format(l_report.float_latency * 1000))
+    print("Quantized latency:    {:.2f} ms (x{:.2f})".format(l_report.quantized_latency * 1000, l_report.speedup))
+    print("Float detections:     {}".format(l_report.float_detections))
+    print("Quantized detections: {}".format(l_report.quantized_detections))
+    print("Agreement:            {:.1f} %".format(l_report.agreement * 100))
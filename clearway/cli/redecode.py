@@ -0,0 +1,133 @@
+"""Command-line implementation of `clearway redecode`.
+
+```text
+usage: clearway redecode [-h] [-o OUTPUT_PATH] [-c CONFIG] [--class {person,bicycle,car,motorbike,bus,truck}]
+                         [--threshold THRESHOLD] [--score-threshold SCORE_THRESHOLD] [--nms-threshold NMS_THRESHOLD]
+                         [-v {WARNING,INFO,DEBUG}]
+                         RAW_CACHE INPUT_PATH
+
+decode the candidate boxes saved with --raw-cache again with other thresholds, without running the network
+
+positional arguments:
+  RAW_CACHE             the folder of the candidate boxes saved with --raw-cache
+  INPUT_PATH            the video processed when the candidate boxes were saved
+
+optional arguments:
+  -h, --help            show this help message and exit
+  -o OUTPUT_PATH, --output-path OUTPUT_PATH
+                        the folder that will contain the output video with the boxes, by default only the detections
+                        are counted
+  -c CONFIG, --config CONFIG
+                        the config file of the processing, whose regions of interest are used
+  --class {person,bicycle,car,motorbike,bus,truck}
+                        the class detected, by default bicycle
+  --threshold THRESHOLD
+                        the minimum score of the class to keep a box, by default 0.5
+  --score-threshold SCORE_THRESHOLD
+                        the minimum confidence of a box kept by the Non Maximum Suppression, by default 0.5
+  --nms-threshold NMS_THRESHOLD
+                        the maximum overlap between two boxes kept by the Non Maximum Suppression, by default 0.4
+  -v {WARNING,INFO,DEBUG}, --verbosity {WARNING,INFO,DEBUG}
+                        indicates the level of verbosity
+```
+"""
+
+import argparse
+import logging
+import sys
+from typing import List
+
+import clearway.config as config
+from clearway.ai import rawcache, roi
+
+
+def main(p_args: List[str]) -> None:
+    """Decode the cache again, then print the number of detections.
+
+    Parameters
+    ----------
+    p_args : `List[str]`
+        The arguments of the command, without `clearway redecode`.
+    """
+    l_parser = argparse.ArgumentParser(
+        prog="clearway redecode",
+        description="decode the candidate boxes saved with --raw-cache again with other thresholds, without running "
+        "the network",
+    )
+    l_parser.add_argument(
+        "raw_cache", metavar="RAW_CACHE", help="the folder of the candidate boxes saved with --raw-cache"
+    )
+    l_parser.add_argument(
+        "input_path", metavar="INPUT_PATH", help="the video processed when the candidate boxes were saved"
+    )
+    l_parser.add_argument(
+        "-o",
+        "--output-path",
+        help="the folder that will contain the output video with the boxes, by default only the detections are "
+        "counted",
+        default=None,
+    )
+    l_parser.add_argument(
+        "-c", "--config", help="the config file of the processing, whose regions of interest are used", default=None
+    )
+    l_parser.add_argument(
+        "--class",
+        dest="class_name",
+        choices=list(rawcache.CLASSES),
+        help="the class detected, by default %(default)s",
+        default="bicycle",
+    )
+    l_parser.add_argument(
+        "--threshold",
+        type=float,
+        help="the minimum score of the class to keep a box, by default %(default)s",
+        default=0.5,
+    )
+    l_parser.add_argument(
+        "--score-threshold",
+        type=float,
+        help="the minimum confidence of a box kept by the Non Maximum Suppression, by default %(default)s",
+        default=0.5,
+    )
+    l_parser.add_argument(
+        "--nms-threshold",
+        type=float,
+        help="the maximum overlap between two boxes kept by the Non Maximum Suppression, by default %(default)s",
+        default=0.4,
+    )
+    l_parser.add_argument(
+        "-v",
+        "--verbosity",
+        choices=[
+            logging.getLevelName(logging.WARNING),
+            logging.getLevelName(logging.INFO),
+            logging.getLevelName(logging.DEBUG),
+        ],
+        help="indicates the level of verbosity",
+        default=logging.getLevelName(logging.INFO),
+    )
+    l_args = l_parser.parse_args(p_args)
+
+    logging.basicConfig(
+        level=l_args.verbosity,
+        format=config.get_config(config.MODULE_LOGGING, config.LOG_FORMAT),
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+
+    if l_args.config is not None:
+        config.save_config_from_file(l_args.config)
+
+    l_summary = rawcache.redecode(
+        l_args.raw_cache,
+        l_args.input_path,
+        l_args.output_path,
+        rawcache.CLASSES[l_args.class_name],
+        l_args.threshold,
+        l_args.score_threshold,
+        l_args.nms_threshold,
+        [roi.RegionOfInterest.from_config(l_region) for l_region in config.get_config(config.MODULE_AI, config.ROI)],
+    )
+
+    print("Frames decoded:          {}".format(l_summary.nb_frames))
+    print("Detections:              {}".format(l_summary.nb_detections))
+    print("Frames with a detection: {}".format(l_summary.nb_frames_with_detection))
@@ -11,9 +11,10 @@ Notes
 """
 
 import logging
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 import toml
+from clearway.ai import backend
 
 
 # For the gpio module
@@ -30,6 +31,15 @@ CAMERA_ANGLE = "camera_angle"
 SERVO_GPIO = "servo_gpio"
 """The dictionary key to indicate the GPIO to use for the servo-motor."""
 
+HOLD_TIME = "hold_time"
+"""The dictionary key to indicate the number of seconds without detection before the panels stop signaling."""
+
+CONFIRM_FRAMES = "confirm_frames"
+"""The dictionary key to indicate the number of frames with a detection needed for the panels to start signaling."""
+
+CONFIRM_WINDOW = "confirm_window"
+"""The dictionary key to indicate the number of last frames in which the detections are counted."""
+
 # For the ai module
 
 INPUT_PATH = "input_path"
@@ -53,6 +63,77 @@ IMG_SIZE = "size"
 SEE_REAL_TIME_PROCESS = "see_rtp"
 """The dictionary key to indicate if we want to see a window with the real-time processing in it."""
 
+JOBS = "jobs"
+"""The dictionary key to indicate the number of worker processes used to process an input video."""
+
+BATCH_SIZE = "batch_size"
+"""The dictionary key to indicate the number of frames of an input video sent together to the network."""
+
+MOTION_THRESHOLD = "motion_threshold"
+"""The dictionary key to indicate the fraction of the pixels that must change for a frame to be processed."""
+
+MOTION_INTERVAL = "motion_interval"
+"""The dictionary key to indicate the maximum number of frames skipped in a row without motion."""
+
+ROI = "roi"
+"""The dictionary key to indicate the list of regions of interest of the frames and the GPIOs signaling them."""
+
+DETECTION_INTERVAL = "detection_interval"
+"""The dictionary key to indicate the number of frames between two frames processed by the network."""
+
+BACKEND = "backend"
+"""The dictionary key to indicate the name of the inference engine running YOLO."""
+
+THREADS = "threads"
+"""The dictionary key to indicate the number of threads of the inference engine."""
+
+AUTOTUNE = "autotune"
+"""The dictionary key to indicate if the size, the backend and the threads are chosen by benchmarking them."""
+
+TARGET_FPS = "target_fps"
+"""The dictionary key to indicate the minimum number of frames per second targeted by the autotune."""
+
+TIMING = "timing"
+"""The dictionary key to indicate if the duration of each phase of the start is logged."""
+
+OUTPUT_POLICY = "output_policy"
+"""The dictionary key to indicate what to do with a processed frame when the queue of the output video is full."""
+
+CLIP_BEFORE = "clip_before"
+"""The dictionary key to indicate the number of seconds recorded before a detection in the event clips."""
+
+CLIP_AFTER = "clip_after"
+"""The dictionary key to indicate the number of seconds recorded after the last detection of an event clip."""
+
+CAMERA = "camera"
+"""The dictionary key to indicate the format asked to the camera."""
+
+SOURCES = "sources"
+"""The dictionary key to indicate the list of video streams processed together and the GPIOs signaling them."""
+
+METRICS = "metrics"
+"""The dictionary key to indicate the address on which the metrics are exposed."""
+
+RAW_CACHE = "raw_cache"
+"""The dictionary key to indicate the folder where the candidate boxes of the network are saved."""
+
+TILES = "tiles"
+"""The dictionary key to indicate the number of columns and rows of the tiles sent to the network for each part of
+the image."""
+
+TILE_OVERLAP = "tile_overlap"
+"""The dictionary key to indicate the fraction of a tile shared with its neighbour."""
+
+SIZES = "sizes"
+"""The dictionary key to indicate the sizes of the blob between which the size switches with the latency."""
+
+TARGET_LATENCY = "target_latency"
+"""The dictionary key to indicate the maximum number of seconds of the inference of a frame."""
+
+GOVERNOR = "governor"
+"""The dictionary key to indicate the settings of the governor sending fewer frames to the network when the CPU
+heats up."""
+
 # For the logging module
 
 LOG_VERBOSITY_LEVEL = "verbosity"
@@ -64,6 +145,15 @@ LOG_FORMAT = "format"
 LOG_PATH = "path"
 """The dictionary key to indicate the path to the log file for the `logging` module."""
 
+LOG_MAX_BYTES = "max_bytes"
+"""The dictionary key to indicate the size in bytes of the log file before it is rotated."""
+
+LOG_BACKUP_COUNT = "backup_count"
+"""The dictionary key to indicate the number of rotated log files kept."""
+
+LOG_SUMMARY_INTERVAL = "summary_interval"
+"""The dictionary key to indicate the minimum number of seconds between two logs of the detections."""
+
 # List au module
 
 MAIN_SECTION = "clearway"
@@ -87,17 +177,46 @@ __config_dict: Dict[str, Dict[str, Any]] = {
         ON_RASPBERRY: False,
         IMG_SIZE: 320,
         SEE_REAL_TIME_PROCESS: False,
+        JOBS: 1,
+        BATCH_SIZE: 1,
+        MOTION_THRESHOLD: 0.0,
+        MOTION_INTERVAL: 0,
+        ROI: [],
+        DETECTION_INTERVAL: 1,
+        BACKEND: "opencv",
+        THREADS: 0,
+        AUTOTUNE: False,
+        TARGET_FPS: 5.0,
+        TIMING: False,
+        OUTPUT_POLICY: "block",
+        CLIP_BEFORE: 0.0,
+        CLIP_AFTER: 0.0,
+        CAMERA: {},
+        SOURCES: [],
+        METRICS: "",
+        RAW_CACHE: "",
+        TILES: [1, 1],
+        TILE_OVERLAP: 0.2,
+        SIZES: [],
+        TARGET_LATENCY: 0.0,
+        GOVERNOR: {},
     },
     MODULE_GPIO: {
         USE_GPIO: True,
         PANEL_GPIOS: {5},
         SERVO_GPIO: 12,  # GPIO 12 for PWM with 50Hz, pin 32,
         CAMERA_ANGLE: 75,
+        HOLD_TIME: 2.0,
+        CONFIRM_FRAMES: 1,
+        CONFIRM_WINDOW: 1,
     },
     MODULE_LOGGING: {
         LOG_VERBOSITY_LEVEL: logging.INFO,
         LOG_FORMAT: "%(asctime)s [%(filename)s:%(lineno)d] %(levelname)s >> %(message)s",
         LOG_PATH: "ClearWay.log",
+        LOG_MAX_BYTES: 10 * 1024 * 1024,
+        LOG_BACKUP_COUNT: 3,
+        LOG_SUMMARY_INTERVAL: 1.0,
     },
 }
 """The dictionary containing all the current configuration."""
@@ -120,6 +239,9 @@ def save_config_from_file(p_path: str) -> None:
     panel_gpios = [5, 6]
     camera_angle = 75
     servo_gpio = 12
+    hold_time = 2.0
+    confirm_frames = 2
+    confirm_window = 3
 
     [clearway.ai]
     yolo_cfg = "resources/yolov2-tiny.cfg"
@@ -127,9 +249,58 @@ def save_config_from_file(p_path: str) -> None:
     on_raspberry = false
     size = 320
     see_rtp = false
+    jobs = 1
+    batch_size = 1
+    motion_threshold = 0.0
+    motion_interval = 0
+    detection_interval = 1
+    backend = "opencv"
+    threads = 0
+    autotune = false
+    target_fps = 5.0
+    timing = false
+    output_policy = "block"
+    clip_before = 0.0
+    clip_after = 0.0
+    metrics = "localhost:9100"
+    raw_cache = "output/raw_cache"
+    tiles = [1, 1]
+    tile_overlap = 0.2
+    sizes = [224, 320, 416]
+    target_latency = 0.15
+
+    [clearway.ai.camera]
+    fourcc = "MJPG"
+    width = 640
+    height = 480
+    fps = 15
+    buffer_size = 1
+
+    [clearway.ai.governor]
+    target_latency = 0.2
+    max_interval = 4
+
+    [[clearway.ai.roi]]
+    rectangle = [0, 240, 640, 240]
+    panel_gpios = [5]
+
+    [[clearway.ai.roi]]
+    polygon = [[320, 0], [640, 0], [640, 240]]
+    panel_gpios = [6]
+
+    [[clearway.ai.sources]]
+    device = "/dev/video0"
+    panel_gpios = [5]
+    priority = 2
+
+    [[clearway.ai.sources]]
+    device = "/dev/video2"
+    panel_gpios = [6]
 
     [clearway.log]
     verbosity = "DEBUG"
+    max_bytes = 1048576
+    backup_count = 2
     ```
 
     Parameters
@@ -170,6 +341,9 @@ def save_config_logging(
     p_verbosity_level: Optional[str] = None,
     p_format: Optional[str] = None,
     p_path: Optional[str] = None,
+    p_max_bytes: Optional[int] = None,
+    p_backup_count: Optional[int] = None,
+    p_summary_interval: Optional[float] = None,
     p_dict: Optional[Dict[str, Any]] = None,
 ) -> None:
     """Save the configuration for `logging` module.
@@ -183,13 +357,17 @@ def save_config_logging(
             LOG_VERBOSITY_LEVEL: logging.INFO,
             LOG_FORMAT: "%(asctime)s [%(filename)s:%(lineno)d] %(levelname)s >> %(message)s",
             LOG_PATH: "ClearWay.log",
+            LOG_MAX_BYTES: 10 * 1024 * 1024,
+            LOG_BACKUP_COUNT: 3,
+            LOG_SUMMARY_INTERVAL: 1.0,
         }
     ```
 
     Notes
     -----
     It is recommended to use the constants provided by the module, for the dictionary keys,
-    `LOG_VERBOSITY_LEVEL`, `LOG_FORMAT` and `LOG_PATH` documentation.
+    `LOG_VERBOSITY_LEVEL`, `LOG_FORMAT`, `LOG_PATH`, `LOG_MAX_BYTES`, `LOG_BACKUP_COUNT` and `LOG_SUMMARY_INTERVAL`
+    documentation.
 
     To have futher details on the available option see `apply_config_logging` function.
 
@@ -201,6 +379,12 @@ def save_config_logging(
         The log format, by default `None`
     p_path : `str`, optional
         The path to the log file, by default `None`
+    p_max_bytes : `int`, optional
+        The size in bytes of the log file before it is rotated, 0 to never rotate it, by default `None`
+    p_backup_count : `int`, optional
+        The number of rotated log files kept, by default `None`
+    p_summary_interval : `float`, optional
+        The minimum number of seconds between two logs of the detections, 0 to log each detection, by default `None`
     p_dict : `Dict[str, Any]`, optional
         A dictionary containing the information, by default `None`
 
@@ -222,6 +406,15 @@ def save_config_logging(
         if LOG_PATH in p_dict.keys():
             save_config_logging(p_path=p_dict[LOG_PATH])
 
+        if LOG_MAX_BYTES in p_dict.keys():
+            save_config_logging(p_max_bytes=p_dict[LOG_MAX_BYTES])
+
+        if LOG_BACKUP_COUNT in p_dict.keys():
+            save_config_logging(p_backup_count=p_dict[LOG_BACKUP_COUNT])
+
+        if LOG_SUMMARY_INTERVAL in p_dict.keys():
+            save_config_logging(p_summary_interval=p_dict[LOG_SUMMARY_INTERVAL])
+
     if p_dict is not None:
         recursive_call(p_dict)
 
@@ -248,6 +441,19 @@ def save_config_logging(
     if isinstance(p_path, str):
         __config_dict[MODULE_LOGGING][LOG_PATH] = p_path
 
+    if isinstance(p_max_bytes, int) and not isinstance(p_max_bytes, bool) and p_max_bytes >= 0:
+        __config_dict[MODULE_LOGGING][LOG_MAX_BYTES] = p_max_bytes
+
+    if isinstance(p_backup_count, int) and not isinstance(p_backup_count, bool) and p_backup_count >= 0:
+        __config_dict[MODULE_LOGGING][LOG_BACKUP_COUNT] = p_backup_count
+
+    if (
+        isinstance(p_summary_interval, (int, float))
+        and not isinstance(p_summary_interval, bool)
+        and p_summary_interval >= 0
+    ):
+        __config_dict[MODULE_LOGGING][LOG_SUMMARY_INTERVAL] = float(p_summary_interval)
+
 
 #
 # gpio
@@ -259,6 +465,9 @@ def save_config_gpio(
     p_gpios: Optional[Iterable[int]] = None,
     p_servo: Optional[int] = None,
     p_camera_angle: Optional[int] = None,
+    p_hold_time: Optional[float] = None,
+    p_confirm_frames: Optional[int] = None,
+    p_confirm_window: Optional[int] = None,
     p_dict: Optional[Dict[str, Any]] = None,
 ) -> None:
     """Save the configuration for `clearway.gpio` module.
@@ -273,13 +482,17 @@ def save_config_gpio(
             PANEL_GPIOS: {5, 6},
             SERVO_GPIO: 12,
             CAMERA_ANGLE: 75,
+            HOLD_TIME: 2.0,
+            CONFIRM_FRAMES: 1,
+            CONFIRM_WINDOW: 1,
         }
     ```
 
     Notes
     -----
     It is recommended to use the constants provided by the module, for the dictionary keys,
-    `USE_GPIO`, `PANEL_GPIOS`, `SERVO_GPIO` and `CAMERA_ANGLE` documentation.
+    `USE_GPIO`, `PANEL_GPIOS`, `SERVO_GPIO`, `CAMERA_ANGLE`, `HOLD_TIME`, `CONFIRM_FRAMES` and `CONFIRM_WINDOW`
+    documentation.
 
     To have futher details on the available option see `apply_config_gpio` function.
 
@@ -293,6 +506,12 @@ def save_config_gpio(
         The GPIO to use for the servo-motor, by default `None`
     p_camera_angle : `int`, optional
         The angle for the camera, by default `None`
+    p_hold_time : `float`, optional
+        The number of seconds without detection before the panels stop signaling, by default `None`
+    p_confirm_frames : `int`, optional
+        The number of processed frames with a detection needed for the panels to start signaling, by default `None`
+    p_confirm_window : `int`, optional
+        The number of last processed frames in which the detections are counted, at least 1, by default `None`
     p_dict : `Dict[str, Any]`, optional
         A dictionary containing the information, by default `None`
     """
@@ -311,6 +530,15 @@ def save_config_gpio(
         if CAMERA_ANGLE in p_dict.keys():
             save_config_gpio(p_camera_angle=p_dict[CAMERA_ANGLE])
 
+        if HOLD_TIME in p_dict.keys():
+            save_config_gpio(p_hold_time=p_dict[HOLD_TIME])
+
+        if CONFIRM_FRAMES in p_dict.keys():
+            save_config_gpio(p_confirm_frames=p_dict[CONFIRM_FRAMES])
+
+        if CONFIRM_WINDOW in p_dict.keys():
+            save_config_gpio(p_confirm_window=p_dict[CONFIRM_WINDOW])
+
     if p_dict is not None:
         recursive_call(p_dict)
 
@@ -330,6 +558,15 @@ def save_config_gpio(
     if isinstance(p_camera_angle, int):
         __config_dict[MODULE_GPIO][CAMERA_ANGLE] = p_camera_angle
 
+    if isinstance(p_hold_time, (int, float)) and not isinstance(p_hold_time, bool) and p_hold_time >= 0:
+        __config_dict[MODULE_GPIO][HOLD_TIME] = float(p_hold_time)
+
+    if isinstance(p_confirm_frames, int) and not isinstance(p_confirm_frames, bool) and p_confirm_frames > 0:
+        __config_dict[MODULE_GPIO][CONFIRM_FRAMES] = p_confirm_frames
+
+    if isinstance(p_confirm_window, int) and not isinstance(p_confirm_window, bool) and p_confirm_window > 0:
+        __config_dict[MODULE_GPIO][CONFIRM_WINDOW] = p_confirm_window
+
 
 #
 # ai
@@ -344,6 +581,29 @@ def save_config_ai(
     p_size: Optional[int] = None,
     p_on_raspberry: Optional[bool] = None,
     p_real_time_processing: Optional[bool] = None,
+    p_jobs: Optional[int] = None,
+    p_batch_size: Optional[int] = None,
+    p_motion_threshold: Optional[float] = None,
+    p_motion_interval: Optional[int] = None,
+    p_roi: Optional[List[Dict[str, Any]]] = None,
+    p_detection_interval: Optional[int] = None,
+    p_backend: Optional[str] = None,
+    p_threads: Optional[int] = None,
+    p_autotune: Optional[bool] = None,
+    p_target_fps: Optional[float] = None,
+    p_timing: Optional[bool] = None,
+    p_output_policy: Optional[str] = None,
+    p_clip_before: Optional[float] = None,
+    p_clip_after: Optional[float] = None,
+    p_camera: Optional[Dict[str, Any]] = None,
+    p_sources: Optional[List[Dict[str, Any]]] = None,
+    p_metrics: Optional[str] = None,
+    p_raw_cache: Optional[str] = None,
+    p_tiles: Optional[List[int]] = None,
+    p_tile_overlap: Optional[float] = None,
+    p_sizes: Optional[List[int]] = None,
+    p_target_latency: Optional[float] = None,
+    p_governor: Optional[Dict[str, Any]] = None,
     p_dict: Optional[Dict[str, Any]] = None,
 ) -> None:
     """Save the configuration for `clearway.ai` module.
@@ -361,13 +621,39 @@ def save_config_ai(
             ON_RASPBERRY: False,
             IMG_SIZE: 320,
             SEE_REAL_TIME_PROCESS: False,
+            JOBS: 1,
+            BATCH_SIZE: 1,
+            MOTION_THRESHOLD: 0.0,
+            MOTION_INTERVAL: 0,
+            ROI: [{"rectangle": [0, 240, 640, 240], "panel_gpios": [5]}],
+            DETECTION_INTERVAL: 1,
+            BACKEND: "opencv",
+            THREADS: 0,
+            AUTOTUNE: False,
+            TARGET_FPS: 5.0,
+            TIMING: False,
+            OUTPUT_POLICY: "block",
+            CLIP_BEFORE: 0.0,
+            CLIP_AFTER: 0.0,
+            CAMERA: {},
+            SOURCES: [],
+            METRICS: "",
+            RAW_CACHE: "",
+            TILES: [1, 1],
+            TILE_OVERLAP: 0.2,
+            SIZES: [],
+            TARGET_LATENCY: 0.0,
+            GOVERNOR: {},
         }
     ```
 
     Notes
     -----
     It is recommended to use the constants provided by the module, for the dictionary keys,
-    `INPUT_PATH`, `YOLO_CFG_PATH`, `OUTPUT_PATH` and `YOLO_WEIGHTS_PATH` documentation.
+    `INPUT_PATH`, `YOLO_CFG_PATH`, `OUTPUT_PATH`, `YOLO_WEIGHTS_PATH`, `JOBS`, `BATCH_SIZE`, `MOTION_THRESHOLD`,
+    `MOTION_INTERVAL`, `ROI`, `DETECTION_INTERVAL`, `BACKEND`, `THREADS`, `AUTOTUNE`, `TARGET_FPS`, `TIMING`,
+    `OUTPUT_POLICY`, `CLIP_BEFORE`, `CLIP_AFTER`, `CAMERA`, `SOURCES`, `METRICS`, `RAW_CACHE`, `TILES`, `TILE_OVERLAP`,
+    `SIZES`, `TARGET_LATENCY` and `GOVERNOR` documentation.
 
     To have futher details on the available option see `apply_config_ai` function.
 
@@ -387,6 +673,77 @@ def save_config_ai(
         Indicate if we are using a raspberry or not, by default `None`.
     p_real_time_processing : `bool`, optional
         Indicate if we want to see a window with the real-time processing in it, by default `None`.
+    p_jobs : `int`, optional
+        The number of worker processes used to process an input video, must be strictly positive,
+        by default `None`.
+    p_batch_size : `int`, optional
+        The number of frames of an input video sent together to the network, must be strictly positive,
+        by default `None`.
+    p_motion_threshold : `float`, optional
+        The fraction of the pixels, between 0 and 1, that must change for a frame to be processed by the network,
+        0 to process all the frames, by default `None`.
+    p_motion_interval : `int`, optional
+        The maximum number of frames skipped in a row without motion, 0 for no maximum, by default `None`.
+    p_roi : `List[Dict[str, Any]]`, optional
+        The regions of interest, each one with a `"rectangle"` `[x, y, width, height]` or a `"polygon"`
+        `[[x1, y1], [x2, y2], ...]` and the `"panel_gpios"` signaling it. The list is ignored if one of the regions is
+        invalid, by default `None`.
+    p_detection_interval : `int`, optional
+        The number of frames between two frames processed by the network, the boxes are tracked on the frames in
+        between, 1 to process all the frames, must be strictly positive, by default `None`.
+    p_backend : `str`, optional
+        The name of the inference engine running YOLO, `"opencv"` or `"onnxruntime"`, by default `None`.
+        With `"onnxruntime"`, the YOLO weights file is the ONNX model.
+    p_threads : `int`, optional
+        The number of threads of the inference engine, 0 to let the engine choose, by default `None`.
+    p_autotune : `bool`, optional
+        `True` to choose the size, the backend and the number of threads by benchmarking them at startup,
+        by default `None`.
+    p_target_fps : `float`, optional
+        The minimum number of frames per second targeted by the autotune, must be strictly positive,
+        by default `None`.
+    p_timing : `bool`, optional
+        `True` to log the duration of each phase of the start, until the first frame is processed, by default `None`.
+    p_output_policy : `str`, optional
+        What to do with a processed frame when the queue of the output video is full, `"block"` to wait for the
+        writer thread, `"drop"` to not write it or `"downscale"` to halve the frame rate once the queue is half full,
+        by default `None`.
+    p_clip_before : `float`, optional
+        The number of seconds recorded before a detection in the event clips, by default `None`.
+        The output video is replaced by event clips if `p_clip_before` or `p_clip_after` is strictly positive.
+    p_clip_after : `float`, optional
+        The number of seconds recorded after the last detection of an event clip, by default `None`.
+    p_camera : `Dict[str, Any]`, optional
+        The format asked to the camera, with any of the keys `"fourcc"` of 4 characters like `"MJPG"`, `"width"`,
+        `"height"`, `"fps"` and `"buffer_size"` the number of frames buffered by the driver. The other settings are
+        left to the driver. The dictionary is ignored if one of the settings is invalid, by default `None`.
+    p_sources : `List[Dict[str, Any]]`, optional
+        The video streams processed together with a single network, each one a dictionary with the keys
+        `"device"` the camera device or the video file, `"panel_gpios"` the list of GPIOs signaling its detections
+        and optionally `"priority"` its share of the turns of the network, at least 1. The list is ignored if one of
+        the sources is invalid, by default `None`.
+    p_metrics : `str`, optional
+        The address on which the latency of each stage and the counters are exposed in the Prometheus text format,
+        `"host:port"` like `"localhost:9100"` or `"unix:<path>"` for a Unix socket, empty to not expose them,
+        by default `None`.
+    p_raw_cache : `str`, optional
+        The folder where the candidate boxes of the network are saved for each processed frame, to decode them again
+        with other thresholds by `clearway redecode`, empty to not save them, by default `None`.
+    p_tiles : `List[int]`, optional
+        The number of columns and rows of the tiles cut in each part of the image and sent together to the network,
+        to detect the small objects of the high resolution cameras, by default `None`.
+    p_tile_overlap : `float`, optional
+        The fraction of a tile shared with its neighbour, between 0 and 0.5, by default `None`.
+    p_sizes : `List[int]`, optional
+        The sizes of the blob between which the size switches to keep the latency of the inference of a frame under
+        the target latency, empty to keep the size, by default `None`.
+    p_target_latency : `float`, optional
+        The maximum number of seconds of the inference of a frame, 0 to keep the size, by default `None`.
+    p_governor : `Dict[str, Any]`, optional
+        The settings of the governor sending fewer frames to the network when the CPU heats up or the latency of the
+        frames grows: `target_latency`, `max_interval`, `soft_temperature`, `hard_temperature`, `period`,
+        `smoothing`, `temperature_path`, `frequency_path` and `max_frequency_path`, see `clearway.ai.governor`,
+        by default `None`.
     p_dict : `Dict[str, Any]`, optional
         A dictionary containing the information, by default `None`.
 
@@ -415,6 +772,75 @@ def save_config_ai(
         if IMG_SIZE in p_dict.keys():
             save_config_ai(p_size=p_dict[IMG_SIZE])
 
+        if JOBS in p_dict.keys():
+            save_config_ai(p_jobs=p_dict[JOBS])
+
+        if BATCH_SIZE in p_dict.keys():
+            save_config_ai(p_batch_size=p_dict[BATCH_SIZE])
+
+        if MOTION_THRESHOLD in p_dict.keys():
+            save_config_ai(p_motion_threshold=p_dict[MOTION_THRESHOLD])
+
+        if MOTION_INTERVAL in p_dict.keys():
+            save_config_ai(p_motion_interval=p_dict[MOTION_INTERVAL])
+
+        if ROI in p_dict.keys():
+            save_config_ai(p_roi=p_dict[ROI])
+
+        if DETECTION_INTERVAL in p_dict.keys():
+            save_config_ai(p_detection_interval=p_dict[DETECTION_INTERVAL])
+
+        if BACKEND in p_dict.keys():
+            save_config_ai(p_backend=p_dict[BACKEND])
+
+        if THREADS in p_dict.keys():
+            save_config_ai(p_threads=p_dict[THREADS])
+
+        if AUTOTUNE in p_dict.keys():
+            save_config_ai(p_autotune=p_dict[AUTOTUNE])
+
+        if TARGET_FPS in p_dict.keys():
+            save_config_ai(p_target_fps=p_dict[TARGET_FPS])
+
+        if TIMING in p_dict.keys():
+            save_config_ai(p_timing=p_dict[TIMING])
+
+        if OUTPUT_POLICY in p_dict.keys():
+            save_config_ai(p_output_policy=p_dict[OUTPUT_POLICY])
+
+        if CLIP_BEFORE in p_dict.keys():
+            save_config_ai(p_clip_before=p_dict[CLIP_BEFORE])
+
+        if CLIP_AFTER in p_dict.keys():
+            save_config_ai(p_clip_after=p_dict[CLIP_AFTER])
+
+        if CAMERA in p_dict.keys():
+            save_config_ai(p_camera=p_dict[CAMERA])
+
+        if SOURCES in p_dict.keys():
+            save_config_ai(p_sources=p_dict[SOURCES])
+
+        if METRICS in p_dict.keys():
+            save_config_ai(p_metrics=p_dict[METRICS])
+
+        if RAW_CACHE in p_dict.keys():
+            save_config_ai(p_raw_cache=p_dict[RAW_CACHE])
+
+        if TILES in p_dict.keys():
+            save_config_ai(p_tiles=p_dict[TILES])
+
+        if TILE_OVERLAP in p_dict.keys():
+            save_config_ai(p_tile_overlap=p_dict[TILE_OVERLAP])
+
+        if SIZES in p_dict.keys():
+            save_config_ai(p_sizes=p_dict[SIZES])
+
+        if TARGET_LATENCY in p_dict.keys():
+            save_config_ai(p_target_latency=p_dict[TARGET_LATENCY])
+
+        if GOVERNOR in p_dict.keys():
+            save_config_ai(p_governor=p_dict[GOVERNOR])
+
     if p_dict is not None:
         recursive_call(p_dict)
 
@@ -439,6 +865,208 @@ def save_config_ai(
     if isinstance(p_real_time_processing, bool):
         __config_dict[MODULE_AI][SEE_REAL_TIME_PROCESS] = p_real_time_processing
 
+    if isinstance(p_jobs, int) and not isinstance(p_jobs, bool) and p_jobs > 0:
+        __config_dict[MODULE_AI][JOBS] = p_jobs
+
+    if isinstance(p_batch_size, int) and not isinstance(p_batch_size, bool) and p_batch_size > 0:
+        __config_dict[MODULE_AI][BATCH_SIZE] = p_batch_size
+
+    if isinstance(p_motion_threshold, (int, float)) and 0 <= p_motion_threshold <= 1:
+        __config_dict[MODULE_AI][MOTION_THRESHOLD] = float(p_motion_threshold)
+
+    if isinstance(p_motion_interval, int) and p_motion_interval >= 0:
+        __config_dict[MODULE_AI][MOTION_INTERVAL] = p_motion_interval
+
+    if isinstance(p_roi, list) and all(__is_region_of_interest(l_region) for l_region in p_roi):
+        __config_dict[MODULE_AI][ROI] = p_roi
+
+    if isinstance(p_detection_interval, int) and p_detection_interval > 0:
+        __config_dict[MODULE_AI][DETECTION_INTERVAL] = p_detection_interval
+
+    if isinstance(p_backend, str) and p_backend in backend.BACKENDS:
+        __config_dict[MODULE_AI][BACKEND] = p_backend
+
+    if isinstance(p_threads, int) and p_threads >= 0:
+        __config_dict[MODULE_AI][THREADS] = p_threads
+
+    if isinstance(p_autotune, bool):
+        __config_dict[MODULE_AI][AUTOTUNE] = p_autotune
+
+    if isinstance(p_target_fps, (int, float)) and p_target_fps > 0:
+        __config_dict[MODULE_AI][TARGET_FPS] = float(p_target_fps)
+
+    if isinstance(p_timing, bool):
+        __config_dict[MODULE_AI][TIMING] = p_timing
+
+    if isinstance(p_output_policy, str) and p_output_policy in ("block", "drop", "downscale"):
+        __config_dict[MODULE_AI][OUTPUT_POLICY] = p_output_policy
+
+    if isinstance(p_clip_before, (int, float)) and p_clip_before >= 0:
+        __config_dict[MODULE_AI][CLIP_BEFORE] = float(p_clip_before)
+
+    if isinstance(p_clip_after, (int, float)) and p_clip_after >= 0:
+        __config_dict[MODULE_AI][CLIP_AFTER] = float(p_clip_after)
+
+    if __is_camera_settings(p_camera):
+        __config_dict[MODULE_AI][CAMERA] = p_camera
+
+    if isinstance(p_sources, list) and all(__is_source(l_source) for l_source in p_sources):
+        __config_dict[MODULE_AI][SOURCES] = p_sources
+
+    if isinstance(p_metrics, str):
+        __config_dict[MODULE_AI][METRICS] = p_metrics
+
+    if isinstance(p_raw_cache, str):
+        __config_dict[MODULE_AI][RAW_CACHE] = p_raw_cache
+
+    if isinstance(p_tiles, list) and len(p_tiles) == 2 and all(isinstance(l_n, int) and l_n > 0 for l_n in p_tiles):
+        __config_dict[MODULE_AI][TILES] = p_tiles
+
+    if isinstance(p_tile_overlap, (int, float)) and 0 <= p_tile_overlap < 0.5:
+        __config_dict[MODULE_AI][TILE_OVERLAP] = float(p_tile_overlap)
+
+    if isinstance(p_sizes, list) and all(isinstance(l_size, int) and l_size > 0 for l_size in p_sizes):
+        __config_dict[MODULE_AI][SIZES] = p_sizes
+
+    if isinstance(p_target_latency, (int, float)) and p_target_latency >= 0:
+        __config_dict[MODULE_AI][TARGET_LATENCY] = float(p_target_latency)
+
+    if __is_governor_settings(p_governor):
+        __config_dict[MODULE_AI][GOVERNOR] = p_governor
+
+
+def __is_camera_settings(p_camera: Any) -> bool:
+    """Check the format asked to the camera.
+
+    Parameters
+    ----------
+    p_camera : `Any`
+        The configuration of the camera.
+
+    Returns
+    -------
+    bool
+        `True` if all the settings are known and valid.
+    """
+    if not isinstance(p_camera, dict) or not set(p_camera.keys()) <= {
+        "fourcc",
+        "width",
+        "height",
+        "fps",
+        "buffer_size",
+    }:
+        return False
+
+    if "fourcc" in p_camera and (not isinstance(p_camera["fourcc"], str) or len(p_camera["fourcc"]) != 4):
+        return False
+
+    if "fps" in p_camera and (not isinstance(p_camera["fps"], (int, float)) or p_camera["fps"] <= 0):
+        return False
+
+    return all(
+        isinstance(p_camera[l_name], int) and p_camera[l_name] > 0
+        for l_name in ("width", "height", "buffer_size")
+        if l_name in p_camera
+    )
+
+
+def __is_governor_settings(p_governor: Any) -> bool:
+    """Check the settings of the governor.
+
+    Parameters
+    ----------
+    p_governor : `Any`
+        The configuration of the governor.
+
+    Returns
+    -------
+    bool
+        `True` if all the settings are known and valid.
+    """
+    l_numbers = {"target_latency", "soft_temperature", "hard_temperature", "period", "smoothing"}
+    l_paths = {"temperature_path", "frequency_path", "max_frequency_path"}
+    if not isinstance(p_governor, dict) or not set(p_governor.keys()) <= l_numbers | l_paths | {"max_interval"}:
+        return False
+
+    if "max_interval" in p_governor and (
+        not isinstance(p_governor["max_interval"], int) or p_governor["max_interval"] <= 0
+    ):
+        return False
+
+    if not all(isinstance(p_governor[l_name], str) for l_name in l_paths if l_name in p_governor):
+        return False
+
+    return all(
+        isinstance(p_governor[l_name], (int, float)) and p_governor[l_name] >= 0
+        for l_name in l_numbers
+        if l_name in p_governor
+    )
+
+
+def __is_source(p_source: Any) -> bool:
+    """Check the configuration of a video stream processed with the others.
+
+    Parameters
+    ----------
+    p_source : `Any`
+        The configuration of the video stream.
+
+    Returns
+    -------
+    bool
+        `True` if the video stream has a device, at least one GPIO and a priority of at least 1.
+    """
+    if not isinstance(p_source, dict) or not set(p_source.keys()) <= {"device", "panel_gpios", "priority"}:
+        return False
+
+    if not isinstance(p_source.get("device"), str) or len(p_source["device"]) == 0:
+        return False
+
+    l_gpios = p_source.get("panel_gpios")
+    if not isinstance(l_gpios, list) or len(l_gpios) == 0:
+        return False
+
+    if any(not isinstance(l_gpio, int) or l_gpio <= 0 for l_gpio in l_gpios):
+        return False
+
+    l_priority = p_source.get("priority", 1)
+    return isinstance(l_priority, int) and not isinstance(l_priority, bool) and l_priority >= 1
+
+
+def __is_region_of_interest(p_region: Any) -> bool:
+    """Check the configuration of a region of interest.
+
+    Parameters
+    ----------
+    p_region : `Any`
+        The configuration of the region.
+
+    Returns
+    -------
+    bool
+        `True` if the region has a non empty rectangle or a polygon of at least 3 points, and at least one GPIO.
+    """
+
+    def is_int_list(p_value: Any, p_length: Optional[int] = None) -> bool:
+        return (
+            isinstance(p_value, list)
+            and all(isinstance(l_item, int) for l_item in p_value)
+            and (p_length is None or len(p_value) == p_length)
+        )
+
+    if not isinstance(p_region, dict) or not is_int_list(p_region.get("panel_gpios")):
+        return False
+
+    if len(p_region["panel_gpios"]) == 0 or any(l_gpio <= 0 for l_gpio in p_region["panel_gpios"]):
+        return False
+
+    if "polygon" in p_region:
+        l_polygon = p_region["polygon"]
+        return isinstance(l_polygon, list) and len(l_polygon) >= 3 and all(is_int_list(l_p, 2) for l_p in l_polygon)
+
+    l_rectangle = p_region.get("rectangle")
+    return is_int_list(l_rectangle, 4) and l_rectangle[2] > 0 and l_rectangle[3] > 0
+
 
 def get_config(p_module_id: Optional[str] = None, p_value_id: Optional[str] = None) -> Any:
     """Return the configuration for the given module and given value id.
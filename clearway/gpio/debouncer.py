@@ -0,0 +1,106 @@
+"""Module to turn the detections of each processed frame into the events of the panels.
+
+The panels are only told to signal on the rising edge of the detections, and to stop once nothing was detected for a
+hold time, so that a frame missed by the network does not toggle the sign and the queue of the state machines only
+receives the changes.
+
+Examples
+--------
+>>> from clearway.gpio import debouncer, stateMachinePanel
+>>> GPIO = 5
+>>> stateMachinePanel.new(GPIO)
+>>> stateMachinePanel.start()
+>>> l_debouncer = debouncer.Debouncer(GPIO, p_hold_time=2.0, p_confirm_frames=2, p_confirm_window=3)
+>>> for l_detected in (True, False, True, True, False):
+...     l_debouncer.update(l_detected)
+>>> l_debouncer.close()
+>>> stateMachinePanel.stop()
+>>> stateMachinePanel.free()
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Callable, Deque, Iterable, Union
+
+from clearway.gpio import stateMachinePanel
+
+
+class Debouncer:
+    """Send the `signal` and `end_signal` events of the panels of the given GPIOs on the edges of the detections.
+
+    The panels start signaling when something is detected in at least `p_confirm_frames` of the last
+    `p_confirm_window` frames, and stop once nothing was detected for `p_hold_time` seconds.
+
+    Parameters
+    ----------
+    p_gpio : `Union[int, Iterable[int]]`
+        The GPIOs of the panels.
+    p_hold_time : `float`, optional
+        The number of seconds without detection before the panels stop signaling, by default 2.0.
+    p_confirm_frames : `int`, optional
+        The number of frames with a detection needed to start signaling, by default 1.
+    p_confirm_window : `int`, optional
+        The number of last frames in which the detections are counted, by default 1.
+        It is at least `p_confirm_frames`.
+    p_clock : `Callable[[], float]`, optional
+        The clock measuring the hold time in seconds, by default `time.monotonic`.
+    """
+
+    def __init__(
+        self,
+        p_gpio: Union[int, Iterable[int]],
+        p_hold_time: float = 2.0,
+        p_confirm_frames: int = 1,
+        p_confirm_window: int = 1,
+        p_clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.__gpio: Union[int, Iterable[int]] = p_gpio
+        self.__hold_time: float = p_hold_time
+        self.__confirm_frames: int = p_confirm_frames
+        self.__window: Deque[bool] = deque(maxlen=max(p_confirm_window, p_confirm_frames))
+        self.__clock: Callable[[], float] = p_clock
+        self.__last_detection: float = 0.0
+
+        self.signaling: bool = False
+        """`True` if the panels were told to signal."""
+        self.nb_updates: int = 0
+        """The number of frames given to `update`."""
+        self.nb_events: int = 0
+        """The number of events sent to the panels."""
+
+    def update(self, p_detected: bool) -> None:
+        """Take the detections of a processed frame into account.
+
+        Parameters
+        ----------
+        p_detected : `bool`
+            `True` if something was detected in the frame.
+        """
+        l_now = self.__clock()
+        self.nb_updates += 1
+        self.__window.append(p_detected)
+
+        if p_detected and self.signaling:
+            self.__last_detection = l_now
+        elif p_detected and sum(self.__window) >= self.__confirm_frames:
+            # Rising edge
+            stateMachinePanel.signal(self.__gpio)
+            self.signaling = True
+            self.__last_detection = l_now
+            self.nb_events += 1
+        elif self.signaling and l_now - self.__last_detection >= self.__hold_time:
+            # Falling edge, the detections must be confirmed again
+            stateMachinePanel.end_signal(self.__gpio)
+            self.signaling = False
+            self.__window.clear()
+            self.nb_events += 1
+
+    def close(self) -> None:
+        """Tell the panels to stop signaling, without waiting for the hold time."""
+        if self.signaling:
+            stateMachinePanel.end_signal(self.__gpio)
+            self.signaling = False
+            self.nb_events += 1
+
+        logging.debug("[PANEL] %s: %d events sent for %d frames", self.__gpio, self.nb_events, self.nb_updates)
@@ -291,6 +291,20 @@ def free() -> None:
         del __state_machines[l_gpio]
 
 
+def queue_depth() -> int:
+    """Return the number of events waiting to be handled by the state machines.
+
+    Returns
+    -------
+    `int`
+        The number of events in the queue, 0 if the state machines are not started.
+    """
+    try:
+        return __queue.qsize()
+    except NameError:
+        return 0
+
+
 def signal(p_gpio: Union[int, Iterable[int]]) -> None:
     """Signal to the state machine of the given GPIOs to emit the signal.
 
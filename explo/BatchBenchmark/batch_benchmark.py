@@ -0,0 +1,56 @@
+"""Benchmark of the number of frames processed per second for each batch size.
+
+The frames of the video are decoded once, then sent to the network by batch with `cv2.dnn.blobFromImages`.
+"""
+import argparse
+import time
+
+import cv2
+
+BATCH_SIZES = [1, 2, 4, 8, 16]
+
+
+def read_frames(path, nb_frames):
+    video = cv2.VideoCapture(path)
+    frames = []
+    read_ok, img = video.read()
+    while read_ok and len(frames) < nb_frames:
+        frames.append(img)
+        read_ok, img = video.read()
+    video.release()
+    return frames
+
+
+def frames_per_second(network, output_layers, frames, size, batch_size):
+    # Warm-up, the first forward pass of a new input shape allocates the network
+    blob = cv2.dnn.blobFromImages(frames[:batch_size], 1 / 255, (size, size), (0, 0, 0), swapRB=True, crop=False)
+    network.setInput(blob)
+    network.forward(output_layers)
+
+    start_time = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        blob = cv2.dnn.blobFromImages(
+            frames[i : i + batch_size], 1 / 255, (size, size), (0, 0, 0), swapRB=True, crop=False
+        )
+        network.setInput(blob)
+        network.forward(output_layers)
+    return len(frames) / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--yolo-weights", default="../../resources/yolov2-tiny.weights")
+    parser.add_argument("--yolo-cfg", default="../../resources/yolov2-tiny.cfg")
+    parser.add_argument("--input-path", default="../../resources/videos/bicycle_3fps.mp4")
+    parser.add_argument("--size", type=int, default=320)
+    parser.add_argument("--nb-frames", type=int, default=64)
+    args = parser.parse_args()
+
+    network = cv2.dnn.readNet(args.yolo_weights, args.yolo_cfg)
+    output_layers = network.getUnconnectedOutLayersNames()
+    frames = read_frames(args.input_path, args.nb_frames)
+
+    print("{:>10} {:>10}".format("batch", "frames/s"))
+    for batch_size in BATCH_SIZES:
+        fps = frames_per_second(network, output_layers, frames, args.size, batch_size)
+        print("{:>10} {:>10.2f}".format(batch_size, fps))
@@ -0,0 +1,63 @@
+"""Micro-benchmark of the decoding of the YOLO output layers.
+
+Compare the row by row Python loop formerly used by `Ai.bicycle_detector` with `clearway.ai.decode`.
+"""
+import sys
+import timeit
+
+import numpy
+
+sys.path.append("../..")
+
+from clearway.ai import decode  # noqa: E402 module level import not at top of file
+
+BICYCLE = 6
+REPEAT = 50
+
+# Number of rows of the output layers: yolov2-tiny at 320, 416 and 608, then yolov3 at 416
+LAYERS = {
+    "yolov2-tiny 320": [500],
+    "yolov2-tiny 416": [845],
+    "yolov2-tiny 608": [1805],
+    "yolov3 416": [507, 2028, 8112],
+}
+
+
+def make_outs(rows):
+    generator = numpy.random.default_rng(0)
+    outs = []
+    for n in rows:
+        out = generator.random((n, 85), dtype=numpy.float32)
+        out[:, 4] = generator.random(n, dtype=numpy.float32) ** 4
+        out[:, 5:] *= out[:, 4, numpy.newaxis]
+        outs.append(out)
+    return outs
+
+
+def legacy_decode(outs, width, height):
+    boxes = []
+    confidences = []
+    for out in outs:
+        for detection in out:
+            confidence = detection[BICYCLE]
+            if confidence > 0.5:
+                center_x = int(detection[0] * width)
+                center_y = int(detection[1] * height)
+                w = int(detection[2] * width)
+                h = int(detection[3] * height)
+                boxes.append([int(center_x - w / 2), int(center_y - h / 2), w, h])
+                confidences.append(float(confidence))
+    return boxes, confidences
+
+
+if __name__ == "__main__":
+    print("{:<16} {:>12} {:>12} {:>8}".format("layers", "loop (ms)", "numpy (ms)", "speedup"))
+    for name, rows in LAYERS.items():
+        outs = make_outs(rows)
+        loop = timeit.timeit(lambda: legacy_decode(outs, 1280, 720), number=REPEAT) / REPEAT * 1000
+        vectorized = (
+            timeit.timeit(lambda: decode.decode_output_layers(outs, 1280, 720, BICYCLE, 0.5), number=REPEAT)
+            / REPEAT
+            * 1000
+        )
+        print("{:<16} {:>12.3f} {:>12.3f} {:>7.1f}x".format(name, loop, vectorized, loop / vectorized))
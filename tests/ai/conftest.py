@@ -0,0 +1,84 @@
+"""The fakes and the fixtures shared by the tests of the detection."""
+import os
+from typing import Callable, List, Optional, Tuple
+
+import numpy
+import cv2
+import pytest
+from clearway.ai import backend
+from pytest_mock import MockerFixture
+
+NO_ROWS: numpy.ndarray = numpy.zeros((0, 85), dtype=numpy.float32)
+"""The output of the network for a frame without candidate box."""
+
+
+class FakeBackend:
+    """Return the given rows for each frame sent to the network, and remember the frames sent.
+
+    Parameters
+    ----------
+    rows : Callable[[int], numpy.ndarray], optional
+        The (rows, 85) output of the network for a frame, given the index of the frame among all the frames sent,
+        by default None to return no row.
+    """
+
+    def __init__(self, rows: Optional[Callable[[int], numpy.ndarray]] = None) -> None:
+        self.__rows: Callable[[int], numpy.ndarray] = rows if rows is not None else lambda _: NO_ROWS
+
+        self.batches: List[int] = []
+        """The number of frames sent together at each inference."""
+        self.shapes: List[Tuple[int, ...]] = []
+        """The shape of each frame sent."""
+
+    @property
+    def nb_frames(self) -> int:
+        """The number of frames sent."""
+        return sum(self.batches)
+
+    def infer(self, frames: List[numpy.ndarray]) -> List[numpy.ndarray]:
+        """Return the rows of each frame."""
+        outs = [self.__rows(self.nb_frames + index) for index in range(len(frames))]
+        self.batches.append(len(frames))
+        self.shapes.extend(frame.shape for frame in frames)
+        return outs
+
+
+@pytest.fixture
+def fake_backend(mocker: MockerFixture) -> Callable[..., FakeBackend]:
+    """Return a function replacing the inference engine created by `backend.create` with a `FakeBackend`.
+
+    Returns
+    -------
+    Callable[..., FakeBackend]
+        The function, taking the arguments of `FakeBackend` and returning the fake shared by the next `Ai`.
+        `backend.create` is a mock counting the engines created.
+    """
+
+    def patch(rows: Optional[Callable[[int], numpy.ndarray]] = None) -> FakeBackend:
+        inference_backend = FakeBackend(rows)
+        mocker.patch.object(backend, "create", return_value=inference_backend)
+        return inference_backend
+
+    return patch
+
+
+@pytest.fixture
+def write_video(tmp_path: str) -> Callable[..., str]:
+    """Return a function writing a small video whose frame `i` is filled with the value `i * 10`.
+
+    Returns
+    -------
+    Callable[..., str]
+        The function, taking the number of frames, optionally the width, the height and the name of the video in the
+        temporary folder of the test, by default 64, 48 and `"video.mp4"`, and returning the path to the video.
+    """
+
+    def write(nb_frames: int, width: int = 64, height: int = 48, name: str = "video.mp4") -> str:
+        path = os.path.join(tmp_path, name)
+        video_writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 15, (width, height))
+        for index in range(nb_frames):
+            video_writer.write(numpy.full((height, width, 3), index * 10 % 256, dtype=numpy.uint8))
+        video_writer.release()
+        return path
+
+    return write
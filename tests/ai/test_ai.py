@@ -1,6 +1,26 @@
 """Bicycles detection test with YOLO and openCV."""
-from clearway.ai import ai
+from typing import Callable
+
+import numpy
+import pytest
+from clearway.ai import ai, roi
+from clearway.gpio import stateMachinePanel
 from pytest_mock import MockerFixture
+from tests.ai.conftest import FakeBackend
+
+
+def bicycle_rows(nb_frames_with_bicycle: int) -> Callable[[int], numpy.ndarray]:
+    """Return the rows of a bicycle in the middle of the first frames, then no row.
+
+    Parameters
+    ----------
+    nb_frames_with_bicycle : int
+        The number of first frames with a bicycle.
+    """
+    row = numpy.zeros((1, 85), dtype=numpy.float32)
+    row[0, :5] = [0.5, 0.5, 0.2, 0.2, 0.9]
+    row[0, ai._IdYoloOutputLayer.BICYCLE] = 0.8
+    return lambda index: row if index < nb_frames_with_bicycle else row[:0]
 
 
 def test_initialise_ai_instance(mocker: MockerFixture) -> None:
@@ -85,3 +105,72 @@ def test_input_video_no_output_video():
 
 def test_input_video_output_video():
     """Input video processing test with output video."""
+
+
+def test_detections(write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend]) -> None:
+    """Check that a record is yielded for each frame, with the boxes of the frame and its capture time."""
+    video_path = write_video(5, 100, 50)
+    fake_backend(bicycle_rows(2))
+
+    detections = list(ai.Ai(False, False, "weights", "cfg", 64, video_path, batch_size=2).detections())
+
+    assert [detection.frame_index for detection in detections] == [0, 1, 2, 3, 4]
+    assert [len(detection.boxes) for detection in detections] == [1, 1, 0, 0, 0]
+    assert detections[0].boxes.tolist() == [[40, 20, 20, 10]]
+    assert detections[0].scores.tolist() == [numpy.float32(0.8)]
+    assert detections[0].classes.tolist() == [1]
+    assert detections[2].boxes.shape == (0, 4)
+    assert all(first.timestamp <= second.timestamp for first, second in zip(detections, detections[1:]))
+
+
+def test_region_outside(write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend]) -> None:
+    """Check that a region of interest entirely outside of the frames is rejected when the video is opened."""
+    video_path = write_video(2, 100, 50)
+    fake_backend()
+    region = roi.RegionOfInterest.from_config({"rectangle": [120, 10, 20, 20], "panel_gpios": [5]})
+
+    with pytest.raises(ValueError):
+        ai.Ai(False, False, "weights", "cfg", 64, video_path, regions_of_interest=[region])
+
+
+def test_detections_panels(
+    write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend], mocker: MockerFixture
+) -> None:
+    """Check that the panels are only signaled if their GPIOs are given, and that closing the generator stops it."""
+    video_path = write_video(5, 100, 50)
+    fake_backend(bicycle_rows(5))
+    signal = mocker.patch.object(stateMachinePanel, "signal")
+    mocker.patch.object(stateMachinePanel, "end_signal")
+
+    for _ in ai.Ai(False, False, "weights", "cfg", 64, video_path).detections():
+        pass
+    assert signal.call_count == 0
+
+    fake_backend(bicycle_rows(5))
+    detections = ai.Ai(False, False, "weights", "cfg", 64, video_path).detections(5)
+    next(detections)
+    detections.close()
+    signal.assert_called_once_with({5})
+
+
+def test_bicycle_detector(
+    write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend], mocker: MockerFixture
+) -> None:
+    """Check that each record of `detections` is drawn and written, and that the panels are signaled once."""
+    video_path = write_video(4, 100, 50)
+    fake_backend(bicycle_rows(1))
+    signal = mocker.patch.object(stateMachinePanel, "signal")
+    mocker.patch.object(stateMachinePanel, "end_signal")
+    write_image = mocker.patch.object(ai.Ai, "write_image")
+
+    ai.Ai(False, False, "weights", "cfg", 64, video_path, batch_size=2).bicycle_detector(5)
+
+    assert [call.args[2] for call in write_image.call_args_list] == [True, False, False, False]
+    # The box is drawn in the first frame only
+    assert [(call.args[1] == (0, 0, 255)).all(axis=2).any() for call in write_image.call_args_list] == [
+        True,
+        False,
+        False,
+        False,
+    ]
+    signal.assert_called_once_with({5})
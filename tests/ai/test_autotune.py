@@ -0,0 +1,95 @@
+"""Test the choice of the size, the backend and the threads by benchmarking them.
+
+See Also
+--------
+clearway.ai.autotune: File Under Test
+"""
+import os
+from typing import Any, List
+
+import numpy
+from clearway.ai import autotune, backend
+from pytest_mock import MockerFixture
+
+SETTINGS: List[autotune.Setting] = [
+    autotune.Setting(320, backend.OPENCV, 1, 9.0),
+    autotune.Setting(320, backend.OPENCV, 4, 14.0),
+    autotune.Setting(416, backend.OPENCV, 1, 5.0),
+    autotune.Setting(416, backend.OPENCV, 4, 8.0),
+    autotune.Setting(608, backend.OPENCV, 4, 3.0),
+]
+"""Benchmarked combinations."""
+
+
+def test_choose_most_accurate() -> None:
+    """Check that the largest size reaching the target FPS is chosen, with its fastest combination."""
+    assert autotune.choose(SETTINGS, 6.0) == SETTINGS[3]
+    assert autotune.choose(SETTINGS, 2.0) == SETTINGS[4]
+
+
+def test_choose_fastest_when_too_slow() -> None:
+    """Check that the fastest combination is chosen when none reaches the target FPS."""
+    assert autotune.choose(SETTINGS, 30.0) == SETTINGS[1]
+
+
+def test_read_frames(tmp_path: Any) -> None:
+    """Check that random frames are benchmarked without video, and that a short video is completed."""
+    frames = autotune.read_frames()
+    assert len(frames) == autotune.NB_FRAMES
+    assert frames[0].shape == (480, 640, 3)
+
+    frames = autotune.read_frames("resources/videos/bicycle_3fps.mp4")
+    assert len(frames) == autotune.NB_FRAMES
+    assert not numpy.array_equal(frames[0], frames[1])
+
+
+def test_cache(mocker: MockerFixture, tmp_path: Any) -> None:
+    """Check that the choice is cached, and benchmarked again when the weights change."""
+    weights = tmp_path / "yolo.weights"
+    weights.write_bytes(b"weights")
+    cache_path = str(tmp_path / "cache" / "autotune.json")
+    spy_benchmark = mocker.patch.object(autotune, "benchmark", return_value=SETTINGS)
+
+    first = autotune.autotune(str(weights), "", 6.0, cache_path=cache_path)
+    second = autotune.autotune(str(weights), "", 6.0, cache_path=cache_path)
+
+    assert first == second == SETTINGS[3]
+    assert spy_benchmark.call_count == 1
+
+    weights.write_bytes(b"new weights")
+    autotune.autotune(str(weights), "", 6.0, cache_path=cache_path)
+    assert spy_benchmark.call_count == 2
+
+    autotune.autotune(str(weights), "", 2.0, cache_path=cache_path)
+    assert spy_benchmark.call_count == 3
+
+
+def test_hash_files_memo(tmp_path: Any) -> None:
+    """Check that the digest of unchanged files is remembered instead of reading the files again."""
+    weights = tmp_path / "yolo.weights"
+    weights.write_bytes(b"weights")
+    memo_path = str(tmp_path / "hashes.json")
+    digest = autotune.hash_files(str(weights), "")
+    assert autotune.hash_files(str(weights), "", memo_path=memo_path) == digest
+
+    # Same size and modification time: the file is not read again
+    stat = os.stat(weights)
+    weights.write_bytes(b"WEIGHTS")
+    os.utime(weights, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert autotune.hash_files(str(weights), "", memo_path=memo_path) == digest
+
+    weights.write_bytes(b"new weights")
+    assert autotune.hash_files(str(weights), "", memo_path=memo_path) == autotune.hash_files(str(weights), "")
+    assert autotune.hash_files(str(weights), "") != digest
+
+
+def test_benchmark_skips_failures(mocker: MockerFixture) -> None:
+    """Check that the combinations that can not run are skipped."""
+    detector = mocker.Mock()
+    mocker.patch.object(backend, "create", side_effect=[detector, RuntimeError("size not supported")] * 10)
+    mocker.patch.object(autotune, "thread_counts", return_value=[1, 2])
+
+    settings = autotune.benchmark("yolo.weights", "yolo.cfg", autotune.read_frames())
+
+    assert [(setting.size, setting.threads) for setting in settings] == [(size, 1) for size in autotune.SIZES]
+    assert all(setting.fps > 0 for setting in settings)
@@ -0,0 +1,142 @@
+"""Test the inference engines running YOLO.
+
+See Also
+--------
+clearway.ai.backend: File Under Test
+"""
+import os
+import tracemalloc
+from typing import Any, List
+
+import numpy
+import pytest
+import cv2
+from clearway.ai import backend, cache, capture
+from pytest_mock import MockerFixture
+
+SIZE: int = 85
+"""The size of the blob, so that the pixels of a blob can be reshaped into rows of 85 columns."""
+
+
+def make_frames(nb_frames: int) -> List[numpy.ndarray]:
+    """Create frames of a different gray level each.
+
+    Parameters
+    ----------
+    nb_frames : int
+        The number of frames.
+
+    Returns
+    -------
+    List[numpy.ndarray]
+        The 120x160 BGR frames.
+    """
+    return [numpy.full((120, 160, 3), 10 * (i + 1), dtype=numpy.uint8) for i in range(nb_frames)]
+
+
+def test_preprocessor() -> None:
+    """Check that the preprocessor gives the same blob as OpenCV, for views of frames and padded batches."""
+    frames = [numpy.random.default_rng(seed).integers(0, 256, (120, 160, 3), dtype=numpy.uint8) for seed in range(3)]
+    preprocessor = backend.Preprocessor(32)
+
+    numpy.testing.assert_array_equal(preprocessor.to_blob(frames), backend.to_blob(frames, 32))
+    crop = frames[0][10:90, 20:150]
+    numpy.testing.assert_array_equal(preprocessor.to_blob([crop]), backend.to_blob([crop], 32))
+
+    blob = preprocessor.to_blob(frames[:1], batch_size=2)
+    assert blob.shape == (2, 3, 32, 32)
+    numpy.testing.assert_array_equal(blob[0], backend.to_blob(frames[:1], 32)[0])
+    assert not blob[1].any()
+
+
+def test_preprocessing_allocates_nothing(tmp_path: Any) -> None:
+    """Check that reading and converting 1000 frames to blobs allocates nothing once the buffers are allocated."""
+    path = os.path.join(tmp_path, "video.avi")
+    video_writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 15, (160, 120))
+    for i in range(1100):
+        video_writer.write(numpy.full((120, 160, 3), i % 256, dtype=numpy.uint8))
+    video_writer.release()
+
+    capture_thread = capture.CaptureThread(cv2.VideoCapture(path), drop_oldest=False)
+    capture_thread.start()
+    preprocessor = backend.Preprocessor(64)
+    for _ in range(100):
+        preprocessor.to_blob([capture_thread.read()[1]])
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for _ in range(1000):
+            preprocessor.to_blob([capture_thread.read()[1]])
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        capture_thread.stop()
+
+    # Far less than a frame or a blob, only a few small Python objects
+    assert after - before < 16 * 1024
+    assert peak - before < 16 * 1024
+
+
+def test_merge_layers() -> None:
+    """Check that the layers of a batch are split by frame and merged into a single array."""
+    outs = [numpy.arange(2 * 3 * 85).reshape(2, 3, 85), numpy.arange(2 * 4 * 85).reshape(2, 4, 85)]
+
+    detections = backend.merge_layers(outs, 2)
+
+    assert [d.shape for d in detections] == [(7, 85), (7, 85)]
+    numpy.testing.assert_array_equal(detections[1][:3], outs[0][1])
+    numpy.testing.assert_array_equal(detections[1][3:], outs[1][1])
+
+
+@pytest.mark.parametrize("p_unconnected", [[[2], [4]], [2, 4]])
+def test_opencv_output_layers(mocker: MockerFixture, p_unconnected: Any) -> None:
+    """Check that the output layers are found with the nested indexes of old OpenCV versions and the flat ones."""
+    network = mocker.Mock()
+    network.getLayerNames.return_value = ["conv_0", "yolo_1", "conv_2", "yolo_3"]
+    network.getUnconnectedOutLayers.return_value = numpy.array(p_unconnected)
+    network.forward.return_value = [numpy.zeros((1, 5, 85)), numpy.zeros((1, 2, 85))]
+    mocker.patch("cv2.dnn.readNet", return_value=network)
+
+    detections = backend.create(backend.OPENCV, "yolo.weights", "yolo.cfg", 32).infer(make_frames(1))
+
+    network.forward.assert_called_once_with(["yolo_1", "yolo_3"])
+    assert [d.shape for d in detections] == [(7, 85)]
+
+
+def test_unknown_backend() -> None:
+    """Check that an unknown backend is refused."""
+    with pytest.raises(ValueError, match="Unknown backend"):
+        backend.create("tensorflow", "yolo.weights", "yolo.cfg", 32)
+
+
+@pytest.mark.parametrize("p_batch_size", ["N", 1, 2])
+def test_onnxruntime(mocker: MockerFixture, tmp_path: Any, p_batch_size: Any) -> None:
+    """Check the ONNX Runtime backend with a model reshaping its input into rows of 85 columns.
+
+    The batch size of the model is dynamic or fixed, the frames are then sent in padded chunks.
+    """
+    mocker.patch.object(cache, "CACHE_FOLDER", str(tmp_path / "cache"))
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import helper, TensorProto
+
+    graph = helper.make_graph(
+        [helper.make_node("Reshape", ["images", "shape"], ["detections"])],
+        "reshape",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [p_batch_size, 3, SIZE, SIZE])],
+        [helper.make_tensor_value_info("detections", TensorProto.FLOAT, [p_batch_size, None, 85])],
+        [helper.make_tensor("shape", TensorProto.INT64, [3], [0, -1, 85])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 7
+    model_path = str(tmp_path / "reshape.onnx")
+    onnx.save(model, model_path)
+
+    frames = make_frames(3)
+    detections = backend.create(backend.ONNXRUNTIME, model_path, "", SIZE).infer(frames)
+
+    assert len(detections) == 3
+    for frame, frame_detections in zip(frames, detections):
+        expected = backend.to_blob([frame], SIZE).reshape(-1, 85)
+        numpy.testing.assert_allclose(frame_detections, expected)
@@ -0,0 +1,76 @@
+"""Test the benchmark of the processing of the frames.
+
+See Also
+--------
+clearway.ai.bench: File Under Test
+"""
+import importlib.util
+from typing import Any, Callable, Dict
+
+from clearway.ai import backend, bench, metrics
+from pytest_mock import MockerFixture
+from tests.ai.conftest import FakeBackend
+
+
+def report(fps: float, p99: float) -> Dict[str, Any]:
+    """Return a report of a single result.
+
+    Parameters
+    ----------
+    fps : float
+        The frames processed per second.
+    p99 : float
+        The 99th percentile of the latency of a frame, in milliseconds.
+    """
+    latency = {bench.TOTAL: {"p50": p99 / 2, "p95": p99, "p99": p99}}
+    return {"results": [bench.Result(320, backend.OPENCV, 4, 100, fps, latency)._asdict()]}
+
+
+def test_run_replays_clip(write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend]) -> None:
+    """Check that a short clip is replayed until the frames are measured, after the warm up, with a single network."""
+    path = write_video(6, name="clip.mp4")
+    inference_backend = fake_backend()
+
+    result = bench.run("weights", "cfg", 64, path, nb_frames=10, warmup=2)
+    metrics.reset()
+
+    assert backend.create.call_count == 1
+    assert inference_backend.nb_frames == 12
+    assert result.frames == 10
+    assert result.fps > 0
+    assert set(result.latency) == set(metrics.STAGES) | {bench.TOTAL}
+    assert result.latency[bench.TOTAL]["p50"] <= result.latency[bench.TOTAL]["p99"]
+
+
+def test_run_matrix_skips_missing_runtime(
+    mocker: MockerFixture, write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend]
+) -> None:
+    """Check that a backend whose runtime is not installed is skipped, and the other backends still measured."""
+    path = write_video(6, name="clip.mp4")
+    fake_backend()
+    mocker.patch.object(importlib.util, "find_spec", return_value=None)
+
+    report = bench.run_matrix(
+        "weights", "cfg", [64], [backend.OPENCV, backend.ONNXRUNTIME], [1], path, nb_frames=4, warmup=1
+    )
+    metrics.reset()
+
+    assert backend.create.call_count == 1
+    assert [result["backend_name"] for result in report["results"]] == [backend.OPENCV]
+
+
+def test_compare() -> None:
+    """Check that a drop of the FPS or a growth of the latency beyond the tolerance is a regression."""
+    baseline = report(10.0, 100.0)
+
+    assert not bench.compare(report(9.5, 105.0), baseline, 0.1)[0].regressed
+    assert bench.compare(report(8.5, 100.0), baseline, 0.1)[0].regressed
+    assert bench.compare(report(10.0, 120.0), baseline, 0.1)[0].regressed
+
+
+def test_compare_other_combination() -> None:
+    """Check that the combinations missing from the baseline are not compared."""
+    baseline = report(10.0, 100.0)
+    baseline["results"][0]["size"] = 416
+
+    assert bench.compare(report(5.0, 200.0), baseline) == []
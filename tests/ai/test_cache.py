@@ -0,0 +1,98 @@
+"""Test the cache of the networks.
+
+See Also
+--------
+clearway.ai.cache: File Under Test
+"""
+import os
+from typing import Any
+
+import pytest
+from clearway.ai import backend, cache
+from pytest_mock import MockerFixture
+
+
+def make_files(tmp_path: Any) -> Any:
+    """Write a weights file and a config file.
+
+    Parameters
+    ----------
+    tmp_path : Any
+        The folder of the files.
+
+    Returns
+    -------
+    Tuple[str, str]
+        The paths to the weights file and to the config file.
+    """
+    weights = tmp_path / "yolo.weights"
+    cfg = tmp_path / "yolo.cfg"
+    weights.write_bytes(b"weights")
+    cfg.write_text("[net]")
+    return str(weights), str(cfg)
+
+
+def test_file_key(tmp_path: Any) -> None:
+    """Check that the key changes when a file is modified."""
+    weights, cfg = make_files(tmp_path)
+    key = cache.file_key(weights, cfg)
+
+    assert cache.file_key(weights, cfg) == key
+
+    os.utime(cfg, ns=(0, 0))
+    assert cache.file_key(weights, cfg) != key
+
+
+def test_read_network_once(mocker: MockerFixture, tmp_path: Any) -> None:
+    """Check that the network is read once for the same files, and again once they changed."""
+    weights, cfg = make_files(tmp_path)
+    spy_read_net = mocker.patch("cv2.dnn.readNet", side_effect=lambda *_: mocker.Mock())
+    cache.clear()
+
+    first = cache.read_network(weights, cfg)
+    assert cache.read_network(weights, cfg) is first
+    assert spy_read_net.call_count == 1
+
+    with open(weights, "ab") as file:
+        file.write(b"more weights")
+    assert cache.read_network(weights, cfg) is not first
+    assert spy_read_net.call_count == 2
+
+    cache.clear()
+
+
+def test_optimized_graph_reused(mocker: MockerFixture, tmp_path: Any) -> None:
+    """Check that the graph optimized by ONNX Runtime is saved on the first load and replaced when the model changes."""
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import helper, TensorProto
+
+    mocker.patch.object(cache, "CACHE_FOLDER", str(tmp_path / "cache"))
+    model_path = str(tmp_path / "identity.onnx")
+
+    def save_model(p_opset: int) -> None:
+        graph = helper.make_graph(
+            [helper.make_node("Identity", ["images"], ["detections"])],
+            "identity",
+            [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, 5, 17])],
+            [helper.make_tensor_value_info("detections", TensorProto.FLOAT, [1, 3, 5, 17])],
+        )
+        model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", p_opset)])
+        model.ir_version = 7
+        onnx.save(model, model_path)
+
+    save_model(13)
+    backend.OnnxRuntimeBackend(model_path, 32)
+    models_folder = os.path.join(cache.CACHE_FOLDER, "models")
+    first_files = os.listdir(models_folder)
+    assert len(first_files) == 1
+
+    spy_session = mocker.spy(__import__("onnxruntime"), "InferenceSession")
+    backend.OnnxRuntimeBackend(model_path, 32)
+    assert spy_session.call_args[0][0] == os.path.join(models_folder, first_files[0])
+
+    save_model(14)
+    os.utime(model_path, ns=(1, 1))
+    backend.OnnxRuntimeBackend(model_path, 32)
+    assert len(os.listdir(models_folder)) == 1
+    assert os.listdir(models_folder) != first_files
@@ -0,0 +1,226 @@
+"""Test the capture of the frames on a dedicated thread.
+
+See Also
+--------
+clearway.ai.capture: File Under Test
+"""
+from threading import Event
+import os
+
+import numpy
+import pytest
+import cv2
+from clearway.ai import capture
+
+NB_FRAMES: int = 30
+"""The number of frames of the test video."""
+
+
+@pytest.fixture()
+def video_file(tmp_path: str) -> str:
+    """Write a small video whose frame `i` is filled with the value `i * 8`.
+
+    Parameters
+    ----------
+    tmp_path : str
+        The temporary folder of the test.
+
+    Returns
+    -------
+    str
+        The path to the video.
+    """
+    path = os.path.join(tmp_path, "video.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 15, (64, 48))
+    for i in range(NB_FRAMES):
+        writer.write(numpy.full((48, 64, 3), i * 8, dtype=numpy.uint8))
+    writer.release()
+    return path
+
+
+def fill(ring_buffer: capture.FrameRingBuffer, value: int) -> None:
+    """Publish a frame filled with the given value, as the producer does.
+
+    Parameters
+    ----------
+    ring_buffer : capture.FrameRingBuffer
+        The tested ring buffer.
+    value : int
+        The value of every pixel of the frame.
+    """
+    index = ring_buffer.reserve()
+    ring_buffer.frame(index)[:] = value
+    ring_buffer.publish(index, 0.0)
+
+
+def test_drop_oldest() -> None:
+    """Check that the consumer always gets the freshest frame and that the older ones are counted as dropped."""
+    ring_buffer = capture.FrameRingBuffer(3, drop_oldest=True)
+    ring_buffer.allocate(numpy.zeros((2, 2), dtype=numpy.uint8))
+
+    for value in range(5):
+        fill(ring_buffer, value)
+
+    assert ring_buffer.get()[0, 0] == 4
+    assert ring_buffer.frames_captured == 5
+    assert ring_buffer.frames_dropped == 4
+
+    fill(ring_buffer, 5)
+    assert ring_buffer.get()[0, 0] == 5
+    assert ring_buffer.frames_dropped == 4
+
+
+def test_preallocated() -> None:
+    """Check that the frames given to the consumer are the preallocated ones."""
+    ring_buffer = capture.FrameRingBuffer(2, drop_oldest=False)
+    ring_buffer.allocate(numpy.zeros((2, 2), dtype=numpy.uint8))
+    slots = {id(ring_buffer.frame(0)), id(ring_buffer.frame(1))}
+
+    for value in range(10):
+        fill(ring_buffer, value)
+        assert id(ring_buffer.get()) in slots
+
+
+def test_keep_previous_frames() -> None:
+    """Check that the frames kept by the consumer are not overwritten by the producer."""
+    ring_buffer = capture.FrameRingBuffer(4, drop_oldest=False)
+    ring_buffer.allocate(numpy.zeros((2, 2), dtype=numpy.uint8))
+
+    for value in range(3):
+        fill(ring_buffer, value)
+    batch = [ring_buffer.get(), ring_buffer.get(release_previous=False), ring_buffer.get(release_previous=False)]
+
+    # Only one slot is left to the producer
+    fill(ring_buffer, 3)
+
+    assert [int(frame[0, 0]) for frame in batch] == [0, 1, 2]
+    assert ring_buffer.get()[0, 0] == 3
+
+
+def test_ready_event() -> None:
+    """Check that the shared event is set when a frame is published and when the buffer is closed."""
+    ready_event = Event()
+    ring_buffer = capture.FrameRingBuffer(2, drop_oldest=False, ready_event=ready_event)
+    ring_buffer.allocate(numpy.zeros((2, 2), dtype=numpy.uint8))
+
+    fill(ring_buffer, 1)
+    assert ready_event.is_set()
+
+    ready_event.clear()
+    ring_buffer.get()
+    assert not ready_event.is_set() and not ring_buffer.ready
+    ring_buffer.close()
+    assert ready_event.is_set() and ring_buffer.ready
+
+
+def test_capacity() -> None:
+    """Check that a ring buffer can not be smaller than a slot for the producer and one for the consumer."""
+    with pytest.raises(ValueError):
+        capture.FrameRingBuffer(1, drop_oldest=True)
+
+
+def test_video_file_lossless(video_file: str) -> None:
+    """Check that every frame of a video file is given in order, even with a slow consumer.
+
+    Parameters
+    ----------
+    video_file : str
+        The path to the test video.
+    """
+    capture_thread = capture.CaptureThread(cv2.VideoCapture(video_file), drop_oldest=False, capacity=2)
+    capture_thread.start()
+
+    values = []
+    read_ok, img = capture_thread.read()
+    while read_ok:
+        values.append(int(img.mean() / 8 + 0.5))
+        read_ok, img = capture_thread.read()
+    capture_thread.stop()
+
+    assert values == list(range(NB_FRAMES))
+    assert capture_thread.ring_buffer.frames_dropped == 0
+    assert capture_thread.ring_buffer.frames_consumed == NB_FRAMES
+
+
+def test_video_file_batch(video_file: str) -> None:
+    """Check that the frames of a video file can be read by batch without losing any.
+
+    Parameters
+    ----------
+    video_file : str
+        The path to the test video.
+    """
+    capture_thread = capture.CaptureThread(cv2.VideoCapture(video_file), drop_oldest=False, capacity=6)
+    capture_thread.start()
+
+    values = []
+    batch = []
+    read_ok, img = capture_thread.read()
+    while read_ok:
+        batch.append(img)
+        if len(batch) == 4:
+            values.extend(int(frame.mean() / 8 + 0.5) for frame in batch)
+            batch = []
+            read_ok, img = capture_thread.read()
+        else:
+            read_ok, img = capture_thread.read(release_previous=False)
+    values.extend(int(frame.mean() / 8 + 0.5) for frame in batch)
+    capture_thread.stop()
+
+    assert values == list(range(NB_FRAMES))
+
+
+def test_stop_before_the_end(video_file: str) -> None:
+    """Check that the capture thread stops while it is blocked on a full buffer.
+
+    Parameters
+    ----------
+    video_file : str
+        The path to the test video.
+    """
+    capture_thread = capture.CaptureThread(cv2.VideoCapture(video_file), drop_oldest=False, capacity=2)
+    capture_thread.start()
+
+    read_ok, _ = capture_thread.read()
+    capture_thread.stop()
+
+    assert read_ok
+    assert capture_thread.ring_buffer.frames_consumed == 1
+
+
+class FakeCamera:
+    """A camera which supports MJPG up to 320x240 and has no setting for the buffer size."""
+
+    def __init__(self) -> None:
+        self.properties = {
+            cv2.CAP_PROP_FOURCC: cv2.VideoWriter_fourcc(*"YUYV"),
+            cv2.CAP_PROP_FRAME_WIDTH: 640.0,
+            cv2.CAP_PROP_FRAME_HEIGHT: 480.0,
+            cv2.CAP_PROP_FPS: 30.0,
+            cv2.CAP_PROP_BUFFERSIZE: 4.0,
+        }
+
+    def set(self, prop: int, value: float) -> bool:
+        """Set a property, like `cv2.VideoCapture.set`, the size is clamped."""
+        if prop == cv2.CAP_PROP_BUFFERSIZE:
+            return False
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            value = min(value, 320)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            value = min(value, 240)
+        self.properties[prop] = float(value)
+        return True
+
+    def get(self, prop: int) -> float:
+        """Get a property, like `cv2.VideoCapture.get`."""
+        return self.properties[prop]
+
+
+def test_negotiate(caplog: pytest.LogCaptureFixture) -> None:
+    """Check that the settings accepted by the camera are returned, and that the others are reported."""
+    negotiated = capture.negotiate(FakeCamera(), fourcc="MJPG", width=640, height=240, fps=15, buffer_size=1)
+
+    assert negotiated == {"fourcc": "MJPG", "width": 320, "height": 240, "fps": 15, "buffer_size": 4}
+    assert "width = 320.0 instead of 640" in caplog.text
+    assert "does not support the setting buffer_size" in caplog.text
+    assert "height =" not in caplog.text
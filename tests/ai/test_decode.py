@@ -0,0 +1,129 @@
+"""Test the decoding of the output layers of YOLO.
+
+See Also
+--------
+clearway.ai.decode: File Under Test
+"""
+from typing import List, Tuple
+
+import numpy
+import pytest
+from clearway.ai import decode
+
+BICYCLE: int = 6
+"""The column of the bicycle class in the output layers."""
+
+
+def make_output_layer(rows: int, seed: int) -> numpy.ndarray:
+    """Create a random output layer shaped like the one given by OpenCV.
+
+    Parameters
+    ----------
+    rows : int
+        The number of rows of the layer.
+    seed : int
+        The seed of the random generator.
+
+    Returns
+    -------
+    numpy.ndarray
+        The (rows, 85) output layer, where the class scores are multiplied by the objectness.
+    """
+    generator = numpy.random.default_rng(seed)
+    out = generator.random((rows, 85), dtype=numpy.float32)
+    out[:, decode.OBJECTNESS] = generator.random(rows, dtype=numpy.float32) ** 0.3
+    out[:, 5:] *= out[:, decode.OBJECTNESS, numpy.newaxis]
+    return out
+
+
+def legacy_decode(outs: List[numpy.ndarray], width: int, height: int) -> Tuple[List[List[int]], List[float]]:
+    """Decode the output layers row by row as the detector used to do.
+
+    Parameters
+    ----------
+    outs : List[numpy.ndarray]
+        The output layers.
+    width : int
+        The width of the image.
+    height : int
+        The height of the image.
+
+    Returns
+    -------
+    Tuple[List[List[int]], List[float]]
+        The boxes and their confidences.
+    """
+    boxes = []
+    confidences = []
+    for out in outs:
+        for detection in out:
+            confidence = detection[BICYCLE]
+            if confidence > 0.5:
+                center_x = int(detection[0] * width)
+                center_y = int(detection[1] * height)
+                w = int(detection[2] * width)
+                h = int(detection[3] * height)
+                boxes.append([int(center_x - w / 2), int(center_y - h / 2), w, h])
+                confidences.append(float(confidence))
+    return boxes, confidences
+
+
+@pytest.mark.parametrize("rows", [[500], [845], [507, 2028, 8112]])
+def test_same_result_as_legacy_loop(rows: List[int]) -> None:
+    """Check that the boxes and confidences are the same as the ones given by the row by row loop.
+
+    Parameters
+    ----------
+    rows : List[int]
+        The number of rows of each output layer.
+    """
+    outs = [make_output_layer(n, seed) for seed, n in enumerate(rows)]
+
+    boxes, confidences = decode.decode_output_layers(outs, 1280, 720, BICYCLE, 0.5)
+    legacy_boxes, legacy_confidences = legacy_decode(outs, 1280, 720)
+
+    assert len(legacy_boxes) > 0
+    assert boxes.tolist() == legacy_boxes
+    assert confidences.tolist() == pytest.approx(legacy_confidences)
+
+
+def test_nothing_detected() -> None:
+    """Check that an empty result goes through the Non Maximum Suppression."""
+    outs = [numpy.zeros((845, 85), dtype=numpy.float32)]
+
+    boxes, confidences = decode.decode_output_layers(outs, 640, 480, BICYCLE, 0.5)
+    indexes = decode.non_maximum_suppression(boxes, confidences)
+
+    assert boxes.shape == (0, 4)
+    assert confidences.shape == (0,)
+    assert indexes.shape == (0,)
+
+
+def test_non_maximum_suppression() -> None:
+    """Check that overlapping boxes are merged and that the indexes are flat."""
+    boxes = numpy.array([[10, 10, 100, 100], [12, 12, 100, 100], [300, 300, 50, 50]], dtype=numpy.int32)
+    confidences = numpy.array([0.7, 0.9, 0.6], dtype=numpy.float32)
+
+    indexes = decode.non_maximum_suppression(boxes, confidences)
+
+    assert sorted(indexes.tolist()) == [1, 2]
+
+
+@pytest.mark.parametrize("nb_frames", [1, 3])
+def test_split_batch(nb_frames: int) -> None:
+    """Check that the output layers of a batch are split into the output layers of each frame.
+
+    Parameters
+    ----------
+    nb_frames : int
+        The number of frames of the batch.
+    """
+    layers = [make_output_layer(500, seed) for seed in range(nb_frames)]
+    outs = [numpy.stack(layers)] if nb_frames > 1 else layers
+
+    outs_per_frame = decode.split_batch(outs, nb_frames)
+
+    assert len(outs_per_frame) == nb_frames
+    for layer, outs_of_frame in zip(layers, outs_per_frame):
+        assert len(outs_of_frame) == 1
+        assert numpy.array_equal(outs_of_frame[0], layer)
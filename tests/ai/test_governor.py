@@ -0,0 +1,136 @@
+"""Test the governor sending fewer frames to the network when the CPU heats up or the latency grows.
+
+See Also
+--------
+clearway.ai.governor: File Under Test
+"""
+import logging
+import os
+from typing import Callable, Dict
+
+import pytest
+from clearway.ai import ai, governor, metrics
+from tests.ai.conftest import FakeBackend
+from tests.conftest import FakeClock
+
+
+class FakeSysfs:
+    """A fake tree of sysfs with the temperature and the frequencies of the CPU.
+
+    Parameters
+    ----------
+    folder : str
+        The folder of the tree.
+    """
+
+    def __init__(self, folder: str) -> None:
+        self.paths: Dict[str, str] = {
+            "temperature_path": os.path.join(folder, "temp"),
+            "frequency_path": os.path.join(folder, "scaling_cur_freq"),
+            "max_frequency_path": os.path.join(folder, "cpuinfo_max_freq"),
+        }
+        self.write(50.0, 1500)
+        with open(self.paths["max_frequency_path"], "w") as file:
+            file.write("1500000\n")
+
+    def write(self, temperature: float, frequency: int) -> None:
+        """Write the temperature in degrees Celsius and the current frequency in MHz like the kernel does."""
+        with open(self.paths["temperature_path"], "w") as file:
+            file.write("{}\n".format(int(temperature * 1000)))
+        with open(self.paths["frequency_path"], "w") as file:
+            file.write("{}\n".format(frequency * 1000))
+
+
+def test_read_sensors(tmp_path: str) -> None:
+    """Check that the values of sysfs are converted, and that the missing ones are None."""
+    sysfs = FakeSysfs(tmp_path)
+    sysfs.write(71.5, 600)
+
+    assert governor.read_sensors(**sysfs.paths) == governor.Reading(71.5, 600.0, 1500.0)
+    sysfs.paths["temperature_path"] = os.path.join(tmp_path, "missing")
+    assert governor.read_sensors(**sysfs.paths) == governor.Reading(None, 600.0, 1500.0)
+
+
+def test_latency(tmp_path: str, fake_clock: FakeClock, caplog: pytest.LogCaptureFixture) -> None:
+    """Check that the interval follows the latency once per period, within its range, and that each change is logged."""
+    cpu_governor = governor.Governor(0.1, max_interval=3, clock=fake_clock, **FakeSysfs(tmp_path).paths)
+
+    with caplog.at_level(logging.INFO):
+        assert cpu_governor.record(0.4) == 1
+        fake_clock.now = 1.0
+        # sqrt(0.4 / 0.1) = 2
+        assert cpu_governor.record(0.4) == 2
+        fake_clock.now = 2.0
+        assert cpu_governor.record(0.4) == 3
+        fake_clock.now = 3.0
+        assert cpu_governor.record(0.4) == 3
+
+    assert "[GOVERNOR] Detection interval 1 -> 2: latency 400.0 ms for a target of 100.0 ms, 50.0 °C" in caplog.text
+    assert cpu_governor.nb_changes == 2
+
+    # The smoothed latency goes back under the target
+    for _ in range(50):
+        cpu_governor.record(0.01)
+    for second in range(4, 8):
+        fake_clock.now = second
+        cpu_governor.record(0.01)
+
+    assert cpu_governor.interval == 1
+
+
+def test_temperature(tmp_path: str, fake_clock: FakeClock) -> None:
+    """Check that the interval grows with the temperature and with the throttling of the CPU, before the latency."""
+    sysfs = FakeSysfs(tmp_path)
+    cpu_governor = governor.Governor(0.1, max_interval=5, clock=fake_clock, **sysfs.paths)
+
+    sysfs.write(75.0, 1500)
+    fake_clock.now = 1.0
+    assert cpu_governor.record(0.05) == 3
+
+    # Throttled to a third of the frequency, between the soft and the hard temperature
+    sysfs.write(72.0, 500)
+    fake_clock.now = 2.0
+    assert cpu_governor.record(0.05) == 3
+    sysfs.write(82.0, 500)
+    fake_clock.now = 3.0
+    assert cpu_governor.record(0.05) == 5
+
+    # An idle CPU under the soft temperature is not throttled
+    sysfs.write(50.0, 500)
+    for second in range(4, 10):
+        fake_clock.now = second
+        cpu_governor.record(0.05)
+    assert cpu_governor.interval == 1
+
+
+def test_metrics(tmp_path: str) -> None:
+    """Check that the readings and the decisions are exposed."""
+    metrics.reset()
+    sysfs = FakeSysfs(tmp_path)
+    sysfs.write(65.0, 1200)
+    cpu_governor = governor.Governor(0.1, **sysfs.paths)
+    cpu_governor.record(0.05)
+
+    exposition = metrics.exposition()
+
+    assert "clearway_cpu_temperature_celsius 65" in exposition
+    assert "clearway_cpu_frequency_hertz 1.2e+09" in exposition
+    assert "clearway_governor_latency_seconds 0.05" in exposition
+    assert "clearway_governor_detection_interval 1" in exposition
+    assert "# TYPE clearway_governor_changes_total counter" in exposition
+    metrics.reset()
+
+
+def test_ai_governed(tmp_path: str, write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend]) -> None:
+    """Check that the `Ai` of a hot CPU tracks the boxes on the frames not sent to the network."""
+    video_path = write_video(9)
+    sysfs = FakeSysfs(tmp_path)
+    sysfs.write(85.0, 1500)
+    inference_backend = fake_backend()
+    settings = dict(target_latency=10.0, max_interval=3, period=0.0, **sysfs.paths)
+
+    detections = list(ai.Ai(False, False, "weights", "cfg", 64, video_path, governor_settings=settings).detections())
+
+    assert len(detections) == 9
+    # The first two frames are prepared before the first reading, then one frame every 3 frames: 0, 1, 4 and 7
+    assert inference_backend.nb_frames == 4
@@ -0,0 +1,119 @@
+"""Test the measure of the latency of each stage and its exposition.
+
+See Also
+--------
+clearway.ai.metrics: File Under Test
+"""
+import socket
+import urllib.request
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from clearway.ai import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics() -> Iterator[None]:
+    """Stop the server and forget the metrics after each test."""
+    yield
+    metrics.stop()
+    metrics.reset()
+
+
+@pytest.mark.parametrize("p_duration", [0.000005, 0.00007, 0.0123, 0.25, 3.0, 1800.0])
+def test_percentile_error(p_duration: float) -> None:
+    """Check that a percentile is within about 3 % of the recorded duration.
+
+    Parameters
+    ----------
+    p_duration : float
+        The duration recorded, in seconds.
+    """
+    histogram = metrics.Histogram()
+    # The maximum caps the upper bound of the bucket, a larger duration keeps it out of the way
+    histogram.record(p_duration)
+    histogram.record(p_duration * 10)
+
+    assert histogram.percentile(0.5) == pytest.approx(p_duration, rel=0.04, abs=1e-6)
+    assert histogram.percentile(1.0) == p_duration * 10
+
+
+def test_percentiles() -> None:
+    """Check the percentiles of a uniform distribution, and that `reset` forgets them."""
+    histogram = metrics.Histogram()
+    for millisecond in range(1, 1001):
+        histogram.record(millisecond / 1000)
+
+    assert histogram.count == 1000
+    assert histogram.sum == pytest.approx(500.5)
+    assert histogram.percentile(0.5) == pytest.approx(0.5, rel=0.04)
+    assert histogram.percentile(0.99) == pytest.approx(0.99, rel=0.04)
+
+    histogram.reset()
+
+    assert histogram.count == 0
+    assert histogram.percentile(0.5) == 0.0
+
+
+def test_exposition() -> None:
+    """Check the text format of the stages and of the registered metrics."""
+    metrics.observe(metrics.FORWARD, 0.1)
+    with metrics.stage(metrics.CAPTURE):
+        pass
+    metrics.register("clearway_frames_dropped_total", "Dropped.", lambda: 3, "counter", stream="0", stage="capture")
+    metrics.register("clearway_frames_dropped_total", "Dropped.", lambda: 4, "counter", stream="1", stage="capture")
+
+    lines = metrics.exposition().splitlines()
+
+    assert lines.index('clearway_stage_latency_seconds_count{stage="capture"} 1') < lines.index(
+        'clearway_stage_latency_seconds_count{stage="forward"} 1'
+    )
+    assert 'clearway_stage_latency_seconds{stage="forward",quantile="0.5"} 0.1' in lines
+    assert lines.count("# TYPE clearway_frames_dropped_total counter") == 1
+    assert 'clearway_frames_dropped_total{stage="capture",stream="0"} 3' in lines
+    assert 'clearway_frames_dropped_total{stage="capture",stream="1"} 4' in lines
+
+
+def test_serve_tcp() -> None:
+    """Check that the metrics are served on a TCP port, and only on their paths."""
+    metrics.observe(metrics.NMS, 0.002)
+    server = metrics.serve("127.0.0.1:0")
+    url = "http://127.0.0.1:{}".format(server.server_address[1])
+
+    with urllib.request.urlopen(url + "/metrics") as response:
+        body = response.read().decode("utf-8")
+
+    assert 'clearway_stage_latency_seconds_count{stage="nms"} 1' in body
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(url + "/other")
+
+
+def test_serve_unix(tmp_path: Path) -> None:
+    """Check that the metrics are served on a Unix socket, removed when stopped.
+
+    Parameters
+    ----------
+    tmp_path : Path
+        The folder of the socket.
+    """
+    path = tmp_path / "clearway.sock"
+    metrics.register("clearway_panel_queue_depth", "Queued.", lambda: 2)
+    metrics.serve("unix:" + str(path))
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(path))
+        client.sendall(b"GET /metrics HTTP/1.0\r\nHost: localhost\r\n\r\n")
+        response = b""
+        while True:
+            data = client.recv(4096)
+            if not data:
+                break
+            response += data
+
+    assert response.startswith(b"HTTP/1.0 200")
+    assert b"\nclearway_panel_queue_depth 2\n" in response
+
+    metrics.stop()
+
+    assert not path.exists()
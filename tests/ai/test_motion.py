@@ -0,0 +1,68 @@
+"""Test the detection of motion used to skip the network.
+
+See Also
+--------
+clearway.ai.motion: File Under Test
+"""
+import numpy
+from clearway.ai import motion
+
+
+def make_frame(square_x: int = -1) -> numpy.ndarray:
+    """Create a gray road frame, with a white square at the given position.
+
+    Parameters
+    ----------
+    square_x : int, optional
+        The horizontal position of the square, by default -1 for no square.
+
+    Returns
+    -------
+    numpy.ndarray
+        The 480x640 BGR frame.
+    """
+    img = numpy.full((480, 640, 3), 90, dtype=numpy.uint8)
+    if square_x >= 0:
+        img[200:320, square_x : square_x + 120] = 250
+    return img
+
+
+def test_static_scene_is_skipped() -> None:
+    """Check that the frames of a static scene are skipped, except the first one."""
+    gate = motion.MotionGate(threshold=0.01, interval=0)
+
+    inferred = [gate.should_infer(make_frame()) for _ in range(20)]
+
+    assert inferred == [True] + [False] * 19
+    assert gate.frames_skipped == 19
+
+
+def test_motion_is_processed() -> None:
+    """Check that a moving object makes the frames processed."""
+    gate = motion.MotionGate(threshold=0.01, interval=0)
+    for _ in range(5):
+        gate.should_infer(make_frame())
+
+    assert gate.should_infer(make_frame(100))
+    assert gate.should_infer(make_frame(300))
+
+
+def test_small_noise_is_skipped() -> None:
+    """Check that a change on fewer pixels than the threshold is skipped."""
+    gate = motion.MotionGate(threshold=0.05, interval=0)
+    gate.should_infer(make_frame())
+
+    img = make_frame()
+    img[0:10, 0:10] = 250
+
+    assert not gate.should_infer(img)
+
+
+def test_forced_interval() -> None:
+    """Check that a frame is processed after `interval` skipped frames, even without motion."""
+    gate = motion.MotionGate(threshold=0.01, interval=3)
+
+    inferred = [gate.should_infer(make_frame()) for _ in range(9)]
+
+    assert inferred == [True, False, False, False, True, False, False, False, True]
+    assert gate.frames_skipped == 6
@@ -0,0 +1,67 @@
+"""Test the processing of several video streams with a single network.
+
+See Also
+--------
+clearway.ai.multicamera: File Under Test
+"""
+import logging
+from collections import Counter
+from typing import Callable
+
+import pytest
+from clearway.ai import backend, multicamera
+from tests.ai.conftest import FakeBackend
+
+
+def test_round_robin() -> None:
+    """Check that the sources of the same priority take turns."""
+    scheduler = multicamera.Scheduler([1, 1, 1])
+
+    picks = [scheduler.pick([0, 1, 2], 1)[0] for _ in range(6)]
+
+    assert picks == [0, 1, 2, 0, 1, 2]
+
+
+def test_priorities() -> None:
+    """Check that the turns are shared in proportion to the priorities, and that only the ready sources are chosen."""
+    scheduler = multicamera.Scheduler([3, 1])
+
+    picks = Counter(scheduler.pick([0, 1], 1)[0] for _ in range(40))
+
+    assert picks == {0: 30, 1: 10}
+    assert scheduler.pick([1], 1) == [1]
+
+
+def test_pick_batch() -> None:
+    """Check that a source is chosen at most once per batch, the most urgent first, and that the batch is capped."""
+    scheduler = multicamera.Scheduler([1, 2, 1])
+
+    assert scheduler.pick([0, 1, 2], 2) == [1, 0]
+    assert sorted(scheduler.pick([0, 1, 2], 5)) == [0, 1, 2]
+
+
+def test_source_from_config() -> None:
+    """Check that the priority is 1 by default."""
+    source = multicamera.Source.from_config({multicamera.DEVICE: "/dev/video2", multicamera.PANEL_GPIOS: [6]})
+
+    assert source == multicamera.Source("/dev/video2", [6], 1)
+
+
+def test_run(
+    write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend], caplog: pytest.LogCaptureFixture
+) -> None:
+    """Check that every frame of every source is sent to the single network, at most `batch_size` at once."""
+    paths = [write_video(6, name="video_0.mp4"), write_video(10, name="video_1.mp4")]
+    inference_backend = fake_backend()
+
+    multi_camera = multicamera.MultiCamera(
+        [multicamera.Source(paths[0], [5]), multicamera.Source(paths[1], [6])], False, "weights", "cfg", 64, None, 2
+    )
+    with caplog.at_level(logging.DEBUG):
+        multi_camera.run()
+
+    assert backend.create.call_count == 1
+    assert inference_backend.nb_frames == 16
+    assert max(inference_backend.batches) <= 2
+    assert "[MULTI] Source 0: 6 frames" in caplog.text
+    assert "[MULTI] Source 1: 10 frames" in caplog.text
@@ -0,0 +1,87 @@
+"""Test the processing of an input video by several worker processes.
+
+See Also
+--------
+clearway.ai.offline: File Under Test
+"""
+import logging
+import os
+import pickle
+from typing import List, Tuple
+
+import numpy
+import pytest
+import cv2
+from clearway.ai import offline
+from pytest_mock import MockerFixture
+
+
+@pytest.mark.parametrize(
+    ("nb_frames", "nb_ranges", "expected"),
+    [
+        (10, 1, [(0, 10)]),
+        (10, 3, [(0, 3), (3, 6), (6, 10)]),
+        (2, 4, [(0, 1), (1, 2)]),
+        (0, 4, []),
+    ],
+)
+def test_split_frame_ranges(nb_frames: int, nb_ranges: int, expected: List[Tuple[int, int]]) -> None:
+    """Check that the ranges cover all the frames, in order and without empty range.
+
+    Parameters
+    ----------
+    nb_frames : int
+        The number of frames of the video.
+    nb_ranges : int
+        The maximum number of ranges.
+    expected : List[Tuple[int, int]]
+        The expected ranges.
+    """
+    assert offline.split_frame_ranges(nb_frames, nb_ranges) == expected
+
+
+def test_record_collector() -> None:
+    """Check that the collected records can be sent back to the main process."""
+    collector = offline._RecordCollector()
+    logger = logging.getLogger("test_offline")
+    logger.addHandler(collector)
+    logger.warning("[AI] %s detected with a probability of: %.2f %%", "BICYCLE", 87.5)
+    logger.removeHandler(collector)
+
+    records = pickle.loads(pickle.dumps(collector.records))
+
+    assert [record.getMessage() for record in records] == ["[AI] BICYCLE detected with a probability of: 87.50 %"]
+
+
+def test_merge_videos_without_ffmpeg(tmp_path: str, mocker: MockerFixture) -> None:
+    """Check that the segments are merged in order when `ffmpeg` is not installed.
+
+    Parameters
+    ----------
+    tmp_path : str
+        The temporary folder of the test.
+    mocker : MockerFixture
+        The interface for the mock module functions.
+    """
+    mocker.patch("shutil.which", return_value=None)
+
+    segment_files = []
+    for index in range(3):
+        path = os.path.join(tmp_path, "segment_{}.avi".format(index))
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 15, (64, 48))
+        for _ in range(5):
+            writer.write(numpy.full((48, 64, 3), 50 * index + 20, dtype=numpy.uint8))
+        writer.release()
+        segment_files.append(path)
+
+    output_file = os.path.join(tmp_path, offline.OUTPUT_VIDEO_NAME)
+    offline.merge_videos(segment_files, output_file)
+
+    values = []
+    video = cv2.VideoCapture(output_file)
+    read_ok, img = video.read()
+    while read_ok:
+        values.append(int(round((img.mean() - 20) / 50)))
+        read_ok, img = video.read()
+
+    assert values == [0] * 5 + [1] * 5 + [2] * 5
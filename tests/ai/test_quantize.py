@@ -0,0 +1,97 @@
+"""Test the quantization of an ONNX model to INT8.
+
+See Also
+--------
+clearway.ai.quantize: File Under Test
+"""
+from typing import Any
+
+import numpy
+import pytest
+from clearway.ai import cache
+from pytest_mock import MockerFixture
+
+onnx = pytest.importorskip("onnx")
+quantize = pytest.importorskip("clearway.ai.quantize")
+
+SIZE: int = 85
+"""The size of the blob, so that the pixels of a blob can be reshaped into rows of 85 columns."""
+
+VIDEO: str = "resources/videos/bicycle_3fps.mp4"
+"""The video whose frames calibrate the model."""
+
+
+def make_model(path: str) -> None:
+    """Write a float model made of a convolution, whose output is reshaped into rows of detections.
+
+    Parameters
+    ----------
+    path : str
+        The path to the ONNX model.
+    """
+    from onnx import helper, numpy_helper, TensorProto
+
+    weights = numpy.random.default_rng(0).normal(0, 0.5, (3, 3, 1, 1)).astype(numpy.float32)
+    graph = helper.make_graph(
+        [
+            helper.make_node("Conv", ["images", "weights"], ["features"]),
+            helper.make_node("Sigmoid", ["features"], ["scores"]),
+            helper.make_node("Reshape", ["scores", "shape"], ["detections"]),
+        ],
+        "conv",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["N", 3, SIZE, SIZE])],
+        [helper.make_tensor_value_info("detections", TensorProto.FLOAT, ["N", None, 85])],
+        [numpy_helper.from_array(weights, "weights"), helper.make_tensor("shape", TensorProto.INT64, [3], [0, -1, 85])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 7
+    onnx.save(model, path)
+
+
+def test_read_frames() -> None:
+    """Check that the frames are spread over the video."""
+    frames = quantize.read_frames([VIDEO], 10)
+
+    assert len(frames) == 10
+    assert not numpy.array_equal(frames[0], frames[-1])
+
+
+def test_split_frames() -> None:
+    """Check that the frames compared are spread over the frames and not used for the calibration."""
+    frames = [numpy.full((2, 2, 3), index, dtype=numpy.uint8) for index in range(10)]
+
+    calibration_frames, comparison_frames = quantize.split_frames(frames, 0.5)
+    assert [img[0, 0, 0] for img in calibration_frames] == [0, 2, 4, 6, 8]
+    assert [img[0, 0, 0] for img in comparison_frames] == [1, 3, 5, 7, 9]
+
+    calibration_frames, comparison_frames = quantize.split_frames(frames, 0.2)
+    assert [img[0, 0, 0] for img in comparison_frames] == [4, 9]
+    assert len(calibration_frames) == 8
+
+    with pytest.raises(ValueError):
+        quantize.split_frames(frames[:1], 0.5)
+
+
+def test_quantize_and_compare(mocker: MockerFixture, tmp_path: Any) -> None:
+    """Check that the quantized model contains INT8 operators and mostly agrees with the float model."""
+    mocker.patch.object(cache, "CACHE_FOLDER", str(tmp_path / "cache"))
+    float_model = str(tmp_path / "float.onnx")
+    quantized_model = str(tmp_path / "int8.onnx")
+    make_model(float_model)
+    frames = quantize.read_frames([VIDEO], 8)
+
+    quantize.quantize_model(float_model, quantized_model, frames, SIZE)
+    report = quantize.compare_models(float_model, quantized_model, frames, SIZE)
+
+    assert "QuantizeLinear" in {node.op_type for node in onnx.load(quantized_model).graph.node}
+    assert report.nb_frames == 8
+    assert report.float_latency > 0 and report.quantized_latency > 0
+    assert report.float_detections > 0
+    assert report.agreement > 0.5
+
+
+def test_report_agreement() -> None:
+    """Check the agreement of the report, including when nothing is detected."""
+    assert quantize.Report(1, 2.0, 1.0, 4, 6, 4).agreement == pytest.approx(0.8)
+    assert quantize.Report(1, 2.0, 1.0, 0, 0, 0).agreement == 1.0
+    assert quantize.Report(1, 2.0, 1.0, 0, 0, 0).speedup == 2.0
@@ -0,0 +1,128 @@
+"""Test the cache of the candidate boxes of the network and their decoding again.
+
+See Also
+--------
+clearway.ai.rawcache: File Under Test
+"""
+import os
+from typing import Callable, List
+
+import numpy
+import cv2
+from clearway.ai import ai, rawcache
+from tests.ai.conftest import FakeBackend
+
+
+def row(center_x: float, objectness: float, bicycle: float) -> List[float]:
+    """Return a row of the output of the network with a box of 0.2 x 0.2 in the middle of the height.
+
+    Parameters
+    ----------
+    center_x : float
+        The center of the box on the width, between 0 and 1.
+    objectness : float
+        The objectness of the row.
+    bicycle : float
+        The score of the bicycles.
+    """
+    values = [0.0] * 85
+    values[:5] = [center_x, 0.5, 0.2, 0.2, objectness]
+    values[rawcache.CLASSES["bicycle"]] = bicycle
+    return values
+
+
+OUTS: numpy.ndarray = numpy.array([row(0.2, 0.9, 0.8), row(0.7, 0.5, 0.4), row(0.5, 0.01, 0.0)], dtype=numpy.float32)
+"""The output of the network for a frame: a sure bicycle, a doubtful one and a row under the floor."""
+
+
+def test_write_read(tmp_path: str) -> None:
+    """Check that the rows above the floor of each writer of a run are read back by frame and part of frame."""
+    run = rawcache.start_run(tmp_path)
+    first_writer = rawcache.RawCacheWriter(tmp_path, run=run)
+    first_writer.add(0, 0, OUTS)
+    first_writer.add(0, 1, OUTS[2:])
+    first_writer.close()
+    second_writer = rawcache.RawCacheWriter(tmp_path, first_frame=10, run=run)
+    second_writer.add(10, 0, OUTS[:1])
+    second_writer.close()
+
+    raw_cache = rawcache.RawCache(tmp_path)
+
+    assert raw_cache.frame_indexes == [0, 10]
+    assert [crop_index for crop_index, _ in raw_cache.candidates(0)] == [0, 1]
+    numpy.testing.assert_allclose(raw_cache.candidates(0)[0][1], OUTS[:2], atol=1e-3)
+    assert raw_cache.candidates(0)[0][1].dtype == numpy.float16
+    assert len(raw_cache.candidates(0)[1][1]) == 0
+    assert len(raw_cache.candidates(10)[0][1]) == 1
+    assert raw_cache.candidates(5) == []
+
+
+def test_reused_folder(tmp_path: str) -> None:
+    """Check that only the rows of the last run are read from a folder reused with another split of the frames."""
+    # Two jobs, then three jobs, on the 6 frames of a video
+    for bounds in [(0, 3, 6), (0, 2, 4, 6)]:
+        run = rawcache.start_run(tmp_path)
+        for first_frame, stop in zip(bounds, bounds[1:]):
+            writer = rawcache.RawCacheWriter(tmp_path, first_frame, run=run)
+            for frame_index in range(first_frame, stop):
+                writer.add(frame_index, 0, OUTS)
+            writer.close()
+
+    raw_cache = rawcache.RawCache(tmp_path)
+
+    assert raw_cache.frame_indexes == [0, 1, 2, 3, 4, 5]
+    assert all(len(raw_cache.candidates(frame_index)) == 1 for frame_index in raw_cache.frame_indexes)
+    assert len(os.listdir(tmp_path)) == 7
+
+    # A writer without run starts its own, like a single process does
+    writer = rawcache.RawCacheWriter(tmp_path)
+    writer.add(0, 0, OUTS)
+    writer.close()
+
+    assert rawcache.RawCache(tmp_path).frame_indexes == [0]
+
+
+def test_redecode_thresholds(tmp_path: str, write_video: Callable[..., str]) -> None:
+    """Check that the detections change with the threshold without running the network."""
+    video_path = write_video(3, 100, 50)
+    cache_folder = os.path.join(tmp_path, "cache")
+    writer = rawcache.RawCacheWriter(cache_folder)
+    writer.add(1, 0, OUTS)
+    writer.close()
+
+    assert rawcache.redecode(cache_folder, video_path) == rawcache.Summary(1, 1, 1)
+    assert rawcache.redecode(cache_folder, video_path, threshold=0.3, score_threshold=0.3).nb_detections == 2
+    assert rawcache.redecode(cache_folder, video_path, class_id=rawcache.CLASSES["person"]).nb_detections == 0
+
+
+def test_redecode_video(tmp_path: str, write_video: Callable[..., str]) -> None:
+    """Check that all the frames are written to the output video, with or without candidate rows."""
+    video_path = write_video(4, 100, 50)
+    cache_folder = os.path.join(tmp_path, "cache")
+    writer = rawcache.RawCacheWriter(cache_folder)
+    writer.add(2, 0, OUTS)
+    writer.close()
+
+    summary = rawcache.redecode(cache_folder, video_path, str(tmp_path))
+
+    output_video = cv2.VideoCapture(os.path.join(tmp_path, "video_processed.mp4"))
+    assert int(output_video.get(cv2.CAP_PROP_FRAME_COUNT)) == 4
+    output_video.release()
+    assert summary.nb_frames_with_detection == 1
+
+
+def test_ai_saves_frames(
+    tmp_path: str, write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend]
+) -> None:
+    """Check that the `Ai` saves the rows of each frame of its range, and that they decode like the `Ai` does."""
+    video_path = write_video(6, 100, 50)
+    cache_folder = os.path.join(tmp_path, "cache")
+    fake_backend(lambda _: OUTS)
+
+    ai.Ai(False, False, "weights", "cfg", 64, video_path, frame_range=(2, 6), raw_cache=cache_folder).bicycle_detector(
+        ()
+    )
+
+    raw_cache = rawcache.RawCache(cache_folder)
+    assert raw_cache.frame_indexes == [2, 3, 4, 5]
+    assert rawcache.redecode(cache_folder, video_path) == rawcache.Summary(4, 4, 4)
@@ -0,0 +1,96 @@
+"""Test the recording of the clips around the detections.
+
+See Also
+--------
+clearway.ai.recorder: File Under Test
+"""
+import os
+import time
+from typing import Any, Iterable, List
+
+import numpy
+import cv2
+from clearway.ai import recorder
+
+
+def add_frames(event_recorder: recorder.EventRecorder, nb_frames: int, detections: Iterable[int]) -> None:
+    """Add the frames filled with 0, 8, 16... always reusing the same array, as the capture does.
+
+    Parameters
+    ----------
+    event_recorder : recorder.EventRecorder
+        The tested recorder.
+    nb_frames : int
+        The number of frames.
+    detections : Iterable[int]
+        The numbers of the frames where something is detected.
+    """
+    img = numpy.zeros((48, 64, 3), dtype=numpy.uint8)
+    for value in range(nb_frames):
+        img[:] = 8 * value
+        event_recorder.add(img, value in detections)
+        # Let the encoding thread keep up, as it does with the time taken by the inference
+        time.sleep(0.005)
+
+
+def read_clip(path: str) -> List[int]:
+    """Read the value of each frame of a clip.
+
+    Parameters
+    ----------
+    path : str
+        The path to the clip.
+
+    Returns
+    -------
+    List[int]
+        The mean value of each frame, divided by 8 and rounded.
+    """
+    video_stream = cv2.VideoCapture(path)
+    values = []
+    read_ok, img = video_stream.read()
+    while read_ok:
+        values.append(int(round(img.mean() / 8)))
+        read_ok, img = video_stream.read()
+    video_stream.release()
+    return values
+
+
+def test_clip_around_detection(tmp_path: Any) -> None:
+    """Check that a clip holds the frames before and after a detection, and is named after its first frame."""
+    event_recorder = recorder.EventRecorder(str(tmp_path), 10, 0.3, 0.2, first_frame=100)
+    event_recorder.start()
+
+    add_frames(event_recorder, 20, {10})
+    event_recorder.stop()
+
+    assert os.listdir(tmp_path) == ["clip_000107.mp4"]
+    assert read_clip(str(tmp_path / "clip_000107.mp4")) == [7, 8, 9, 10, 11, 12]
+    assert event_recorder.clips_written == 1
+    assert event_recorder.frames_lost == 0
+    assert event_recorder.memory == 6 * 48 * 64 * 3
+
+
+def test_extend_or_split(tmp_path: Any) -> None:
+    """Check that a detection during a clip extends it, and that a later detection opens a new clip."""
+    event_recorder = recorder.EventRecorder(str(tmp_path), 10, 0.2, 0.2)
+    event_recorder.start()
+
+    add_frames(event_recorder, 30, {5, 6, 20})
+    event_recorder.stop()
+
+    assert sorted(os.listdir(tmp_path)) == ["clip_000003.mp4", "clip_000018.mp4"]
+    assert len(read_clip(str(tmp_path / "clip_000003.mp4"))) == 6
+    assert len(read_clip(str(tmp_path / "clip_000018.mp4"))) == 5
+
+
+def test_lagging_encoder(tmp_path: Any) -> None:
+    """Check that the frames overwritten before being encoded are counted, and the clip is cut at the last frame."""
+    event_recorder = recorder.EventRecorder(str(tmp_path), 10, 0.2, 0.3)
+
+    # Not started, the frames of the clip are overwritten before the clip is encoded by stop
+    add_frames(event_recorder, 8, {1})
+    event_recorder.stop()
+
+    assert event_recorder.frames_lost == 2
+    assert read_clip(str(tmp_path / "clip_000000.mp4")) == [2, 3, 4]
@@ -0,0 +1,102 @@
+"""Test the switch of the size of the blob with the latency of the frames.
+
+See Also
+--------
+clearway.ai.resolution: File Under Test
+"""
+import logging
+from typing import Dict, List
+
+import numpy
+import pytest
+from clearway.ai import backend, resolution
+from pytest_mock import MockerFixture
+
+
+def test_step_down() -> None:
+    """Check that the size steps down once a whole window is above the target, then waits for a new window."""
+    controller = resolution.ResolutionController([224, 320, 416], 416, 0.1, window=5)
+
+    assert [controller.record(0.2) for _ in range(4)] == [None] * 4
+    change = controller.record(0.2)
+
+    assert change is not None
+    assert (change.previous, change.size) == (416, 320)
+    assert "above the target 100.0 ms" in change.reason
+    assert controller.size == 320
+    assert [controller.record(0.2) for _ in range(4)] == [None] * 4
+    assert controller.record(0.2).size == 224
+    # The smallest size is kept whatever the latency
+    assert [controller.record(0.2) for _ in range(10)] == [None] * 10
+    assert controller.nb_changes == 2
+
+
+def test_step_up_with_hysteresis() -> None:
+    """Check that the size steps up only when the latency predicted at the larger size is under the headroom."""
+    controller = resolution.ResolutionController([224, 320], 224, 0.1, window=5, headroom=0.8)
+
+    # About 0.041 * (320 / 224) ** 2 = 0.084 s at 320, under the target but above the headroom
+    assert [controller.record(0.041) for _ in range(10)] == [None] * 10
+    assert controller.size == 224
+
+    # The 90th percentile falls once a single frame of the window is above 0.03 s
+    changes = [controller.record(0.03) for _ in range(4)]
+
+    assert changes[:3] == [None] * 3
+    assert (changes[3].previous, changes[3].size) == (224, 320)
+    assert "p90 latency 36.6 ms over the last 5 frames, about 74.7 ms at size 320" in changes[3].reason
+
+
+def test_nearest_level() -> None:
+    """Check that the first size is the level nearest to the configured size."""
+    assert resolution.ResolutionController([416, 224, 320], 300, 0.1).size == 320
+    assert resolution.ResolutionController([224, 320], 608, 0.1).sizes == [224, 320]
+
+
+class FakeBackend(backend.Backend):
+    """Tell the size used for each frame."""
+
+    def __init__(self, size: int) -> None:
+        super().__init__(size)
+        self.nb_frames: int = 0
+
+    def infer(self, frames: List[numpy.ndarray]) -> List[numpy.ndarray]:
+        self.nb_frames += len(frames)
+        return [numpy.full((1, 85), self.size, dtype=numpy.float32) for _ in frames]
+
+
+def test_adaptive_backend(caplog: pytest.LogCaptureFixture) -> None:
+    """Check that the frames are sent to the backend of the size chosen from their latency, and the change logged."""
+    backends: Dict[int, backend.Backend] = {224: FakeBackend(224), 320: FakeBackend(320)}
+    # Each inference lasts 0.2 s
+    ticks = iter(numpy.arange(0, 100, 0.1))
+    adaptive_backend = resolution.AdaptiveBackend(
+        backends, resolution.ResolutionController([224, 320], 320, 0.1, window=3), lambda: next(ticks) * 2
+    )
+    frame = numpy.zeros((10, 10, 3), dtype=numpy.uint8)
+
+    with caplog.at_level(logging.INFO):
+        outs = [adaptive_backend.infer([frame])[0][0, 0] for _ in range(5)]
+
+    assert outs == [320, 320, 320, 224, 224]
+    assert adaptive_backend.size == 224
+    assert adaptive_backend.preprocessor is backends[224].preprocessor
+    assert "[AI] Size 320 -> 224: p90 latency 200.0 ms over the last 3 frames" in caplog.text
+
+
+def test_create(mocker: MockerFixture) -> None:
+    """Check that a backend is created and warmed up for each size, only with a target latency."""
+    created: List[FakeBackend] = []
+    create = mocker.patch.object(
+        backend, "create", side_effect=lambda *args, **_: created.append(FakeBackend(args[3])) or created[-1]
+    )
+
+    assert isinstance(resolution.create(backend.OPENCV, "weights", "cfg", 320, 0, [224, 320], 0.0), FakeBackend)
+    adaptive_backend = resolution.create(backend.OPENCV, "weights", "cfg", 320, 0, [320, 224, 416], 0.1)
+
+    assert isinstance(adaptive_backend, resolution.AdaptiveBackend)
+    assert adaptive_backend.size == 320
+    assert [call.args[3] for call in create.call_args_list[1:]] == [224, 320, 416]
+    assert all(not call.kwargs["shared"] for call in create.call_args_list[1:])
+    # Each network is warmed up by a forward pass
+    assert [inference_backend.nb_frames for inference_backend in created[1:]] == [1, 1, 1]
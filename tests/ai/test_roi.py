@@ -0,0 +1,74 @@
+"""Test the regions of interest of the frames.
+
+See Also
+--------
+clearway.ai.roi: File Under Test
+"""
+import numpy
+import pytest
+from clearway.ai import roi
+
+IMG: numpy.ndarray = numpy.zeros((480, 640, 3), dtype=numpy.uint8)
+"""The frame in which the regions are cropped."""
+
+
+def test_rectangle() -> None:
+    """Check that a rectangle is cropped without copy and that its boxes are moved to the frame."""
+    region = roi.RegionOfInterest.from_config({"rectangle": [100, 200, 300, 150], "panel_gpios": [5]})
+
+    crop = region.crop(IMG)
+    boxes, confidences = region.to_frame(
+        IMG, numpy.array([[10, 20, 30, 40]], dtype=numpy.int32), numpy.array([0.9], dtype=numpy.float32)
+    )
+
+    assert crop.shape == (150, 300, 3)
+    assert numpy.shares_memory(crop, IMG)
+    assert region.panel_gpios == {5}
+    assert boxes.tolist() == [[110, 220, 30, 40]]
+    assert confidences.tolist() == [numpy.float32(0.9)]
+
+
+def test_rectangle_clipped() -> None:
+    """Check that a rectangle going out of the frame is clipped."""
+    region = roi.RegionOfInterest.from_config({"rectangle": [-50, 400, 800, 200], "panel_gpios": [5, 6]})
+
+    assert region.crop(IMG).shape == (80, 640, 3)
+
+
+def test_rectangle_outside() -> None:
+    """Check that a rectangle entirely outside of the frames is rejected, its crop would be empty."""
+    region = roi.RegionOfInterest.from_config({"rectangle": [700, 500, 100, 100], "panel_gpios": [5]})
+    inside = roi.RegionOfInterest.from_config({"rectangle": [-50, 400, 800, 200], "panel_gpios": [6]})
+
+    assert region.crop(IMG).size == 0
+    assert not region.overlaps(640, 480)
+    assert inside.overlaps(640, 480)
+    roi.check_regions([inside], 640, 480)
+    roi.check_regions([region], 0, 0)
+    with pytest.raises(ValueError):
+        roi.check_regions([inside, region], 640, 480)
+
+
+def test_polygon() -> None:
+    """Check that only the boxes centered inside a polygon are kept."""
+    region = roi.RegionOfInterest.from_config({"polygon": [[0, 0], [400, 0], [0, 400]], "panel_gpios": [6]})
+    boxes = numpy.array([[40, 40, 20, 20], [300, 300, 20, 20]], dtype=numpy.int32)
+    confidences = numpy.array([0.6, 0.8], dtype=numpy.float32)
+
+    kept_boxes, kept_confidences = region.to_frame(IMG, boxes, confidences)
+
+    assert region.crop(IMG).shape[:2] == (401, 401)
+    assert kept_boxes.tolist() == [[40, 40, 20, 20]]
+    assert kept_confidences.tolist() == [numpy.float32(0.6)]
+
+
+def test_no_box() -> None:
+    """Check that a region without detection gives empty arrays."""
+    region = roi.RegionOfInterest.from_config({"polygon": [[0, 0], [400, 0], [0, 400]], "panel_gpios": [6]})
+
+    boxes, confidences = region.to_frame(
+        IMG, numpy.empty((0, 4), dtype=numpy.int32), numpy.empty(0, dtype=numpy.float32)
+    )
+
+    assert boxes.shape == (0, 4)
+    assert confidences.shape == (0,)
@@ -0,0 +1,53 @@
+"""Test the aggregation of the logs of the detections.
+
+See Also
+--------
+clearway.ai.summary: File Under Test
+"""
+import logging
+
+import pytest
+from clearway.ai import summary
+from tests.conftest import FakeClock
+
+
+def test_aggregate(fake_clock: FakeClock, caplog: pytest.LogCaptureFixture) -> None:
+    """Check that the detections are logged once per interval, with their number and the highest probability."""
+    detection_summary = summary.DetectionSummary("BICYCLE", 1.0, fake_clock)
+
+    with caplog.at_level(logging.INFO):
+        for frame in range(16):
+            detection_summary.add([0.5, 0.75] if frame < 8 else [])
+            fake_clock.now += 0.25
+
+    assert detection_summary.nb_logs == 2
+    assert caplog.messages == [
+        "[AI] 10 BICYCLE detected in the last 1.0 s, max probability 75.00 %",
+        "[AI] 6 BICYCLE detected in the last 1.0 s, max probability 75.00 %",
+    ]
+
+
+def test_flush(fake_clock: FakeClock, caplog: pytest.LogCaptureFixture) -> None:
+    """Check that the detections not logged yet are logged by `flush`, and only once."""
+    detection_summary = summary.DetectionSummary("BICYCLE", 1.0, fake_clock)
+
+    with caplog.at_level(logging.INFO):
+        detection_summary.add([0.6])
+        fake_clock.now += 0.5
+        detection_summary.flush()
+        detection_summary.flush()
+
+    assert caplog.messages == ["[AI] 1 BICYCLE detected in the last 0.5 s, max probability 60.00 %"]
+
+
+def test_no_interval(caplog: pytest.LogCaptureFixture) -> None:
+    """Check that each detection is logged on its own without interval."""
+    detection_summary = summary.DetectionSummary("BICYCLE", 0.0)
+
+    with caplog.at_level(logging.INFO):
+        detection_summary.add([0.5, 0.75])
+
+    assert caplog.messages == [
+        "[AI] BICYCLE detected with a probability of: 50.00 %",
+        "[AI] BICYCLE detected with a probability of: 75.00 %",
+    ]
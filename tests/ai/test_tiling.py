@@ -0,0 +1,104 @@
+"""Test the tiles sent to the network and the merge of their detections.
+
+See Also
+--------
+clearway.ai.tiling: File Under Test
+"""
+from typing import Callable, List
+
+import numpy
+from clearway.ai import ai, decode, tiling
+from tests.ai.conftest import FakeBackend
+
+
+def row(center_x: float, center_y: float, width: float, height: float) -> List[float]:
+    """Return a row of the output of the network with a sure bicycle.
+
+    Parameters
+    ----------
+    center_x : float
+        The center of the box on the width, between 0 and 1.
+    center_y : float
+        The center of the box on the height, between 0 and 1.
+    width : float
+        The width of the box, between 0 and 1.
+    height : float
+        The height of the box, between 0 and 1.
+    """
+    values = [0.0] * 85
+    values[:5] = [center_x, center_y, width, height, 0.9]
+    values[6] = 0.9
+    return values
+
+
+def test_tile_rectangles() -> None:
+    """Check that the tiles have the same size, overlap and cover the image without leaving it."""
+    rectangles = tiling.tile_rectangles(1920, 1080, 3, 2, 0.2)
+
+    assert len(rectangles) == 6
+    assert len({(w, h) for _, _, w, h in rectangles}) == 1
+    assert rectangles[0][:2] == (0, 0)
+    assert all(x + w <= 1920 and y + h <= 1080 for x, y, w, h in rectangles)
+    assert max(x + w for x, _, w, _ in rectangles) == 1920
+    assert max(y + h for _, y, _, h in rectangles) == 1080
+    _, _, width, height = rectangles[0]
+    # Each tile starts before the end of its neighbour, by about the overlap
+    assert rectangles[0][0] + width - rectangles[1][0] >= int(0.2 * width)
+    assert rectangles[0][1] + height - rectangles[3][1] >= int(0.2 * height)
+    assert tiling.tile_rectangles(640, 480, 1, 1, 0.2) == [(0, 0, 640, 480)]
+
+
+def test_split() -> None:
+    """Check that the tiles are views of the image."""
+    img = numpy.zeros((100, 200, 3), dtype=numpy.uint8)
+
+    tiles = tiling.split(img, 2, 1, 0.25)
+
+    assert [tile.shape for tile in tiles] == [(100, 115, 3), (100, 115, 3)]
+    tiles[1][0, -1] = 255
+    assert img[0, -1, 0] == 255
+
+
+def test_merge_outputs() -> None:
+    """Check that the boxes of the tiles are moved to the coordinates of the image."""
+    outs = numpy.array([row(0.5, 0.5, 0.2, 0.4)], dtype=numpy.float32)
+
+    merged = tiling.merge_outputs([outs, outs], 200, 100, 2, 1, 0.25)
+
+    # Tiles of 115 pixels starting at 0 and 85
+    numpy.testing.assert_allclose(merged[:, 0], [57.5 / 200, (85 + 57.5) / 200])
+    numpy.testing.assert_allclose(merged[:, 1:4], [[0.5, 23 / 200, 0.4]] * 2)
+    numpy.testing.assert_allclose(merged[:, 4:], numpy.concatenate([outs, outs])[:, 4:])
+    assert outs[0, 0] == 0.5
+
+
+def test_overlap_merged_by_nms() -> None:
+    """Check that an object in the overlap of two tiles is kept once."""
+    # A bicycle at [90, 110) of a 200 pixels wide image, seen by both tiles starting at 0 and 85
+    outs = [
+        numpy.array([row(100 / 115, 0.5, 20 / 115, 0.2)], dtype=numpy.float32),
+        numpy.array([row(15 / 115, 0.5, 20 / 115, 0.2)], dtype=numpy.float32),
+    ]
+
+    merged = tiling.merge_outputs(outs, 200, 100, 2, 1, 0.25)
+    boxes, confidences = decode.decode_output_layers((merged,), 200, 100, 6, 0.5)
+    indexes = decode.non_maximum_suppression(boxes, confidences, score_threshold=0.5, nms_threshold=0.4)
+
+    assert len(boxes) == 2
+    assert len(indexes) == 1
+    numpy.testing.assert_allclose(boxes[indexes][0], [90, 40, 20, 20], atol=1)
+
+
+def test_ai_tiles(write_video: Callable[..., str], fake_backend: Callable[..., FakeBackend]) -> None:
+    """Check that the `Ai` sends the tiles of each frame together and finds a single bicycle by frame."""
+    video_path = write_video(3, 200, 100)
+    # A bicycle at the right of the left tile and at the left of the right one, in their overlap
+    rows = [row(100 / 115, 0.5, 20 / 115, 0.2), row(15 / 115, 0.5, 20 / 115, 0.2)]
+    inference_backend = fake_backend(lambda index: numpy.array([rows[index % 2]], dtype=numpy.float32))
+
+    detections = list(
+        ai.Ai(False, False, "weights", "cfg", 64, video_path, tiles=(2, 1), tile_overlap=0.25).detections()
+    )
+
+    assert inference_backend.shapes == [(100, 115, 3)] * 6
+    assert [len(detection.boxes) for detection in detections] == [1, 1, 1]
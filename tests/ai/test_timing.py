@@ -0,0 +1,45 @@
+"""Test the measure of the phases of the start.
+
+See Also
+--------
+clearway.ai.timing: File Under Test
+"""
+import logging
+
+import pytest
+from clearway.ai import timing
+
+
+def test_phases() -> None:
+    """Check that the phases are measured in order."""
+    timing.reset()
+
+    with timing.phase("model"):
+        pass
+    timing.record("first frame", 0.25)
+
+    assert [name for name, _ in timing.phases()] == ["model", "first frame"]
+    assert timing.phases()[1][1] == 0.25
+    timing.reset()
+
+
+@pytest.mark.parametrize("p_enabled", [False, True])
+def test_report(caplog: pytest.LogCaptureFixture, p_enabled: bool) -> None:
+    """Check that the report is only logged if it is enabled, and that the phases are forgotten."""
+    timing.reset()
+    timing.enable(p_enabled)
+    timing.record("model", 0.5)
+
+    with caplog.at_level(logging.INFO):
+        timing.report()
+
+    assert ("500.0 ms" in caplog.text) == p_enabled
+    assert timing.phases() == []
+    timing.enable(False)
+
+
+def test_process_age() -> None:
+    """Check that the age of the process is positive when it is known."""
+    age = timing.process_age()
+
+    assert age is None or age > 0
@@ -0,0 +1,91 @@
+"""Test the tracking of the boxes between two frames processed by the network.
+
+See Also
+--------
+clearway.ai.tracker: File Under Test
+"""
+import numpy
+from clearway.ai import tracker
+
+SQUARE: int = 80
+"""The side of the textured square moving on the frames."""
+
+
+def make_frame(x: int, y: int) -> numpy.ndarray:
+    """Create a gray frame with a textured square at the given position.
+
+    Parameters
+    ----------
+    x : int
+        The horizontal position of the square.
+    y : int
+        The vertical position of the square.
+
+    Returns
+    -------
+    numpy.ndarray
+        The 480x640 BGR frame.
+    """
+    texture = numpy.random.default_rng(0).integers(0, 256, (SQUARE // 4, SQUARE // 4, 3), dtype=numpy.uint8)
+    img = numpy.full((480, 640, 3), 90, dtype=numpy.uint8)
+    img[y : y + SQUARE, x : x + SQUARE] = numpy.kron(texture, numpy.ones((4, 4, 1), dtype=numpy.uint8))
+    return img
+
+
+def test_iou() -> None:
+    """Check the Intersection over Union of identical, overlapping and disjoint boxes."""
+    boxes = numpy.array([[0, 0, 10, 10], [5, 0, 10, 10], [50, 50, 10, 10]])
+
+    overlaps = tracker.iou(boxes[:1], boxes)
+
+    numpy.testing.assert_allclose(overlaps, [[1.0, 50 / 150, 0.0]])
+
+
+def test_track_moving_box() -> None:
+    """Check that a detected box follows the square on the frames not processed by the network."""
+    object_tracker = tracker.Tracker()
+    boxes, _, track_ids = object_tracker.update(
+        make_frame(100, 200), numpy.array([[100, 200, SQUARE, SQUARE]]), numpy.array([0.9])
+    )
+    assert len(boxes) == 1
+
+    for i in range(1, 5):
+        boxes, confidences, next_ids = object_tracker.track(make_frame(100 + 6 * i, 200 + 3 * i))
+
+        numpy.testing.assert_allclose(boxes[0], [100 + 6 * i, 200 + 3 * i, SQUARE, SQUARE], atol=1)
+        numpy.testing.assert_allclose(confidences, [0.9])
+        assert next_ids.tolist() == track_ids.tolist()
+
+
+def test_identity_kept_by_detection() -> None:
+    """Check that a new detection of the same object keeps its identity, and a far one starts a new track."""
+    object_tracker = tracker.Tracker()
+    _, _, first_ids = object_tracker.update(
+        make_frame(100, 200), numpy.array([[100, 200, SQUARE, SQUARE]]), numpy.array([0.9])
+    )
+    object_tracker.track(make_frame(110, 200))
+
+    boxes, _, track_ids = object_tracker.update(
+        make_frame(120, 200),
+        numpy.array([[120, 200, SQUARE, SQUARE], [500, 20, SQUARE, SQUARE]]),
+        numpy.array([0.8, 0.7]),
+    )
+
+    assert len(boxes) == 2
+    assert track_ids[0] == first_ids[0]
+    assert track_ids[1] != first_ids[0]
+
+
+def test_lost_track_removed() -> None:
+    """Check that a track missing from the detections is hidden, then removed."""
+    object_tracker = tracker.Tracker()
+    img = make_frame(100, 200)
+    object_tracker.update(img, numpy.array([[100, 200, SQUARE, SQUARE]]), numpy.array([0.9]))
+
+    for _ in range(tracker.MAX_MISSED):
+        boxes, _, _ = object_tracker.update(img, numpy.empty((0, 4), dtype=numpy.int32), numpy.empty(0))
+        assert len(boxes) == 0
+        assert len(object_tracker.tracks) == 1
+
+    object_tracker.update(img, numpy.empty((0, 4), dtype=numpy.int32), numpy.empty(0))
+    assert len(object_tracker.tracks) == 0
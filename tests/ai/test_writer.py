@@ -0,0 +1,125 @@
+"""Test the writing of the output video on a dedicated thread.
+
+See Also
+--------
+clearway.ai.writer: File Under Test
+"""
+from threading import Event
+from typing import List
+
+import numpy
+import pytest
+from clearway.ai import writer
+
+
+class FakeVideoWriter:
+    """Keep the frames written instead of encoding them, each write waits until `unblock` is set."""
+
+    def __init__(self) -> None:
+        self.unblock: Event = Event()
+        self.frames: List[numpy.ndarray] = []
+        self.released: bool = False
+
+    def write(self, img: numpy.ndarray) -> None:
+        """Keep a copy of the frame once unblocked."""
+        self.unblock.wait()
+        self.frames.append(img.copy())
+
+    def release(self) -> None:
+        """Remember that the video was released."""
+        self.released = True
+
+
+def write_frames(writer_thread: writer.WriterThread, nb_frames: int) -> None:
+    """Hand over the frames filled with 0, 10, 20... always reusing the same array, as the capture does.
+
+    Parameters
+    ----------
+    writer_thread : writer.WriterThread
+        The tested writer.
+    nb_frames : int
+        The number of frames.
+    """
+    img = numpy.zeros((8, 8, 3), dtype=numpy.uint8)
+    for value in range(nb_frames):
+        img[:] = 10 * value
+        writer_thread.write(img)
+
+
+def test_block() -> None:
+    """Check that every frame is written in order with a small queue, and that the frames handed over are copied."""
+    video_writer = FakeVideoWriter()
+    video_writer.unblock.set()
+    writer_thread = writer.WriterThread(video_writer, writer.BLOCK, capacity=2)
+    writer_thread.start()
+
+    write_frames(writer_thread, 20)
+    writer_thread.stop()
+
+    assert [int(frame[0, 0, 0]) for frame in video_writer.frames] == [10 * value for value in range(20)]
+    assert writer_thread.frames_dropped == 0
+    assert writer_thread.max_depth <= 2
+    assert video_writer.released
+
+
+def test_drop() -> None:
+    """Check that the frames handed over while the queue is full are dropped and counted."""
+    video_writer = FakeVideoWriter()
+    writer_thread = writer.WriterThread(video_writer, writer.DROP, capacity=2)
+    writer_thread.start()
+
+    write_frames(writer_thread, 5)
+    video_writer.unblock.set()
+    writer_thread.stop()
+
+    assert writer_thread.frames_dropped == 3
+    assert [int(frame[0, 0, 0]) for frame in video_writer.frames] == [0, 10]
+
+
+def test_downscale() -> None:
+    """Check that every other frame is dropped once the queue is half full, without waiting when it is full."""
+    video_writer = FakeVideoWriter()
+    writer_thread = writer.WriterThread(video_writer, writer.DOWNSCALE, capacity=4)
+    writer_thread.start()
+
+    write_frames(writer_thread, 8)
+    video_writer.unblock.set()
+    writer_thread.stop()
+
+    assert writer_thread.frames_dropped == 4
+    assert [frame.shape for frame in video_writer.frames] == [(8, 8, 3)] * 4
+    assert [int(frame[0, 0, 0]) for frame in video_writer.frames] == [0, 10, 20, 40]
+
+
+@pytest.mark.parametrize("policy", writer.POLICIES)
+def test_frame_size(policy: str) -> None:
+    """Check that the frames are always written at the size of the output video, even with odd dimensions."""
+    video_writer = FakeVideoWriter()
+    video_writer.unblock.set()
+    writer_thread = writer.WriterThread(video_writer, policy, capacity=4, frame_size=(9, 7))
+
+    for shape in [(7, 9, 3), (8, 8, 3), (3, 5, 3)]:
+        writer_thread.write(numpy.full(shape, 50, dtype=numpy.uint8))
+    writer_thread.stop()
+
+    assert [frame.shape for frame in video_writer.frames] == [(7, 9, 3)] * 3
+    assert all((frame == 50).all() for frame in video_writer.frames)
+
+
+def test_stop_not_started() -> None:
+    """Check that the frames queued are written when the writer is stopped without being started."""
+    video_writer = FakeVideoWriter()
+    video_writer.unblock.set()
+    writer_thread = writer.WriterThread(video_writer, writer.BLOCK, capacity=4)
+
+    write_frames(writer_thread, 3)
+    writer_thread.stop()
+
+    assert len(video_writer.frames) == 3
+    assert writer_thread.mean_depth == 1.0
+
+
+def test_unknown_policy() -> None:
+    """Check that an unknown policy is refused."""
+    with pytest.raises(ValueError, match="Unknown policy"):
+        writer.WriterThread(FakeVideoWriter(), "skip")
@@ -18,17 +18,52 @@ VALUE_NOMINAL: Dict[str, Any] = {
         config.ON_RASPBERRY: True,
         config.IMG_SIZE: 416,
         config.SEE_REAL_TIME_PROCESS: True,
+        config.JOBS: 4,
+        config.BATCH_SIZE: 8,
+        config.MOTION_THRESHOLD: 0.02,
+        config.MOTION_INTERVAL: 30,
+        config.ROI: [
+            {"rectangle": [0, 240, 640, 240], "panel_gpios": [5]},
+            {"polygon": [[320, 0], [640, 0], [640, 240]], "panel_gpios": [6]},
+        ],
+        config.DETECTION_INTERVAL: 3,
+        config.BACKEND: "onnxruntime",
+        config.THREADS: 2,
+        config.AUTOTUNE: True,
+        config.TARGET_FPS: 4.0,
+        config.TIMING: True,
+        config.OUTPUT_POLICY: "drop",
+        config.CLIP_BEFORE: 2.0,
+        config.CLIP_AFTER: 3.0,
+        config.METRICS: "unix:/run/clearway.sock",
+        config.RAW_CACHE: "output/raw_cache",
+        config.TILES: [2, 1],
+        config.TILE_OVERLAP: 0.25,
+        config.SIZES: [224, 320, 416],
+        config.TARGET_LATENCY: 0.15,
+        config.CAMERA: {"fourcc": "MJPG", "width": 640, "height": 480, "fps": 15, "buffer_size": 1},
+        config.GOVERNOR: {"target_latency": 0.2, "max_interval": 3, "temperature_path": "/tmp/thermal/temp"},
+        config.SOURCES: [
+            {"device": "/dev/video0", "panel_gpios": [5], "priority": 2},
+            {"device": "/dev/video2", "panel_gpios": [6]},
+        ],
     },
     config.MODULE_GPIO: {
         config.USE_GPIO: False,
         config.PANEL_GPIOS: [5, 6],
         config.CAMERA_ANGLE: 75,
         config.SERVO_GPIO: 12,
+        config.HOLD_TIME: 1.5,
+        config.CONFIRM_FRAMES: 2,
+        config.CONFIRM_WINDOW: 3,
     },
     config.MODULE_LOGGING: {
         config.LOG_VERBOSITY_LEVEL: logging.DEBUG,
         config.LOG_FORMAT: "%(levelname)s >> %(message)s",
         config.LOG_PATH: "output/Log.log",
+        config.LOG_MAX_BYTES: 1048576,
+        config.LOG_BACKUP_COUNT: 2,
+        config.LOG_SUMMARY_INTERVAL: 5.0,
     },
 }
 """Contains the values of the parameters of the files `nominal.toml` and `multiple_sections.toml`."""
@@ -138,3 +173,32 @@ def test_wrong_value_gpio(p_file: str) -> None:
     assert config.__config_dict[config.MODULE_GPIO] == default_config[config.MODULE_GPIO]
     assert config.__config_dict[config.MODULE_AI] == default_config[config.MODULE_AI]
     assert config.__config_dict[config.MODULE_LOGGING] == default_config[config.MODULE_LOGGING]
+
+
+@pytest.mark.parametrize(
+    "p_file",
+    [
+        "tests/config/toml_files/wrong_value_ai_roi.toml",
+        "tests/config/toml_files/wrong_value_ai_camera.toml",
+        "tests/config/toml_files/wrong_value_ai_sources.toml",
+        "tests/config/toml_files/wrong_value_ai_backend.toml",
+        "tests/config/toml_files/wrong_value_ai_jobs.toml",
+    ],
+)
+def test_wrong_value_ai(p_file: str) -> None:
+    """Test if the file contains invalid values for the `ai` module.
+
+    If a value is invalid, then the configuration associated with the key must remain the same as the default.
+    A list of regions of interest is ignored if one of the regions is invalid, and so is the format of the camera if
+    one of its settings is invalid, or the list of video streams if one of them is invalid.
+
+    Parameters
+    ----------
+    p_file : `str`
+        The path to the configuration file.
+    """
+    config.save_config_from_file(p_file)
+
+    assert config.__config_dict[config.MODULE_GPIO] == default_config[config.MODULE_GPIO]
+    assert config.__config_dict[config.MODULE_AI] == default_config[config.MODULE_AI]
+    assert config.__config_dict[config.MODULE_LOGGING] == default_config[config.MODULE_LOGGING]
@@ -0,0 +1,25 @@
+"""The fakes and the fixtures shared by the tests of all the modules."""
+import pytest
+
+
+class FakeClock:
+    """A clock moved forward by the test."""
+
+    def __init__(self) -> None:
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def fake_clock() -> FakeClock:
+    """Return a clock at 0 second, injected in place of `time.monotonic`.
+
+    Returns
+    -------
+    FakeClock
+        The clock, moved forward by setting its `now` attribute.
+    """
+    return FakeClock()
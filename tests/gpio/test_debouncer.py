@@ -0,0 +1,109 @@
+"""Allows you to test the module `clearway.gpio.debouncer`."""
+
+from typing import List, Tuple
+
+from pytest_mock.plugin import MockerFixture
+from clearway.gpio import debouncer, stateMachinePanel
+from tests.conftest import FakeClock
+
+GPIO: int = 5
+"""The number of the GPIO of the panel."""
+
+
+def run(p_debouncer: debouncer.Debouncer, p_clock: FakeClock, p_detections: str) -> None:
+    """Give the detections to the debouncer, one frame every 0.5 second.
+
+    Parameters
+    ----------
+    p_debouncer : `debouncer.Debouncer`
+        The tested debouncer.
+    p_clock : `FakeClock`
+        The clock of the debouncer.
+    p_detections : `str`
+        `"1"` for a frame with a detection, `"0"` for a frame without.
+    """
+    for l_detected in p_detections:
+        p_debouncer.update(l_detected == "1")
+        p_clock.now += 0.5
+
+
+def events(p_mocker: MockerFixture) -> List[Tuple[str, int]]:
+    """Mock the events of the panels.
+
+    Parameters
+    ----------
+    p_mocker : `MockerFixture`
+        The interface for the mock module functions
+
+    Returns
+    -------
+    `List[Tuple[str, int]]`
+        The events sent, in order.
+    """
+    l_events: List[Tuple[str, int]] = []
+    p_mocker.patch.object(stateMachinePanel, "signal", side_effect=lambda p_gpio: l_events.append(("signal", p_gpio)))
+    p_mocker.patch.object(
+        stateMachinePanel, "end_signal", side_effect=lambda p_gpio: l_events.append(("end_signal", p_gpio))
+    )
+    return l_events
+
+
+def test_edges(mocker: MockerFixture, fake_clock: FakeClock) -> None:
+    """Checks that only the edges are sent, and that a short miss does not stop the signal.
+
+    Parameters
+    ----------
+    mocker : `MockerFixture`
+        The interface for the mock module functions
+    fake_clock : `FakeClock`
+        The clock of the debouncer
+    """
+    l_events = events(mocker)
+    l_debouncer = debouncer.Debouncer(GPIO, p_hold_time=1.0, p_clock=fake_clock)
+
+    run(l_debouncer, fake_clock, "0111101110000")
+
+    assert l_events == [("signal", GPIO), ("end_signal", GPIO)]
+    assert l_debouncer.nb_updates == 13
+    assert not l_debouncer.signaling
+
+
+def test_confirmation(mocker: MockerFixture, fake_clock: FakeClock) -> None:
+    """Checks that a single detection does not start the signal when 2 of the last 3 frames are needed.
+
+    Parameters
+    ----------
+    mocker : `MockerFixture`
+        The interface for the mock module functions
+    fake_clock : `FakeClock`
+        The clock of the debouncer
+    """
+    l_events = events(mocker)
+    l_debouncer = debouncer.Debouncer(GPIO, p_hold_time=1.0, p_confirm_frames=2, p_confirm_window=3, p_clock=fake_clock)
+
+    run(l_debouncer, fake_clock, "1001000")
+    assert l_events == []
+
+    run(l_debouncer, fake_clock, "101")
+    assert l_events == [("signal", GPIO)]
+
+
+def test_close(mocker: MockerFixture, fake_clock: FakeClock) -> None:
+    """Checks that the signal is stopped by `close` without waiting for the hold time.
+
+    Parameters
+    ----------
+    mocker : `MockerFixture`
+        The interface for the mock module functions
+    fake_clock : `FakeClock`
+        The clock of the debouncer
+    """
+    l_events = events(mocker)
+    l_debouncer = debouncer.Debouncer(GPIO, p_hold_time=10.0, p_clock=fake_clock)
+
+    run(l_debouncer, fake_clock, "1")
+    l_debouncer.close()
+    l_debouncer.close()
+
+    assert l_events == [("signal", GPIO), ("end_signal", GPIO)]
+    assert l_debouncer.nb_events == 2